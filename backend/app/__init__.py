@@ -48,12 +48,32 @@ def create_app(config_class=Config):
     from app.main import bp as main_bp
     app.register_blueprint(main_bp)
 
+    from app.commands import register_commands
+    register_commands(app)
+
     @app.context_processor
     def inject_now():
         return {'now': datetime.now().astimezone()}
 
     return app
 
+def create_judge_app(config_class=Config):
+    """Minimal app for judge workers: configuration and the database only
+
+    Blueprints, templates, mail, login and migrations are never used while
+    judging, and each worker needs only a connection or two of its own.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+        'pool_size': app.config['JUDGE_DB_POOL_SIZE'],
+        'max_overflow': 2,  # the lease keeper's and progress writer's short transactions
+        'pool_pre_ping': True,
+    }
+    db.init_app(app)
+    return app
+
 from app import models
 
 
@@ -2,10 +2,12 @@ from flask_wtf import FlaskForm
 from datetime import datetime
 from wtforms import (
     StringField, TextAreaField, DateTimeField, IntegerField,
-    BooleanField, SubmitField, FieldList, FormField
+    BooleanField, SubmitField, FieldList, FormField, SelectField, SelectMultipleField
 )
-from wtforms.validators import DataRequired, NumberRange
+from wtforms.validators import DataRequired, NumberRange, Optional
 from flask_wtf.file import FileField, FileAllowed
+from judge.mock_judge import Verdict
+from judge.toolchains import DEFAULT_PROFILE, profile_choices
 
 class TestCaseForm(FlaskForm):
     class Meta:
@@ -30,6 +32,9 @@ class CreateProblemForm(FlaskForm):
     expected_input = TextAreaField('Expected Input')
     expected_output = TextAreaField('Expected Output')
     time_limit = IntegerField('Time Limit (seconds)', validators=[DataRequired(), NumberRange(min=1)])
+    max_parallel_tests = IntegerField('Parallel Test Runs', validators=[Optional(), NumberRange(min=1)])
+    memory_limit = IntegerField('Memory Limit (MB)', validators=[Optional(), NumberRange(min=16)])
+    reuse_verdicts = BooleanField('Reuse verdicts of identical resubmissions', default=True)
 
     test_case_upload = FormField(TestCaseUploadForm)
 
@@ -41,6 +46,9 @@ class EditProblemForm(FlaskForm):
     expected_input = TextAreaField('Expected Input')
     expected_output = TextAreaField('Expected Output')
     time_limit = IntegerField('Time Limit (seconds)', validators=[DataRequired(), NumberRange(min=1)])
+    max_parallel_tests = IntegerField('Parallel Test Runs', validators=[Optional(), NumberRange(min=1)])
+    memory_limit = IntegerField('Memory Limit (MB)', validators=[Optional(), NumberRange(min=16)])
+    reuse_verdicts = BooleanField('Reuse verdicts of identical resubmissions', default=True)
 
     test_case_upload = FormField(TestCaseUploadForm)
 
@@ -52,7 +60,10 @@ class CreateContestForm(FlaskForm):
     description = TextAreaField('Description', validators=[DataRequired()])
     start_time = DateTimeField('Start Time', default=datetime.now().astimezone(), validators=[DataRequired()])
     end_time = DateTimeField('End Time', default=datetime.now().astimezone(), validators=[DataRequired()])
+    freeze_time = DateTimeField('Freeze Leaderboard At', validators=[Optional()])
+    unfreeze_time = DateTimeField('Unfreeze Leaderboard At', validators=[Optional()])
     is_public = BooleanField('Public Contest')
+    toolchain_profile = SelectField('Toolchain Profile', choices=profile_choices(), default=DEFAULT_PROFILE)
     submit = SubmitField('Create Contest')
 
 class EditContestForm(FlaskForm):
@@ -60,10 +71,24 @@ class EditContestForm(FlaskForm):
     description = TextAreaField('Description', validators=[DataRequired()])
     start_time = DateTimeField('Start Time', validators=[DataRequired()])
     end_time = DateTimeField('End Time', validators=[DataRequired()])
+    freeze_time = DateTimeField('Freeze Leaderboard At', validators=[Optional()])
+    unfreeze_time = DateTimeField('Unfreeze Leaderboard At', validators=[Optional()])
     is_public = BooleanField('Public Contest')
+    toolchain_profile = SelectField('Toolchain Profile', choices=profile_choices(), default=DEFAULT_PROFILE)
     submit = SubmitField('Update Contest')
 
+class SnapshotForm(FlaskForm):
+    label = StringField('Label', validators=[Optional()])
+    as_of = DateTimeField('Standings As Of (empty: now)', validators=[Optional()])
+    submit = SubmitField('Take Snapshot')
+
 class GenerateCredentialsForm(FlaskForm):
     json_file = FileField('Upload JSON File', validators=[
         FileAllowed(['json'], 'Only .json files are allowed')
     ])
+
+class RejudgeForm(FlaskForm):
+    statuses = SelectMultipleField('Only submissions with status (none selected: all)',
+                                   choices=[(v.value, v.value) for v in Verdict],
+                                   validators=[Optional()])
+    submit = SubmitField('Rejudge')
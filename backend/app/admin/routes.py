@@ -5,7 +5,9 @@ from pathlib import Path
 from datetime import datetime
 
 from flask_login import login_required, current_user
-from flask import render_template, redirect, url_for, flash, request, current_app, abort, jsonify
+from flask import (render_template, redirect, url_for, flash, request, current_app, abort, jsonify, Response,
+                   stream_with_context)
+from sqlalchemy.exc import IntegrityError
 
 from app import db, mail
 from app.admin import bp
@@ -14,12 +16,18 @@ from app.admin.forms import (
     CreateProblemForm, 
     GenerateCredentialsForm,
     EditContestForm,
-    TestCaseForm,
-    EditProblemForm
+    EditProblemForm,
+    RejudgeForm,
+    SnapshotForm
 )
-from app.models import User, Contest, Problem, Submission, TestCase, ParticipantsHistory, contest_participants
+from app.models import (User, Contest, Problem, Submission, TestCase, ParticipantsHistory, RejudgeJob,
+                        StandingsSnapshot, contest_participants)
 from app.email import send_credentials_email
-from app.utils import generate_leaderboard_pdf, generate_leaderboard_excel
+from app.snapshots import FREEZE, diff, take, take_freeze
+from app.standings import iter_standings, rebuild, update_score
+from app.utils import generate_leaderboard_pdf, generate_leaderboard_excel, leaderboard_csv
+from app.timeutil import as_utc
+from judge.toolchains import get_profile
 
 
 
@@ -60,6 +68,8 @@ def create_contest():
         abort(403)
     
     form = CreateContestForm()
+    if request.method == 'GET':
+        form.toolchain_profile.data = get_profile(None).name
     if form.validate_on_submit():
         try:
             # Step 1: Temporarily create the contest to get an ID
@@ -68,7 +78,10 @@ def create_contest():
                 description=form.description.data,
                 start_time=form.start_time.data,
                 end_time=form.end_time.data,
-                is_public=form.is_public.data
+                is_public=form.is_public.data,
+                toolchain_profile=form.toolchain_profile.data,
+                freeze_time=form.freeze_time.data,
+                unfreeze_time=form.unfreeze_time.data
             )
             db.session.add(temp_contest)
             db.session.flush()  # Get ID without committing yet
@@ -114,20 +127,43 @@ def create_contest():
 @login_required
 def contest_details(contest_id):
     contest = Contest.query.get_or_404(contest_id)
-    return render_template('admin/contest_details.html', contest=contest, datetime=datetime)
+    problem_ids = [problem.id for problem in contest.problems]
+    rejudge_jobs = RejudgeJob.query.filter(
+        db.or_(RejudgeJob.contest_id == contest.id, RejudgeJob.problem_id.in_(problem_ids))
+    ).order_by(RejudgeJob.id.desc()).limit(5).all()
+    return render_template('admin/contest_details.html', contest=contest, datetime=datetime,
+                           rejudge_form=RejudgeForm(), rejudge_jobs=rejudge_jobs)
 
 @bp.route('/contest/<int:contest_id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_contest(contest_id):
     contest = Contest.query.get_or_404(contest_id)
     form = EditContestForm(obj=contest)
+    if request.method == 'GET' and not contest.toolchain_profile:
+        form.toolchain_profile.data = get_profile(None).name
     
     if form.validate_on_submit():
         contest.title = form.title.data
         contest.description = form.description.data
+        # Stored penalties are minutes from the start
+        restarted = as_utc(form.start_time.data) != as_utc(contest.start_time)
         contest.start_time = form.start_time.data
         contest.end_time = form.end_time.data
         contest.is_public = form.is_public.data
+        if as_utc(form.freeze_time.data) != as_utc(contest.freeze_time):
+            # Taken at the old freeze time
+            StandingsSnapshot.query.filter_by(contest_id=contest.id, kind=FREEZE).delete()
+        contest.freeze_time = form.freeze_time.data
+        contest.unfreeze_time = form.unfreeze_time.data
+        if form.toolchain_profile.data != get_profile(contest.toolchain_profile).name:
+            # Judged under other flags: cached test sets and reusable verdicts are stale
+            Problem.query.filter_by(contest_id=contest.id).update(
+                {Problem.version: Problem.version + 1}, synchronize_session=False)
+        contest.toolchain_profile = form.toolchain_profile.data
+        if restarted:
+            rebuild(contest)
+        else:
+            contest.bump_standings_version()
         db.session.commit()
         flash('Contest updated successfully!', 'success')
         return redirect(url_for('admin.contest_details', contest_id=contest.id))
@@ -182,7 +218,10 @@ def add_problem(contest_id):
             description=form.description.data,
             expected_input=form.expected_input.data or "",  # optional now
             expected_output=form.expected_output.data or "",
-            time_limit=form.time_limit.data
+            time_limit=form.time_limit.data,
+            max_parallel_tests=form.max_parallel_tests.data,
+            memory_limit=form.memory_limit.data,
+            reuse_verdicts=form.reuse_verdicts.data
         )
         db.session.add(problem)
         db.session.flush()  # Get problem.id before adding test cases
@@ -196,10 +235,9 @@ def add_problem(contest_id):
                 for tc in json_data:
                     test_case = TestCase(
                         problem_id=problem.id,
-                        expected_input=tc.get('expected_input', ''),
-                        expected_output=tc.get('expected_output', ''),
                         is_sample=tc.get('is_sample', False)
                     )
+                    test_case.set_data(tc.get('expected_input', ''), tc.get('expected_output', ''))
                     db.session.add(test_case)
 
             except Exception as e:
@@ -210,6 +248,7 @@ def add_problem(contest_id):
                 json_file.close()
 
 
+        contest.bump_standings_version()
         db.session.commit()
         flash("Problem added successfully!", "success")
         return redirect(url_for('admin.contest_details', contest_id=contest_id))
@@ -230,6 +269,10 @@ def edit_problem(problem_id):
         problem.expected_input = form.expected_input.data
         problem.expected_output = form.expected_output.data
         problem.time_limit = form.time_limit.data
+        problem.max_parallel_tests = form.max_parallel_tests.data
+        problem.memory_limit = form.memory_limit.data
+        problem.reuse_verdicts = form.reuse_verdicts.data
+        problem.version = Problem.version + 1  # in SQL, so concurrent edits both count
 
         json_file = form.test_case_upload.json_file.data
 
@@ -243,10 +286,9 @@ def edit_problem(problem_id):
                 for tc in json_data:
                     test_case = TestCase(
                         problem_id=problem.id,
-                        expected_input=tc.get('expected_input', ''),
-                        expected_output=tc.get('expected_output', ''),
                         is_sample=tc.get('is_sample', False)
                     )
+                    test_case.set_data(tc.get('expected_input', ''), tc.get('expected_output', ''))
                     db.session.add(test_case)
             except Exception as e:
                 flash(f'Error processing JSON file: {str(e)}', 'danger')
@@ -262,17 +304,125 @@ def edit_problem(problem_id):
         flash('Problem updated successfully!', 'success')
         return redirect(url_for('admin.contest_details', contest_id=problem.contest_id))
 
-    # On GET: Load existing test cases into form.test_cases if you want to show manual test cases
-    if request.method == 'GET':
-        existing_cases = TestCase.query.filter_by(problem_id=problem.id).all()
-        for tc in existing_cases:
-            tc_form = TestCaseForm()
-            tc_form.expected_input.data = tc.expected_input
-            tc_form.expected_output.data = tc.expected_output
-            tc_form.is_sample.data = tc.is_sample
+    return render_template('admin/edit_problem.html', form=form, problem=problem)
 
+@bp.route('/problem/<int:problem_id>/rejudge', methods=['POST'])
+@login_required
+def rejudge_problem(problem_id):
+    if current_user.role != 'admin':
+        abort(403)
+    problem = Problem.query.get_or_404(problem_id)
+    form = RejudgeForm()
+    if not form.validate_on_submit():
+        flash(f"Cannot start rejudge: {form.errors}", 'danger')
+        return redirect(url_for('admin.contest_details', contest_id=problem.contest_id))
 
-    return render_template('admin/edit_problem.html', form=form, problem=problem)
+    from judge.rejudge import start_rejudge
+    job = start_rejudge(problem_id=problem.id, statuses=form.statuses.data or [], created_by_id=current_user.id)
+    flash(f'Rejudging {job.total} submission(s) of "{problem.title}".', 'success')
+    return redirect(url_for('admin.rejudge_status', job_id=job.id))
+
+@bp.route('/contest/<int:contest_id>/rejudge', methods=['POST'])
+@login_required
+def rejudge_contest(contest_id):
+    if current_user.role != 'admin':
+        abort(403)
+    contest = Contest.query.get_or_404(contest_id)
+    form = RejudgeForm()
+    if not form.validate_on_submit():
+        flash(f"Cannot start rejudge: {form.errors}", 'danger')
+        return redirect(url_for('admin.contest_details', contest_id=contest.id))
+
+    from judge.rejudge import start_rejudge
+    job = start_rejudge(contest_id=contest.id, statuses=form.statuses.data or [], created_by_id=current_user.id)
+    flash(f'Rejudging {job.total} submission(s) of "{contest.title}".', 'success')
+    return redirect(url_for('admin.rejudge_status', job_id=job.id))
+
+@bp.route('/rejudge/<int:job_id>')
+@login_required
+def rejudge_status(job_id):
+    if current_user.role != 'admin':
+        abort(403)
+    job = RejudgeJob.query.get_or_404(job_id)
+    progress = job.progress()
+    if request.args.get('format') == 'json':
+        return jsonify(id=job.id, **progress)
+    return render_template('admin/rejudge.html', job=job, progress=progress)
+
+@bp.route('/contest/<int:contest_id>/snapshots', methods=['GET', 'POST'])
+@login_required
+def snapshots(contest_id):
+    if current_user.role != 'admin':
+        abort(403)
+    contest = Contest.query.get_or_404(contest_id)
+    form = SnapshotForm()
+    if form.validate_on_submit():
+        as_of = form.as_of.data or datetime.now().astimezone()
+        snapshot = take(contest, as_of, label=form.label.data or None, created_by_id=current_user.id)
+        db.session.commit()
+        flash(f'Snapshot of {snapshot.participants} participant(s) taken.', 'success')
+        return redirect(url_for('admin.snapshots', contest_id=contest.id))
+    elif form.errors:
+        flash(f"Cannot take snapshot: {form.errors}", "danger")
+
+    taken = StandingsSnapshot.query.filter_by(contest_id=contest.id) \
+        .order_by(StandingsSnapshot.as_of.desc(), StandingsSnapshot.id.desc()).all()
+    return render_template('admin/snapshots.html', contest=contest, form=form, snapshots=taken)
+
+@bp.route('/contest/<int:contest_id>/snapshots/freeze', methods=['POST'])
+@login_required
+def retake_freeze(contest_id):
+    if current_user.role != 'admin':
+        abort(403)
+    contest = Contest.query.get_or_404(contest_id)
+    if contest.freeze_time is None:
+        flash('This contest has no freeze time.', 'warning')
+    elif SnapshotForm().validate_on_submit():
+        try:
+            take_freeze(contest, current_user.id)
+            db.session.commit()
+            flash('Freeze snapshot retaken.', 'success')
+        except IntegrityError:
+            db.session.rollback()
+            flash('The freeze snapshot was being taken at the same time; try again.', 'warning')
+    return redirect(url_for('admin.snapshots', contest_id=contest.id))
+
+@bp.route('/snapshot/<int:snapshot_id>/delete', methods=['POST'])
+@login_required
+def delete_snapshot(snapshot_id):
+    if current_user.role != 'admin':
+        abort(403)
+    snapshot = StandingsSnapshot.query.get_or_404(snapshot_id)
+    if SnapshotForm().validate_on_submit():
+        db.session.delete(snapshot)
+        db.session.commit()
+        flash('Snapshot deleted.', 'success')
+    return redirect(url_for('admin.snapshots', contest_id=snapshot.contest_id))
+
+@bp.route('/snapshot/<int:old_id>/diff/<int:new_id>')
+@login_required
+def snapshot_diff(old_id, new_id):
+    if current_user.role != 'admin':
+        abort(403)
+    old = StandingsSnapshot.query.get_or_404(old_id)
+    new = StandingsSnapshot.query.get_or_404(new_id)
+    if old.contest_id != new.contest_id:
+        abort(404)
+    changes = diff(old, new)
+    if request.args.get('format') == 'json':
+        return jsonify(old=old.id, new=new.id, changes=[{
+            'user': {'id': change['user'].id, 'username': change['user'].username},
+            'old_rank': change['old']['rank'] if change['old'] else None,
+            'new_rank': change['new']['rank'] if change['new'] else None,
+            'old_score': change['old']['total_score'] if change['old'] else None,
+            'new_score': change['new']['total_score'] if change['new'] else None,
+            'old_penalty': change['old']['penalty'] if change['old'] else None,
+            'new_penalty': change['new']['penalty'] if change['new'] else None,
+            'solved': change['solved'],
+        } for change in changes])
+    problems = old.contest.problems.order_by(Problem.id.asc()).all()
+    return render_template('admin/snapshot_diff.html', contest=old.contest, old=old, new=new, changes=changes,
+                           problem_index={problem.id: index for index, problem in enumerate(problems, 1)})
 
 @bp.route('/contest/<int:contest_id>/generate_credentials', methods=['GET', 'POST'])
 @login_required
@@ -298,6 +448,7 @@ def generate_credentials(contest_id):
         return render_template('admin/contest_details.html', contest=contest, datetime=datetime)
 
     participants = []
+    added = []
     try:
         for idx, participant in enumerate(json_data):
             username = participant.get('username')
@@ -319,9 +470,13 @@ def generate_credentials(contest_id):
             
             if user not in contest.participants:
                 contest.participants.append(user)
+                added.append(user)
             
             participants.append({'username': username, 'password': password, 'email': email, 'username': username})
         
+        for user in added:
+            update_score(contest.id, user.id)
+        contest.bump_standings_version()
         db.session.commit()
         
         # Send emails
@@ -389,44 +544,8 @@ def export_reports(contest_id):
     #     flash("Contest has not ended yet.", "warning")
     #     return redirect(url_for('admin.contest_details', contest_id=contest_id))
 
-    participants = contest.participants.all()
     problems = contest.problems.order_by(Problem.id.asc()).all()
-
-    leaderboard_data = []
-    for user in participants:
-        user_data = {
-            'user': user,
-            'problems': {},
-            'total_score': 0,
-            'total_time': 0
-        }
-
-        for problem in problems:
-            best_submission = Submission.query.filter_by(
-                user_id=user.id,
-                problem_id=problem.id,
-                status='Accepted'
-            ).order_by(
-                Submission.timestamp.asc(),
-                Submission.execution_time.asc()
-            ).first()
-
-            if best_submission:
-                user_data['problems'][problem.id] = {
-                    'time': best_submission.execution_time,
-                    'attempts': Submission.query.filter_by(
-                        user_id=user.id,
-                        problem_id=problem.id
-                    ).count()
-                }
-                user_data['total_score'] += 1
-                user_data['total_time'] += best_submission.execution_time
-            else:
-                user_data['problems'][problem.id] = None
-
-        leaderboard_data.append(user_data)
-
-    leaderboard_data.sort(key=lambda x: (-x['total_score'], x['total_time']))
+    chunk_size = current_app.config['LEADERBOARD_EXPORT_CHUNK_SIZE']
 
     # Output folder
     reports_dir = os.path.join(current_app.root_path, 'static')
@@ -437,8 +556,8 @@ def export_reports(contest_id):
         pdf_path = os.path.join(reports_dir, f"contest_{contest.id}/leaderboard.pdf")
         excel_path = os.path.join(reports_dir, f"contest_{contest.id}/leaderboard.xlsx")
 
-        generate_leaderboard_pdf(pdf_path, contest, problems, leaderboard_data)
-        generate_leaderboard_excel(excel_path, contest, problems, leaderboard_data)
+        generate_leaderboard_pdf(pdf_path, contest, problems, iter_standings(contest, problems, chunk_size))
+        generate_leaderboard_excel(excel_path, contest, problems, iter_standings(contest, problems, chunk_size))
 
         flash("PDF and Excel reports generated successfully.", "success")
     except Exception as e:
@@ -446,5 +565,14 @@ def export_reports(contest_id):
     
     return redirect(url_for('admin.contest_details', contest_id=contest.id))
 
-
-
+@bp.route('/contest/<int:contest_id>/leaderboard.csv')
+@login_required
+def export_csv(contest_id):
+    """The live leaderboard as CSV, streamed as it is read"""
+    if current_user.role != 'admin':
+        abort(403)
+    contest = Contest.query.get_or_404(contest_id)
+    problems = contest.problems.order_by(Problem.id.asc()).all()
+    rows = iter_standings(contest, problems, current_app.config['LEADERBOARD_EXPORT_CHUNK_SIZE'])
+    return Response(stream_with_context(leaderboard_csv(problems, rows)), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename=contest_{contest.id}_leaderboard.csv'})
@@ -0,0 +1,214 @@
+"""Shared cache for pages that are expensive to compute and change rarely.
+
+Values are bytes kept in a backend chosen with CACHE_BACKEND:
+
+    memory        a per-process LRU dictionary (the default)
+    filesystem    files under CACHE_DIR, shared by every web worker on the host
+    module:attr   any other backend, e.g. one on Redis; `attr` is called
+                  with the app and returns an object with the methods of
+                  MemoryBackend
+
+get_or_compute() lets one caller at a time compute a missing value
+(single flight). Its lock is an entry added only if absent, so it works
+across processes wherever the backend is shared. The others get the last
+value computed for the same slot while they wait, or wait for the new one
+if there is none.
+"""
+import importlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = 0.05
+
+
+class MemoryBackend:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (value, expires_at or None)
+        self.lock = threading.Lock()
+
+    def _live(self, key, now):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= now:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            entry = self._live(key, time.monotonic())
+            return entry[0] if entry else None
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl if ttl else None)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        """Set `key` only if it is absent; True if it was set"""
+        with self.lock:
+            now = time.monotonic()
+            if self._live(key, now) is not None:
+                return False
+            self.entries[key] = (value, now + ttl if ttl else None)
+            return True
+
+    def delete(self, key: str):
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+class FileBackend:
+    """Entries as files in one directory; every process pointed at it shares them"""
+
+    PRUNE_EVERY = 64  # writes between sweeps of expired and surplus entries
+
+    def __init__(self, directory: str, max_entries: int):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key.replace('/', '_'))
+
+    def _read(self, path):
+        try:
+            with open(path, 'rb') as f:
+                expires_at, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if expires_at is not None and expires_at <= time.time():
+            return None
+        return value
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._read(self._path(key))
+
+    def _write(self, value: bytes, ttl: Optional[float]) -> str:
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((time.time() + ttl if ttl else None, value), f)
+        return temp_path
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        os.replace(self._write(value, ttl), self._path(key))
+        self.writes += 1
+        if self.writes % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self):
+        """Remove expired entries, then the least recently written beyond max_entries"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith('.tmp-'):
+                continue
+            if self._read(entry.path) is None:
+                self._unlink(entry.path)
+                continue
+            try:
+                entries.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                continue
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_entries)]:
+            self._unlink(path)
+
+    @staticmethod
+    def _unlink(path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        path = self._path(key)
+        temp_path = self._write(value, ttl)
+        try:
+            if os.path.exists(path) and self._read(path) is None:
+                # Expired: whoever removes it first may take the key
+                self._unlink(path)
+            try:
+                # link() fails if the key exists, so only one process adds it
+                os.link(temp_path, path)
+                return True
+            except FileExistsError:
+                return False
+        finally:
+            os.unlink(temp_path)
+
+    def delete(self, key: str):
+        self._unlink(self._path(key))
+
+
+def create_backend(app):
+    name = app.config['CACHE_BACKEND']
+    if name == 'memory':
+        return MemoryBackend(app.config['CACHE_MAX_ENTRIES'])
+    if name == 'filesystem':
+        return FileBackend(app.config['CACHE_DIR'], app.config['CACHE_MAX_ENTRIES'])
+    module, _, attr = name.partition(':')
+    if not attr:
+        raise ValueError(f"Unknown CACHE_BACKEND {name!r}")
+    return getattr(importlib.import_module(module), attr)(app)
+
+
+def get_cache(app):
+    """The app's cache backend, created on first use"""
+    backend = app.extensions.get('logicomp_cache')
+    if backend is None:
+        backend = app.extensions.setdefault('logicomp_cache', create_backend(app))
+    return backend
+
+
+def get_or_compute(backend, key: str, stale_key: str, compute: Callable[[], bytes],
+                   ttl: Optional[float], lock_seconds: float) -> bytes:
+    """The value of `key`, computed by one caller at a time
+
+    A computed value is also stored under `stale_key`, which callers
+    waiting on another computation get instead. A lock left behind by a
+    crashed caller expires after `lock_seconds`. After that, waiters
+    compute the value themselves.
+    """
+    value = backend.get(key)
+    if value is not None:
+        return value
+    lock_key = f"{key}:lock"
+    if backend.add(lock_key, b'1', lock_seconds):
+        try:
+            value = compute()
+            backend.set(key, value, ttl)
+            backend.set(stale_key, value, ttl)
+            return value
+        finally:
+            backend.delete(lock_key)
+
+    stale = backend.get(stale_key)
+    if stale is not None:
+        return stale
+    deadline = time.monotonic() + lock_seconds
+    while time.monotonic() < deadline:
+        time.sleep(POLL_SECONDS)
+        value = backend.get(key)
+        if value is not None:
+            return value
+        if backend.get(lock_key) is None:
+            break
+    value = backend.get(key)
+    if value is not None:
+        return value
+    logger.warning("No value for cache key %s after waiting; computing it here", key)
+    return compute()
@@ -0,0 +1,101 @@
+import click
+from flask import current_app
+
+
+def register_commands(app):
+    @app.cli.command('judge-worker')
+    @click.option('--concurrency', '-c', type=int, default=None,
+                  help='Number of worker processes (defaults to JUDGE_WORKER_CONCURRENCY).')
+    @click.option('--node-name', default=None,
+                  help='Name of this judge node (defaults to JUDGE_NODE_NAME, then the hostname).')
+    def judge_worker(concurrency, node_name):
+        """Run a judge node: a worker pool that drains pending submissions."""
+        from judge.log import configure_logging
+        from judge.worker import run_worker_pool
+
+        config = current_app.config
+        concurrency = concurrency or config['JUDGE_WORKER_CONCURRENCY']
+        if concurrency < 1:
+            raise click.BadParameter('concurrency must be at least 1')
+        configure_logging(config['JUDGE_LOG_LEVEL'], config['JUDGE_LOG_RATE_PER_MINUTE'])
+        node_name = node_name or config['JUDGE_NODE_NAME']
+        click.echo(f"Starting judge node {node_name} with {concurrency} worker(s)")
+        run_worker_pool(concurrency, node_name, config)
+
+    @app.cli.command('testdata-gc')
+    @click.option('--min-age', type=float, default=3600,
+                  help='Keep unreferenced blobs younger than this many seconds.')
+    def testdata_gc(min_age):
+        """Delete test data blobs no test case refers to any more."""
+        from app.models import TestCase
+        from app.testdata import get_store
+
+        referenced = set()
+        for input_hash, output_hash in TestCase.query.with_entities(TestCase.input_hash, TestCase.output_hash):
+            referenced.update((input_hash, output_hash))
+        removed = get_store().collect_garbage(referenced, min_age)
+        click.echo(f"Removed {removed} unreferenced blob(s)")
+
+    @app.cli.command('rejudge')
+    @click.option('--problem', 'problem_id', type=int, help='Rejudge submissions of this problem.')
+    @click.option('--contest', 'contest_id', type=int, help='Rejudge submissions of this contest.')
+    @click.option('--status', 'statuses', multiple=True,
+                  help='Only submissions with this status (repeatable; default: all judged submissions).')
+    @click.option('--wait/--no-wait', default=False, help='Follow progress until the rejudge has finished.')
+    def rejudge(problem_id, contest_id, statuses, wait):
+        """Queue a bulk rejudge behind live submissions."""
+        import time
+        from judge.rejudge import start_rejudge
+
+        if problem_id is None and contest_id is None:
+            raise click.UsageError('pass --problem and/or --contest')
+        job = start_rejudge(problem_id=problem_id, contest_id=contest_id, statuses=statuses)
+        click.echo(f"Rejudge {job.id}: {job.total} submission(s) queued")
+
+        while wait:
+            progress = job.progress()
+            click.echo(f"  {progress['done']}/{progress['total']} done ({progress['percent']}%)")
+            if progress['finished']:
+                break
+            time.sleep(2)
+
+    @app.cli.command('standings-rebuild')
+    @click.option('--contest', 'contest_id', type=int, help='Only this contest (default: every contest).')
+    def standings_rebuild(contest_id):
+        """Recompute contest standings from the submissions table."""
+        from app import db
+        from app.models import Contest
+        from app.standings import rebuild
+
+        if contest_id is not None:
+            contest = db.session.get(Contest, contest_id)
+            if contest is None:
+                raise click.BadParameter(f'no contest {contest_id}', param_hint='--contest')
+            contests = [contest]
+        else:
+            contests = Contest.query.order_by(Contest.id).all()
+        for contest in contests:
+            rows = rebuild(contest)
+            db.session.commit()
+            click.echo(f"Contest {contest.id}: {rows} standing row(s)")
+
+    @app.cli.command('standings-snapshot')
+    @click.option('--contest', 'contest_id', type=int, required=True, help='Snapshot this contest.')
+    @click.option('--at', 'as_of', type=click.DateTime(), default=None,
+                  help='Count submissions made before this time, in UTC (default: now).')
+    @click.option('--label', default=None, help='Label shown in the admin panel.')
+    def standings_snapshot(contest_id, as_of, label):
+        """Store the standings of a contest as of a point in time."""
+        from datetime import datetime, timezone
+        from app import db
+        from app.models import Contest
+        from app.snapshots import take
+
+        contest = db.session.get(Contest, contest_id)
+        if contest is None:
+            raise click.BadParameter(f'no contest {contest_id}', param_hint='--contest')
+        as_of = as_of.replace(tzinfo=timezone.utc) if as_of else datetime.now(timezone.utc)
+        snapshot = take(contest, as_of, label=label)
+        db.session.commit()
+        click.echo(f"Snapshot {snapshot.id}: {snapshot.participants} participant(s), "
+                   f"{snapshot.pending} submission(s) still unjudged")
@@ -1,8 +1,14 @@
-from flask import render_template, redirect, url_for, flash, abort, request, current_app
+import functools
+import hashlib
+import math
+from flask import render_template, redirect, url_for, flash, abort, request, current_app, make_response, session, jsonify
 from flask_login import login_required, current_user
 from app import db
 from app.contest import bp
-from app.models import Contest, Problem, Submission, User
+from app.models import Contest, Problem, StandingsSnapshot, Submission, User
+from app.snapshots import FREEZE, freeze_snapshot, snapshot_page, snapshot_rank
+from app.standings import cached_page, rank_of
+from app.timeutil import as_utc
 from datetime import datetime
 
 @bp.route('/')
@@ -64,70 +70,186 @@ def problem_view(contest_id, problem_id):
 @bp.route('/<int:contest_id>/leaderboard')
 @login_required
 def leaderboard(contest_id):
-    contest = Contest.query.get_or_404(contest_id)
+    contest = _leaderboard_contest(contest_id)
+    page, per_page = _page_args()
+    snapshot = _shown_snapshot(contest)
 
-    # Access control: only public contests or registered participants
-    if not contest.is_public and current_user not in contest.participants:
-        abort(403)
+    # Nothing on the page changes until the standings version does
+    etag = _leaderboard_etag('html', contest.id, _version(contest, snapshot), page, per_page)
+    if _client_has(etag):
+        return _not_modified(etag)
 
-    participants = contest.participants.all()
     problems = contest.problems.order_by(Problem.id.asc()).all()
+    version, standings = _standings(contest, problems, snapshot, page, per_page)
+    if page > standings.pages:
+        abort(404)
+    etag = _leaderboard_etag('html', contest.id, version, page, per_page)
+    if _client_has(etag):
+        return _not_modified(etag)
 
-    leaderboard_data = []
-
-    for user in participants:
-        user_data = {
-            'user': user,
-            'problems': {},
-            'timestamp': None,
-            'total_score': 0,
-            'total_time': 0,
-            'submissions_count': 0
-        }
-
-        latest_timestamp = None
-
-        for problem in problems:
-            submissions = Submission.query.filter_by(
-                user_id=user.id,
-                problem_id=problem.id
-            ).order_by(Submission.timestamp.asc()).all()
-
-            submission_count = len(submissions)
-            user_data['submissions_count'] += submission_count
-
-            accepted_submission = next((s for s in submissions if s.status == 'Accepted'), None)
-
-            if accepted_submission:
-                user_data['problems'][problem.id] = {
-                    'is_accepted': True,
-                    'time': accepted_submission.execution_time,
-                    'attempts': submission_count,
-                    'status': accepted_submission.status
-                }
-                user_data['total_score'] += 1
-                user_data['total_time'] += accepted_submission.execution_time
-
-                if not latest_timestamp or accepted_submission.timestamp > latest_timestamp:
-                    latest_timestamp = accepted_submission.timestamp
-            elif submission_count > 0:
-                user_data['problems'][problem.id] = {
-                    'is_accepted': False,
-                    'attempts': submission_count
-                }
-            else:
-                # No submission
-                user_data['problems'][problem.id] = None
-
-        user_data['timestamp'] = latest_timestamp
-        leaderboard_data.append(user_data)
-
-    # Sort: highest score first, then earliest timestamp, then lowest total_time
-    leaderboard_data.sort(key=lambda x: (-x['total_score'], x['timestamp'] or datetime.max, x['total_time']))
-
-    return render_template(
+    response = make_response(render_template(
         'contest/leaderboard.html',
         contest=contest,
         problems=problems,
-        leaderboard=leaderboard_data
+        leaderboard=standings.rows,
+        standings=standings,
+        snapshot=snapshot,
+        view_args=_view_args()
+    ))
+    return _with_etag(response, etag)
+
+@bp.route('/<int:contest_id>/leaderboard.json')
+@login_required
+def leaderboard_json(contest_id):
+    contest = _leaderboard_contest(contest_id)
+    page, per_page = _page_args()
+    snapshot = _shown_snapshot(contest)
+
+    etag = _leaderboard_etag('json', contest.id, _version(contest, snapshot), page, per_page)
+    if _client_has(etag):
+        return _not_modified(etag)
+
+    problems = contest.problems.order_by(Problem.id.asc()).all()
+    version, standings = _standings(contest, problems, snapshot, page, per_page)
+    if page > standings.pages:
+        abort(404)
+    etag = _leaderboard_etag('json', contest.id, version, page, per_page)
+    if _client_has(etag):
+        return _not_modified(etag)
+
+    response = jsonify(
+        contest={'id': contest.id, 'title': contest.title},
+        version=version,
+        frozen=snapshot is not None and snapshot.kind == FREEZE,
+        as_of=as_utc(snapshot.as_of).isoformat() if snapshot else None,
+        page=standings.page,
+        per_page=standings.per_page,
+        pages=standings.pages,
+        total=standings.total,
+        problems=[{'id': problem.id, 'index': index, 'title': problem.title}
+                  for index, problem in enumerate(problems, 1)],
+        rows=[_row_json(row, problems) for row in standings.rows]
     )
+    return _with_etag(response, etag)
+
+@bp.route('/<int:contest_id>/leaderboard/me')
+@login_required
+def leaderboard_me(contest_id):
+    """Redirect to the leaderboard page holding the current user's row"""
+    contest = _leaderboard_contest(contest_id)
+    _, per_page = _page_args()
+    rank = _rank(contest, _shown_snapshot(contest), current_user.id)
+    if rank is None:
+        flash("You are not ranked in this contest.", "info")
+        return redirect(url_for('contest.leaderboard', contest_id=contest.id, **_view_args()))
+    return redirect(url_for('contest.leaderboard', contest_id=contest.id, page=(rank - 1) // per_page + 1,
+                            _anchor=f'participant-{current_user.id}', **_view_args()))
+
+@bp.route('/<int:contest_id>/leaderboard/me.json')
+@login_required
+def leaderboard_me_json(contest_id):
+    contest = _leaderboard_contest(contest_id)
+    _, per_page = _page_args()
+    rank = _rank(contest, _shown_snapshot(contest), current_user.id)
+    return jsonify(
+        rank=rank,
+        page=(rank - 1) // per_page + 1 if rank else None,
+        per_page=per_page
+    )
+
+def _leaderboard_contest(contest_id):
+    contest = Contest.query.get_or_404(contest_id)
+    # Access control: only public contests or registered participants
+    if not contest.is_public and contest.participants.filter(User.id == current_user.id).first() is None:
+        abort(403)
+    return contest
+
+def _shown_snapshot(contest):
+    """The snapshot the leaderboard shows this user, or None for live standings
+
+    Admins see live standings, or the snapshot given as ?snapshot=ID, or
+    the public view with ?frozen=1. A frozen board whose snapshot the judge
+    supervisor has not taken yet is 503: live standings must not show.
+    """
+    if current_user.role == 'admin':
+        snapshot_id = request.args.get('snapshot', type=int)
+        if snapshot_id is not None:
+            return StandingsSnapshot.query.filter_by(id=snapshot_id, contest_id=contest.id).first_or_404()
+        if not request.args.get('frozen', type=int):
+            return None
+    if not contest.is_frozen():
+        return None
+    snapshot = freeze_snapshot(contest)
+    if snapshot is None:
+        abort(503, description='The leaderboard is being frozen. Try again in a few seconds.',
+              retry_after=math.ceil(current_app.config['JUDGE_HEARTBEAT_SECONDS']))
+    return snapshot
+
+def _version(contest, snapshot):
+    return f"snapshot-{snapshot.id}" if snapshot else contest.standings_version
+
+def _standings(contest, problems, snapshot, page, per_page):
+    if snapshot is None:
+        return cached_page(contest, problems, page, per_page)
+    return _version(contest, snapshot), snapshot_page(snapshot, page, per_page)
+
+def _rank(contest, snapshot, user_id):
+    return snapshot_rank(snapshot, user_id) if snapshot else rank_of(contest.id, user_id)
+
+def _view_args():
+    """Query arguments that leaderboard links keep"""
+    return {name: request.args[name] for name in ('per_page', 'snapshot', 'frozen') if name in request.args}
+
+def _page_args():
+    config = current_app.config
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('per_page', config['LEADERBOARD_PAGE_SIZE'], type=int),
+                   config['LEADERBOARD_MAX_PAGE_SIZE'])
+    if page < 1 or per_page < 1:
+        abort(404)
+    return page, per_page
+
+def _row_json(row, problems):
+    cells = []
+    for problem in problems:
+        result = row['problems'].get(problem.id)
+        if result is None:
+            cells.append(None)
+        else:
+            cells.append({'accepted': result['is_accepted'], 'attempts': result['attempts'],
+                          'time': result.get('time')})
+    return {
+        'rank': row['rank'],
+        'user': {'id': row['user'].id, 'username': row['user'].username},
+        'score': row['total_score'],
+        'total_time': row['total_time'],
+        'penalty': row['penalty'],
+        'last_accepted_at': as_utc(row['timestamp']).isoformat() if row['timestamp'] else None,
+        'attempts': row['submissions_count'],
+        'problems': cells,
+    }
+
+def _leaderboard_etag(kind, contest_id, version, page, per_page):
+    # Pages also show who is logged in and whether the board is frozen, and change with the templates
+    frozen = db.session.get(Contest, contest_id).is_frozen()
+    key = (f"{kind}:{contest_id}:{version}:{frozen}:{page}:{per_page}:{current_user.id}:{current_user.role}:"
+           f"{_template_digest()}")
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+@functools.lru_cache(maxsize=1)
+def _template_digest():
+    env = current_app.jinja_env
+    sources = (env.loader.get_source(env, name)[0] for name in ('base.html', 'contest/leaderboard.html'))
+    return hashlib.sha256(''.join(sources).encode()).hexdigest()
+
+def _client_has(etag):
+    # A pending flash message must still be shown
+    return request.if_none_match.contains(etag) and not session.get('_flashes')
+
+def _with_etag(response, etag):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _not_modified(etag):
+    return _with_etag(current_app.response_class(status=304), etag)
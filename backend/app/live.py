@@ -0,0 +1,176 @@
+"""Live submission status as Server-Sent Events.
+
+An open submission page holds one /submission/<id>/events connection
+instead of being reloaded. One background thread per web process polls
+the database every LIVE_POLL_INTERVAL seconds for every submission that
+has an open stream, using two queries per tick however many streams
+are open. It then wakes the streams, and each one sends only what
+changed for its submission:
+
+    event: test     {"index", "verdict", "time", "memory_kb"}  as tests finish
+    event: status   {"status", "time", "memory_kb", "error"}  on every status change
+    event: done     once the verdict is final; the stream then ends
+
+Per-test rows come from the judge's progress writer (judge/progress.py)
+while the submission runs, then from the final verdict.
+"""
+import json
+import threading
+import time
+from collections import Counter
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from app import db
+from app.models import Submission, SubmissionTestResult
+from judge.job_queue import PENDING
+
+HEARTBEAT_SECONDS = 15
+
+
+class SubmissionState(NamedTuple):
+    status: str
+    execution_time: Optional[float]
+    memory_used: Optional[int]
+    error_message: Optional[str]
+    tests: Tuple[Tuple[int, str, Optional[float], Optional[int]], ...]  # (index, verdict, time, memory_kb)
+
+
+class SubmissionHub:
+    """Shared poller behind every event stream of a web process"""
+
+    def __init__(self, app, interval: float):
+        self.app = app
+        self.interval = interval
+        self.watchers = Counter()
+        self.states: Dict[int, SubmissionState] = {}
+        self.version = 0
+        self.changed = threading.Condition()
+        self.wake = threading.Event()
+        self.thread = None
+
+    def watch(self, submission_id: int):
+        with self.changed:
+            self.watchers[submission_id] += 1
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='live-submissions', daemon=True)
+                self.thread.start()
+        self.wake.set()
+
+    def unwatch(self, submission_id: int):
+        with self.changed:
+            self.watchers[submission_id] -= 1
+            if self.watchers[submission_id] <= 0:
+                del self.watchers[submission_id]
+                self.states.pop(submission_id, None)
+
+    def wait(self, version: int, timeout: float) -> int:
+        """Block until a poll newer than `version` or `timeout`; returns the current version"""
+        with self.changed:
+            self.changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def state(self, submission_id: int) -> Optional[SubmissionState]:
+        with self.changed:
+            return self.states.get(submission_id)
+
+    def _poll(self, ids) -> Dict[int, SubmissionState]:
+        tests = {submission_id: [] for submission_id in ids}
+        rows = (
+            db.session.query(SubmissionTestResult.submission_id, SubmissionTestResult.test_index,
+                             SubmissionTestResult.verdict, SubmissionTestResult.execution_time,
+                             SubmissionTestResult.memory_kb)
+            .filter(SubmissionTestResult.submission_id.in_(ids))
+            .order_by(SubmissionTestResult.submission_id, SubmissionTestResult.test_index)
+        )
+        for submission_id, *test in rows:
+            tests[submission_id].append(tuple(test))
+        submissions = (
+            db.session.query(Submission.id, Submission.status, Submission.execution_time,
+                             Submission.memory_used, Submission.error_message)
+            .filter(Submission.id.in_(ids))
+        )
+        return {
+            submission_id: SubmissionState(*fields, tuple(tests[submission_id]))
+            for submission_id, *fields in submissions
+        }
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                self.wake.wait(self.interval)
+                self.wake.clear()
+                with self.changed:
+                    ids = list(self.watchers)
+                if not ids:
+                    continue
+                try:
+                    states = self._poll(ids)
+                except Exception:
+                    self.app.logger.exception("Polling live submissions failed")
+                    states = {}
+                finally:
+                    # Hand the connection back between ticks
+                    db.session.remove()
+                with self.changed:
+                    for submission_id in ids:
+                        if submission_id in self.watchers and submission_id in states:
+                            self.states[submission_id] = states[submission_id]
+                    self.version += 1
+                    self.changed.notify_all()
+
+
+_hub: Optional[SubmissionHub] = None
+_hub_lock = threading.Lock()
+
+
+def get_hub(app) -> SubmissionHub:
+    global _hub
+    with _hub_lock:
+        if _hub is None or _hub.app is not app:
+            _hub = SubmissionHub(app, app.config['LIVE_POLL_INTERVAL'])
+        return _hub
+
+
+def _event(name: str, data: dict) -> str:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream(hub: SubmissionHub, submission_id: int, max_seconds: float):
+    """Generator of SSE messages for one submission page"""
+    hub.watch(submission_id)
+    try:
+        yield "retry: 3000\n\n"
+        deadline = time.monotonic() + max_seconds
+        version = -1
+        sent_tests = {}
+        sent_status = None
+        last_sent = time.monotonic()
+        while time.monotonic() < deadline:
+            version = hub.wait(version, HEARTBEAT_SECONDS)
+            state = hub.state(submission_id)
+            if state is None:
+                continue
+            messages = []
+            for index, verdict, exec_time, memory_kb in state.tests:
+                if sent_tests.get(index) != (verdict, exec_time, memory_kb):
+                    sent_tests[index] = (verdict, exec_time, memory_kb)
+                    messages.append(_event('test', {'index': index, 'verdict': verdict,
+                                                    'time': exec_time, 'memory_kb': memory_kb}))
+            status = (state.status, state.execution_time, state.memory_used, state.error_message)
+            if status != sent_status:
+                sent_status = status
+                messages.append(_event('status', {'status': state.status, 'time': state.execution_time,
+                                                  'memory_kb': state.memory_used, 'error': state.error_message}))
+            if state.status != PENDING:
+                messages.append(_event('done', {}))
+            if messages:
+                yield ''.join(messages)
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= HEARTBEAT_SECONDS:
+                # Keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            if state.status != PENDING:
+                return
+    finally:
+        hub.unwatch(submission_id)
@@ -1,4 +1,6 @@
-from flask import render_template, redirect, url_for
+import hmac
+import re
+from flask import Response, abort, current_app, render_template, redirect, request, send_file, url_for
 from flask_login import current_user
 from datetime import datetime
 from app.main import bp
@@ -20,4 +22,46 @@ def index():
 
 @bp.route('/about')
 def about():
-    return render_template('main/about.html')
\ No newline at end of file
+    return render_template('main/about.html')
+
+def _has_bearer(token):
+    return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+
+
+@bp.route('/metrics')
+def metrics():
+    """Judge metrics in Prometheus text format"""
+    from judge import metrics as judge_metrics
+    from judge.job_queue import in_flight, queue_depth
+    from judge.nodes import live_nodes
+
+    token = current_app.config['JUDGE_METRICS_TOKEN']
+    if token and not _has_bearer(token):
+        abort(403)
+
+    registry = judge_metrics.collect(current_app.config['JUDGE_METRICS_DIR'])
+    registry.set('judge_queue_depth', queue_depth())
+    registry.set('judge_in_flight', in_flight())
+    registry.set('judge_nodes', live_nodes(3 * current_app.config['JUDGE_HEARTBEAT_SECONDS']))
+    return Response(judge_metrics.render(registry), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@bp.route('/internal/testdata/<digest>')
+def internal_testdata(digest):
+    """Test data blobs for remote judge nodes; disabled unless JUDGE_NODE_TOKEN is set"""
+    from app.testdata import get_store
+
+    token = current_app.config['JUDGE_NODE_TOKEN']
+    if not token:
+        abort(404)
+    if not _has_bearer(token):
+        abort(403)
+    if not re.fullmatch(r'[0-9a-f]{64}', digest):
+        abort(404)
+    store = get_store()
+    if not store.exists(digest):
+        abort(404)
+    response = send_file(store.path(digest), mimetype='application/octet-stream')
+    # Hidden test data: shared caches and proxies must not keep a copy
+    response.headers['Cache-Control'] = 'private, no-store'
+    return response
@@ -4,6 +4,7 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from app import db, login
 from sqlalchemy.orm import validates
 from sqlalchemy import Index
+from app.timeutil import as_utc
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -54,16 +55,33 @@ class Contest(db.Model):
     problems = db.relationship('Problem', backref='contest', lazy='dynamic', cascade='all, delete-orphan')
     participants = db.relationship('User', secondary='contest_participants', lazy='dynamic')
     participants_folder = db.Column(db.String(256), nullable=True)
+    toolchain_profile = db.Column(db.String(32), nullable=True)  # None: JUDGE_DEFAULT_TOOLCHAIN_PROFILE
+    # Bumped whenever the leaderboard may change: verdicts, participants, problems, contest edits
+    standings_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # The public leaderboard shows the standings as of freeze_time until unfreeze_time (None: until
+    # an admin sets one); see app.snapshots
+    freeze_time = db.Column(db.DateTime(timezone=True), nullable=True)
+    unfreeze_time = db.Column(db.DateTime(timezone=True), nullable=True)
     
     __table_args__ = (
         Index('ix_contest_time_range', 'start_time', 'end_time'),
         Index('ix_contest_active_public', 'is_public', 'start_time', 'end_time'),
     )
     
+    def bump_standings_version(self):
+        self.standings_version = Contest.standings_version + 1  # in SQL, so concurrent bumps all count
+
     def is_active(self):
         now = datetime.now(timezone.utc)  # Fixed: Compare with UTC
         return self.start_time <= now <= self.end_time  # Now safe (both timezone-aware)
 
+    def is_frozen(self, now=None):
+        """Whether the public leaderboard shows the freeze snapshot instead of live standings"""
+        if self.freeze_time is None:
+            return False
+        now = now or datetime.now(timezone.utc)
+        return as_utc(self.freeze_time) <= now and (self.unfreeze_time is None or now < as_utc(self.unfreeze_time))
+
 class Problem(db.Model):
     __tablename__ = 'problems'
     
@@ -72,6 +90,12 @@ class Problem(db.Model):
     title = db.Column(db.String(128))
     description = db.Column(db.Text)
     time_limit = db.Column(db.Integer)
+    max_parallel_tests = db.Column(db.Integer, nullable=True)  # None: use the judge worker's cap
+    memory_limit = db.Column(db.Integer, nullable=True)  # MB; None: JUDGE_DEFAULT_MEMORY_LIMIT_MB
+    # Bumped on every edit of the statement, limits or tests; judge caches key on it
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # Identical resubmissions get the earlier verdict; turn off where timing noise matters
+    reuse_verdicts = db.Column(db.Boolean, nullable=False, default=True, server_default=db.true())
     expected_input = db.Column(db.Text)
     expected_output = db.Column(db.Text)
     submissions = db.relationship('Submission', backref='problem', lazy='dynamic', cascade='all, delete-orphan')
@@ -88,14 +112,30 @@ class Submission(db.Model):
     language = db.Column(db.String(20))
     timestamp = db.Column(db.DateTime(timezone=True), index=True, default=lambda: datetime.now(timezone.utc))  # Fixed: UTC by default
     status = db.Column(db.String(50), index=True)
-    execution_time = db.Column(db.Float)
+    execution_time = db.Column(db.Float)  # peak CPU seconds over the tests that ran
+    memory_used = db.Column(db.Integer)  # peak RSS in KB over the tests that ran
     error_message = db.Column(db.Text)
+    claimed_by = db.Column(db.String(128), index=True)  # judge worker currently holding the lease
+    claimed_at = db.Column(db.DateTime(timezone=True))
+    lease_expires_at = db.Column(db.DateTime(timezone=True))
+    judge_attempts = db.Column(db.Integer, default=0, nullable=False)
+    priority = db.Column(db.Integer, default=0, nullable=False)  # lower is judged first; rejudges sit behind live work
+    rejudge_job_id = db.Column(db.Integer, db.ForeignKey('rejudge_jobs.id', ondelete='SET NULL'), index=True)  # latest
+    queued_at = db.Column(db.DateTime(timezone=True))  # last time it was put on the judge queue
+    queue_wait = db.Column(db.Float)  # seconds from queued_at until a worker claimed it
+    code_hash = db.Column(db.String(64))  # sha256 of the normalized code, see judge.verdict_reuse
+    test_version = db.Column(db.Integer)  # Problem.version the current verdict was judged against
+    reused_from_id = db.Column(db.Integer, db.ForeignKey('submissions.id', ondelete='SET NULL'))
+    test_results = db.relationship('SubmissionTestResult', backref='submission', lazy='dynamic',
+                                   cascade='all, delete-orphan', order_by='SubmissionTestResult.test_index')
     
     __table_args__ = (
         Index('ix_submission_user_contest', 'user_id', 'contest_id'),
         Index('ix_submission_problem_status', 'problem_id', 'status'),
         Index('ix_submission_contest_timestamp', 'contest_id', 'timestamp'),
         Index('ix_submission_user_timestamp', 'user_id', 'timestamp'),
+        Index('ix_submission_queue', 'status', 'priority', 'lease_expires_at'),
+        Index('ix_submission_verdict_reuse', 'problem_id', 'language', 'code_hash', 'test_version'),
     )
     
     @validates('execution_time')
@@ -106,7 +146,8 @@ class Submission(db.Model):
 
 contest_participants = db.Table('contest_participants',
     db.Column('contest_id', db.Integer, db.ForeignKey('contests.id', ondelete='CASCADE')),
-    db.Column('user_id', db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'))
+    db.Column('user_id', db.Integer, db.ForeignKey('users.id', ondelete='CASCADE')),
+    Index('ix_contest_participants_contest_user', 'contest_id', 'user_id')
 )
 
 class TestCase(db.Model):
@@ -114,10 +155,159 @@ class TestCase(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     problem_id = db.Column(db.Integer, db.ForeignKey('problems.id', ondelete='CASCADE'), nullable=False)
-    expected_input = db.Column(db.Text, nullable=False)
-    expected_output = db.Column(db.Text, nullable=False)
+    # Test data lives in the blob store (app.testdata) under its sha256
+    input_hash = db.Column(db.String(64), nullable=False)
+    input_size = db.Column(db.BigInteger, nullable=False)
+    output_hash = db.Column(db.String(64), nullable=False)
+    output_size = db.Column(db.BigInteger, nullable=False)
     is_sample = db.Column(db.Boolean, default=False, index=True)
 
+    def set_data(self, expected_input, expected_output):
+        """Store input and expected output in the blob store and point at them"""
+        from app.testdata import get_store
+        store = get_store()
+        self.input_hash, self.input_size = store.put(expected_input)
+        self.output_hash, self.output_size = store.put(expected_output)
+
+    @property
+    def expected_input(self) -> str:
+        from app.testdata import get_store
+        return get_store().read_text(self.input_hash)
+
+    @property
+    def expected_output(self) -> str:
+        from app.testdata import get_store
+        return get_store().read_text(self.output_hash)
+
+class SubmissionTestResult(db.Model):
+    __tablename__ = 'submission_test_results'
+
+    id = db.Column(db.Integer, primary_key=True)
+    submission_id = db.Column(db.Integer, db.ForeignKey('submissions.id', ondelete='CASCADE'), nullable=False, index=True)
+    test_case_id = db.Column(db.Integer, db.ForeignKey('test_cases.id', ondelete='SET NULL'), nullable=True)
+    test_index = db.Column(db.Integer, nullable=False)  # 1-based, as in "Error in test case {i}"
+    verdict = db.Column(db.String(50), nullable=False)
+    execution_time = db.Column(db.Float)  # CPU seconds
+    wall_time = db.Column(db.Float)
+    memory_kb = db.Column(db.Integer)  # peak RSS
+
+class ContestStanding(db.Model):
+    """One participant's judged result on one problem; maintained by app.standings"""
+    __tablename__ = 'contest_standings'
+
+    id = db.Column(db.Integer, primary_key=True)
+    contest_id = db.Column(db.Integer, db.ForeignKey('contests.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    problem_id = db.Column(db.Integer, db.ForeignKey('problems.id', ondelete='CASCADE'), nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)  # judged submissions
+    rejected_before_ac = db.Column(db.Integer, nullable=False, default=0)
+    accepted_at = db.Column(db.DateTime(timezone=True))  # first Accepted submission; None while unsolved
+    accepted_time = db.Column(db.Float)  # its execution time
+    best_time = db.Column(db.Float)  # fastest Accepted submission
+    penalty = db.Column(db.Integer)  # minutes: solve time plus STANDINGS_PENALTY_MINUTES per rejection
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'problem_id', name='uq_contest_standings_user_problem'),
+        Index('ix_contest_standings_contest_user', 'contest_id', 'user_id'),
+    )
+
+class ContestScore(db.Model):
+    """A participant's totals over a contest's problems; one row per participant, see app.standings"""
+    __tablename__ = 'contest_scores'
+
+    id = db.Column(db.Integer, primary_key=True)
+    contest_id = db.Column(db.Integer, db.ForeignKey('contests.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    score = db.Column(db.Integer, nullable=False, default=0)  # problems solved
+    last_accepted_at = db.Column(db.DateTime(timezone=True))  # latest first-Accepted time; None until a solve
+    total_time = db.Column(db.Float, nullable=False, default=0)  # execution time of the first Accepted runs
+    penalty = db.Column(db.Integer, nullable=False, default=0)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('contest_id', 'user_id', name='uq_contest_scores_contest_user'),
+    )
+
+# Leaderboard order: the most solved, then the earliest last solve, then the least time
+Index('ix_contest_scores_rank', ContestScore.contest_id, ContestScore.score.desc(),
+      ContestScore.last_accepted_at, ContestScore.total_time, ContestScore.user_id)
+
+class StandingsSnapshot(db.Model):
+    """A contest's ranked standings as of one moment, stored once; see app.snapshots"""
+    __tablename__ = 'standings_snapshots'
+
+    id = db.Column(db.Integer, primary_key=True)
+    contest_id = db.Column(db.Integer, db.ForeignKey('contests.id', ondelete='CASCADE'), nullable=False)
+    kind = db.Column(db.String(16), nullable=False)  # 'freeze' or 'manual'
+    label = db.Column(db.String(128))
+    as_of = db.Column(db.DateTime(timezone=True), nullable=False)  # counts submissions made before this
+    taken_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    created_by_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
+    participants = db.Column(db.Integer, nullable=False, default=0)
+    pending = db.Column(db.Integer, nullable=False, default=0)  # submissions before as_of not yet judged then
+    data = db.deferred(db.Column(db.LargeBinary, nullable=False))  # zlib-compressed JSON rows, in rank order
+    contest = db.relationship('Contest')
+
+    __table_args__ = (
+        Index('ix_standings_snapshots_contest_kind', 'contest_id', 'kind', 'as_of'),
+        # One freeze snapshot per contest, however many supervisors take it at once
+        Index('uq_standings_snapshots_freeze', 'contest_id', unique=True,
+              postgresql_where=db.text("kind = 'freeze'"), sqlite_where=db.text("kind = 'freeze'")),
+    )
+
+# The submissions each rejudge queued; submissions.rejudge_job_id only holds the latest one
+rejudge_job_submissions = db.Table('rejudge_job_submissions',
+    db.Column('job_id', db.Integer, db.ForeignKey('rejudge_jobs.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('submission_id', db.Integer, db.ForeignKey('submissions.id', ondelete='CASCADE'), primary_key=True)
+)
+
+class RejudgeJob(db.Model):
+    """A bulk rejudge of a problem's or contest's submissions"""
+    __tablename__ = 'rejudge_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    problem_id = db.Column(db.Integer, db.ForeignKey('problems.id', ondelete='CASCADE'), nullable=True)
+    contest_id = db.Column(db.Integer, db.ForeignKey('contests.id', ondelete='CASCADE'), nullable=True)
+    statuses = db.Column(db.String(512))  # comma-separated verdict filter; empty: every judged submission
+    created_by_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
+    # Also the queued_at the rejudge gave its submissions
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    total = db.Column(db.Integer, default=0, nullable=False)
+    submissions = db.relationship('Submission', secondary=rejudge_job_submissions, lazy='dynamic')
+
+    @property
+    def status_list(self):
+        return [s for s in (self.statuses or '').split(',') if s]
+
+    def progress(self):
+        """Counts of submissions still queued and already rejudged
+
+        A submission queued again since (by a later rejudge) was judged
+        first, so it counts as done here.
+        """
+        pending = self.submissions.filter(Submission.status == 'Pending',
+                                          Submission.queued_at <= self.created_at).count()
+        done = max(0, self.total - pending)
+        return {
+            'total': self.total,
+            'pending': pending,
+            'done': done,
+            'percent': round(100 * done / self.total, 1) if self.total else 100.0,
+            'finished': pending == 0,
+        }
+
+class JudgeNode(db.Model):
+    """A machine running a judge worker pool; see judge.nodes"""
+    __tablename__ = 'judge_nodes'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(128), unique=True, nullable=False)
+    hostname = db.Column(db.String(255))
+    concurrency = db.Column(db.Integer)
+    started_at = db.Column(db.DateTime(timezone=True))
+    last_heartbeat = db.Column(db.DateTime(timezone=True), index=True)
+    stopped_at = db.Column(db.DateTime(timezone=True))  # None while running (or until it is found dead)
+
 class ParticipantsHistory(db.Model):
     __tablename__ = 'participants_history'
 
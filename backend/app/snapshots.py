@@ -0,0 +1,210 @@
+"""Standings snapshots: a contest's leaderboard as of one moment, stored once.
+
+A snapshot counts the submissions made before its `as_of` time. Taking one
+runs a single aggregate over the contest's submissions (the one
+`flask standings-rebuild` uses, restricted to timestamp < as_of) and
+stores the ranked rows as zlib-compressed JSON in standings_snapshots.
+Serving a snapshot page, looking up a rank in it or diffing two snapshots
+decodes that blob and never reads submissions again. Decoded pages are kept
+in the shared cache (app.cache) by snapshot id, as snapshots never change.
+
+    freeze   taken at Contest.freeze_time. From then until unfreeze_time
+             the public leaderboard shows it, while admins see live
+             standings.
+    manual   taken by an admin for any time, e.g. the standings at the
+             moment of a dispute.
+
+Submissions made before as_of that were still unjudged when a snapshot was
+taken are counted in its `pending` column. take_due_freezes(), run by each
+judge node's supervisor, takes a contest's freeze snapshot once freeze_time
+has passed, then takes it again whenever some of those pending
+submissions have been judged. The frozen board therefore ends up counting
+every submission made before the freeze. A later rejudge of such
+submissions does not change it; an admin can retake it. Requests never
+take it: until the supervisor has, the public leaderboard answers 503.
+A contest has at most one freeze snapshot (a partial unique index), so
+supervisors of several nodes taking it at once cannot store two.
+"""
+import json
+import pickle
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.cache import get_cache, get_or_compute
+from app.models import Contest, StandingsSnapshot, Submission, User, contest_participants
+from app.standings import ACCEPTED, Participant, StandingsPage, standing_rows, totals
+from judge.job_queue import PENDING
+from app.timeutil import as_utc
+
+FREEZE = 'freeze'
+MANUAL = 'manual'
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return as_utc(value).isoformat() if value is not None else None
+
+
+def _datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value is not None else None
+
+
+def _rank_key(score):
+    last = score['last_accepted_at']
+    return -score['score'], as_utc(last).timestamp() if last else 0, score['total_time'], score['user_id']
+
+
+def _pending(contest_id: int, as_of: datetime) -> int:
+    return Submission.query.filter(Submission.contest_id == contest_id, Submission.status == PENDING,
+                                   Submission.timestamp < as_of).count()
+
+
+def take(contest: Contest, as_of: datetime, kind: str = MANUAL, label: Optional[str] = None,
+         created_by_id: Optional[int] = None) -> StandingsSnapshot:
+    """Snapshot the standings of `contest` over its submissions made before `as_of`; the caller commits"""
+    standings = standing_rows(contest, Submission.timestamp < as_of)
+    usernames = dict(
+        db.session.query(User.id, User.username)
+        .join(contest_participants, contest_participants.c.user_id == User.id)
+        .filter(contest_participants.c.contest_id == contest.id)
+    )
+    scores = totals(contest.id, usernames, standings)
+    cells = {user_id: {} for user_id in scores}
+    for row in standings:
+        if row['user_id'] in cells:
+            cells[row['user_id']][row['problem_id']] = [row['attempts'], _iso(row['accepted_at']),
+                                                       row['accepted_time']]
+    rows = [
+        [score['user_id'], usernames[score['user_id']], score['score'], _iso(score['last_accepted_at']),
+         score['total_time'], score['penalty'], score['attempts'], cells[score['user_id']]]
+        for score in sorted(scores.values(), key=_rank_key)
+    ]
+    snapshot = StandingsSnapshot(
+        contest_id=contest.id,
+        kind=kind,
+        label=label,
+        as_of=as_of,
+        created_by_id=created_by_id,
+        participants=len(rows),
+        pending=_pending(contest.id, as_of),
+        data=zlib.compress(json.dumps(rows, separators=(',', ':')).encode()),
+    )
+    db.session.add(snapshot)
+    db.session.flush()
+    return snapshot
+
+
+def freeze_snapshot(contest: Contest) -> Optional[StandingsSnapshot]:
+    """The snapshot taken at the contest's current freeze_time, if any"""
+    if contest.freeze_time is None:
+        return None
+    return StandingsSnapshot.query.filter_by(contest_id=contest.id, kind=FREEZE, as_of=contest.freeze_time).first()
+
+
+def take_freeze(contest: Contest, created_by_id: Optional[int] = None) -> StandingsSnapshot:
+    """(Re)take the freeze snapshot, replacing the earlier one; the caller commits
+
+    Raises IntegrityError, here or on commit, if someone else took it meanwhile.
+    """
+    StandingsSnapshot.query.filter_by(contest_id=contest.id, kind=FREEZE).delete(synchronize_session=False)
+    return take(contest, contest.freeze_time, FREEZE, 'Freeze', created_by_id)
+
+
+def take_due_freezes(now: Optional[datetime] = None) -> int:
+    """Take the freeze snapshots that are missing or short of judged submissions; returns how many
+
+    Commits after each one.
+    """
+    now = now or datetime.now(timezone.utc)
+    frozen = Contest.query.filter(Contest.freeze_time <= now,
+                                  or_(Contest.unfreeze_time.is_(None), Contest.unfreeze_time > now))
+    taken = 0
+    for contest in frozen.all():
+        snapshot = freeze_snapshot(contest)
+        if snapshot is not None and (not snapshot.pending
+                                     or _pending(contest.id, snapshot.as_of) >= snapshot.pending):
+            continue
+        try:
+            take_freeze(contest)
+            db.session.commit()
+        except IntegrityError:
+            # Another node's supervisor took it at the same time
+            db.session.rollback()
+            continue
+        taken += 1
+    return taken
+
+
+def rows(snapshot: StandingsSnapshot) -> List[Dict]:
+    """Every row of a snapshot in rank order, as standings_page() rows"""
+    decoded = []
+    for rank, (user_id, username, score, last_accepted_at, total_time, penalty, attempts, cells) in enumerate(
+            json.loads(zlib.decompress(snapshot.data)), 1):
+        problems = {}
+        for problem_id, (problem_attempts, accepted_at, accepted_time) in cells.items():
+            if accepted_at is None:
+                problems[int(problem_id)] = {'is_accepted': False, 'attempts': problem_attempts}
+            else:
+                problems[int(problem_id)] = {'is_accepted': True, 'time': accepted_time,
+                                             'attempts': problem_attempts, 'status': ACCEPTED}
+        decoded.append({
+            'rank': rank,
+            'user': Participant(user_id, username),
+            'problems': problems,
+            'timestamp': _datetime(last_accepted_at),
+            'total_score': score,
+            'total_time': total_time,
+            'penalty': penalty,
+            'submissions_count': attempts,
+        })
+    return decoded
+
+
+def _cached(key: str, compute):
+    config = current_app.config
+    # Snapshots never change, so there is no older value to hand out meanwhile
+    data = get_or_compute(get_cache(current_app), key, key, lambda: pickle.dumps(compute()),
+                          config['LEADERBOARD_CACHE_SECONDS'], config['LEADERBOARD_LOCK_SECONDS'])
+    return pickle.loads(data)
+
+
+def snapshot_page(snapshot: StandingsSnapshot, page: int, per_page: int) -> StandingsPage:
+    """Page `page` of a snapshot's leaderboard, through the shared cache"""
+    def compute():
+        start = (page - 1) * per_page
+        return StandingsPage(page, per_page, snapshot.participants, rows(snapshot)[start:start + per_page])
+
+    return _cached(f"snapshot:{snapshot.id}:{page}:{per_page}", compute)
+
+
+def snapshot_rank(snapshot: StandingsSnapshot, user_id: int) -> Optional[int]:
+    """A participant's 1-based position in a snapshot; None if not in it"""
+    ranks = _cached(f"snapshot:{snapshot.id}:ranks", lambda: {row['user'].id: row['rank'] for row in rows(snapshot)})
+    return ranks.get(user_id)
+
+
+def diff(old: StandingsSnapshot, new: StandingsSnapshot) -> List[Dict]:
+    """The participants whose row differs between two snapshots, in `new` rank order
+
+    Each change is {'user', 'old', 'new', 'solved'}: 'old' and 'new' are the
+    two rows (None where the participant is missing) and 'solved' lists the
+    problem ids accepted in `new` but not in `old`.
+    """
+    before = {row['user'].id: row for row in rows(old)}
+    changes = []
+    for row in rows(new):
+        previous = before.pop(row['user'].id, None)
+        if previous is not None and all(previous[field] == row[field] for field in
+                                        ('rank', 'total_score', 'penalty', 'submissions_count', 'problems')):
+            continue
+        solved = [problem_id for problem_id, result in row['problems'].items() if result['is_accepted']
+                  and not (previous and (previous['problems'].get(problem_id) or {}).get('is_accepted'))]
+        changes.append({'user': row['user'], 'old': previous, 'new': row, 'solved': solved})
+    changes.extend({'user': previous['user'], 'old': previous, 'new': None, 'solved': []}
+                   for previous in before.values())
+    return changes
@@ -0,0 +1,432 @@
+"""Contest standings, kept in the contest_standings table.
+
+The table holds one row per participant and problem with a judged
+submission (see ContestStanding):
+
+    attempts             judged submissions
+    rejected_before_ac   judged submissions before the first Accepted one
+    accepted_at          timestamp of the first Accepted submission (ties
+                         broken by execution time, then id) ...
+    accepted_time        ... and its execution time
+    best_time            the fastest Accepted submission
+    penalty              minutes from the contest start to accepted_at, plus
+                         STANDINGS_PENALTY_MINUTES per rejected attempt
+
+Whatever writes a verdict (the judge, or judge.verdict_reuse when it
+copies one) calls update_standing() in the same transaction, so rendering
+a leaderboard is one indexed read of the contest's rows. The row is
+recomputed from the pair's submissions rather than patched, which makes a
+rejudge that turns a verdict around come out right whatever the order its
+submissions finish in. `flask standings-rebuild` recomputes whole
+contests from the submissions table.
+
+Each participant also has a contest_scores row (ContestScore) with the
+totals over their standings, updated in the same transaction. The
+leaderboard is ordered by the ix_contest_scores_rank index (most solved,
+earliest last solve, least total time, then user id), so a page is an
+index range and a participant's rank is a count over the index entries
+ahead of their own; neither loads the whole table. iter_standings() walks
+the same index in chunks, for exports.
+
+Every change also bumps Contest.standings_version. cached_page() keeps
+leaderboard pages per (contest, version) in the shared cache (app.cache),
+so each is computed once per change instead of once per page view.
+"""
+import math
+import operator
+import pickle
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import and_, case, false, func, insert, or_, select, update
+
+from app import db
+from app.cache import get_cache, get_or_compute
+from app.models import Contest, ContestScore, ContestStanding, Problem, Submission, User, contest_participants
+from judge.job_queue import PENDING
+from app.timeutil import as_utc
+
+ACCEPTED = 'Accepted'
+RANK_ORDER = (ContestScore.score.desc(), ContestScore.last_accepted_at, ContestScore.total_time, ContestScore.user_id)
+
+
+class Participant(NamedTuple):
+    """What leaderboard pages show of a user; cached in place of the User row"""
+    id: int
+    username: str
+
+
+def _pair_query(*filters):
+    """One row per (contest, user, problem) over the judged submissions matching `filters`"""
+    pair = (Submission.contest_id, Submission.user_id, Submission.problem_id)
+    accepted = Submission.status == ACCEPTED
+    judged = (
+        select(
+            *pair,
+            Submission.status,
+            Submission.timestamp,
+            Submission.execution_time,
+            func.min(case((accepted, Submission.timestamp))).over(partition_by=pair).label('first_ac_at'),
+            func.row_number().over(
+                partition_by=pair,
+                order_by=(case((accepted, 0), else_=1), Submission.timestamp,
+                          Submission.execution_time, Submission.id)
+            ).label('rank'),
+        )
+        .where(Submission.status != PENDING, Submission.contest_id.isnot(None), *filters)
+        .subquery()
+    )
+    c = judged.c
+    return (
+        select(
+            c.contest_id,
+            c.user_id,
+            c.problem_id,
+            func.count().label('attempts'),
+            func.sum(case((and_(c.status != ACCEPTED, c.timestamp < c.first_ac_at), 1), else_=0))
+            .label('rejected_before_ac'),
+            func.max(c.first_ac_at).label('accepted_at'),
+            func.max(case((and_(c.rank == 1, c.status == ACCEPTED), c.execution_time))).label('accepted_time'),
+            func.min(case((c.status == ACCEPTED, c.execution_time))).label('best_time'),
+        )
+        .group_by(c.contest_id, c.user_id, c.problem_id)
+    )
+
+
+def _values(row, contest_start) -> Dict:
+    """Column values of a standing from a _pair_query() row"""
+    rejected = row.rejected_before_ac or 0
+    penalty = None
+    if row.accepted_at is not None:
+        minutes = int((as_utc(row.accepted_at) - as_utc(contest_start)).total_seconds() // 60)
+        penalty = max(0, minutes) + current_app.config['STANDINGS_PENALTY_MINUTES'] * rejected
+    return {
+        'attempts': row.attempts,
+        'rejected_before_ac': rejected,
+        'accepted_at': row.accepted_at,
+        'accepted_time': row.accepted_time,
+        'best_time': row.best_time,
+        'penalty': penalty,
+    }
+
+
+def update_standing(contest_id: Optional[int], user_id: Optional[int], problem_id: Optional[int]):
+    """Recompute one participant's standing on one problem; the caller commits"""
+    if contest_id is None or user_id is None or problem_id is None:
+        return
+    db.session.flush()
+    # This UPDATE must run before _pair_query(): the contest row stays locked
+    # until commit, which serializes the contest's verdict writes. Two verdicts
+    # of the same pair therefore cannot both compute from a stale read.
+    db.session.execute(update(Contest).where(Contest.id == contest_id)
+                       .values(standings_version=Contest.standings_version + 1))
+    row = db.session.execute(_pair_query(Submission.user_id == user_id,
+                                         Submission.contest_id == contest_id,
+                                         Submission.problem_id == problem_id)).first()
+    standing = ContestStanding.query.filter_by(user_id=user_id, problem_id=problem_id).first()
+    if row is None:
+        if standing is not None:
+            db.session.delete(standing)
+    else:
+        if standing is None:
+            standing = ContestStanding(contest_id=contest_id, user_id=user_id, problem_id=problem_id)
+            db.session.add(standing)
+        for column, value in _values(row, db.session.get(Contest, contest_id).start_time).items():
+            setattr(standing, column, value)
+    if _is_participant(contest_id, user_id):
+        update_score(contest_id, user_id)
+
+
+def _is_participant(contest_id: int, user_id: int) -> bool:
+    return db.session.execute(
+        select(contest_participants.c.user_id)
+        .where(contest_participants.c.contest_id == contest_id, contest_participants.c.user_id == user_id)
+        .limit(1)
+    ).first() is not None
+
+
+def update_score(contest_id: int, user_id: int):
+    """Recompute a participant's totals from their standings; the caller commits
+
+    Also creates the row of a participant without any, e.g. one just added.
+    """
+    db.session.flush()
+    sums = db.session.query(
+        func.count(ContestStanding.accepted_at),
+        func.max(ContestStanding.accepted_at),
+        func.coalesce(func.sum(ContestStanding.accepted_time), 0),
+        func.coalesce(func.sum(ContestStanding.penalty), 0),
+        func.coalesce(func.sum(ContestStanding.attempts), 0),
+    ).filter(ContestStanding.contest_id == contest_id, ContestStanding.user_id == user_id).one()
+    score = ContestScore.query.filter_by(contest_id=contest_id, user_id=user_id).first()
+    if score is None:
+        score = ContestScore(contest_id=contest_id, user_id=user_id)
+        db.session.add(score)
+    score.score, score.last_accepted_at, score.total_time, score.penalty, score.attempts = sums
+
+
+def update_submission_standing(submission_id: int):
+    """update_standing() for the participant and problem of a submission; the caller commits"""
+    pair = db.session.query(Submission.contest_id, Submission.user_id, Submission.problem_id) \
+        .filter(Submission.id == submission_id).first()
+    if pair is not None:
+        update_standing(*pair)
+
+
+def rebuild(contest: Contest) -> int:
+    """Recompute every standing and score of `contest` from its submissions; returns the standing count
+
+    The caller commits.
+    """
+    ContestStanding.query.filter_by(contest_id=contest.id).delete()
+    ContestScore.query.filter_by(contest_id=contest.id).delete()
+    contest.bump_standings_version()
+    rows = standing_rows(contest)
+    if rows:
+        db.session.execute(insert(ContestStanding.__table__), rows)
+
+    participant_ids = db.session.execute(
+        select(contest_participants.c.user_id).where(contest_participants.c.contest_id == contest.id)
+    ).scalars()
+    scores = totals(contest.id, participant_ids, rows)
+    if scores:
+        db.session.execute(insert(ContestScore.__table__), list(scores.values()))
+    return len(rows)
+
+
+def standing_rows(contest: Contest, *filters) -> List[Dict]:
+    """Column values of the contest's standings, over its submissions matching `filters`"""
+    return [
+        {'contest_id': contest.id, 'user_id': row.user_id, 'problem_id': row.problem_id,
+         **_values(row, contest.start_time)}
+        for row in db.session.execute(_pair_query(Submission.contest_id == contest.id, *filters))
+    ]
+
+
+def totals(contest_id: int, user_ids: Iterable[int], standings: Iterable[Dict]) -> Dict[int, Dict]:
+    """ContestScore column values of each of `user_ids`, from their standings' column values"""
+    scores = {user_id: {'contest_id': contest_id, 'user_id': user_id, 'score': 0, 'last_accepted_at': None,
+                        'total_time': 0, 'penalty': 0, 'attempts': 0}
+              for user_id in user_ids}
+    for row in standings:
+        score = scores.get(row['user_id'])
+        if score is None:
+            continue
+        score['attempts'] += row['attempts']
+        if row['accepted_at'] is not None:
+            score['score'] += 1
+            score['total_time'] += row['accepted_time'] or 0
+            score['penalty'] += row['penalty']
+            if score['last_accepted_at'] is None or row['accepted_at'] > score['last_accepted_at']:
+                score['last_accepted_at'] = row['accepted_at']
+    return scores
+
+
+class StandingsPage:
+    """One page of a leaderboard, with the interface of Flask-SQLAlchemy's Pagination"""
+
+    def __init__(self, page: int, per_page: Optional[int], total: int, rows: List[Dict]):
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.rows = rows
+
+    @property
+    def pages(self) -> int:
+        if not self.per_page:
+            return 1
+        return max(1, math.ceil(self.total / self.per_page))
+
+    @property
+    def first_rank(self) -> int:
+        return (self.page - 1) * (self.per_page or 0) + 1
+
+    @property
+    def has_prev(self) -> bool:
+        return self.page > 1
+
+    @property
+    def prev_num(self) -> Optional[int]:
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def has_next(self) -> bool:
+        return self.page < self.pages
+
+    @property
+    def next_num(self) -> Optional[int]:
+        return self.page + 1 if self.has_next else None
+
+    def iter_pages(self, *, left_edge=2, left_current=2, right_current=4, right_edge=2):
+        """Page numbers for a pagination widget, None where pages are skipped"""
+        pages_end = self.pages + 1
+        left_end = min(1 + left_edge, pages_end)
+        yield from range(1, left_end)
+        if left_end == pages_end:
+            return
+        mid_start = max(left_end, self.page - left_current)
+        mid_end = min(self.page + right_current + 1, pages_end)
+        if mid_start - left_end > 0:
+            yield None
+        yield from range(mid_start, mid_end)
+        if mid_end == pages_end:
+            return
+        right_start = max(mid_end, pages_end - right_edge)
+        if right_start - mid_end > 0:
+            yield None
+        yield from range(right_start, pages_end)
+
+
+def _scores_query(contest_id: int):
+    """The contest's scores with the participants' usernames, in rank order"""
+    return (
+        db.session.query(ContestScore.user_id, ContestScore.score, ContestScore.last_accepted_at,
+                         ContestScore.total_time, ContestScore.penalty, ContestScore.attempts, User.username)
+        .join(User, User.id == ContestScore.user_id)
+        .filter(ContestScore.contest_id == contest_id)
+        .order_by(*RANK_ORDER)
+    )
+
+
+def _rows(contest: Contest, problems: List[Problem], scores, first_rank: int, filter_cells: bool) -> List[Dict]:
+    """Leaderboard rows of the _scores_query() rows `scores`, ranked from `first_rank`
+
+    With `filter_cells`, only the standings of these participants are read;
+    otherwise every standing of the contest is.
+    """
+    entries = {}
+    for rank, score in enumerate(scores, first_rank):
+        entries[score.user_id] = {
+            'rank': rank,
+            'user': Participant(score.user_id, score.username),
+            'problems': {problem.id: None for problem in problems},
+            'timestamp': score.last_accepted_at,
+            'total_score': score.score,
+            'total_time': score.total_time,
+            'penalty': score.penalty,
+            'submissions_count': score.attempts,
+        }
+
+    cells = db.session.query(
+        ContestStanding.user_id, ContestStanding.problem_id, ContestStanding.attempts,
+        ContestStanding.accepted_at, ContestStanding.accepted_time
+    ).filter(ContestStanding.contest_id == contest.id)
+    if filter_cells:
+        cells = cells.filter(ContestStanding.user_id.in_(list(entries)))
+    for user_id, problem_id, attempts, accepted_at, accepted_time in cells:
+        entry = entries.get(user_id)
+        if entry is None or problem_id not in entry['problems']:
+            continue
+        if accepted_at is None:
+            entry['problems'][problem_id] = {'is_accepted': False, 'attempts': attempts}
+        else:
+            entry['problems'][problem_id] = {
+                'is_accepted': True,
+                'time': accepted_time,
+                'attempts': attempts,
+                'status': ACCEPTED,
+            }
+    return list(entries.values())
+
+
+def standings_page(contest: Contest, problems: List[Problem], page: int = 1,
+                   per_page: Optional[int] = None) -> StandingsPage:
+    """Page `page` of the leaderboard, `per_page` participants long (None: everyone)
+
+    Each row is {'rank', 'user', 'problems', 'timestamp', 'total_score',
+    'total_time', 'penalty', 'submissions_count'}. 'user' is a Participant.
+    'problems' maps every problem id to None (nothing judged yet),
+    {'is_accepted': False, 'attempts'} or {'is_accepted': True, 'time',
+    'attempts', 'status'}. 'timestamp' is the latest first-Accepted time
+    over the solved problems.
+    """
+    query = _scores_query(contest.id)
+    if per_page:
+        total = ContestScore.query.filter_by(contest_id=contest.id).count()
+        query = query.offset((page - 1) * per_page).limit(per_page)
+    else:
+        total = None
+
+    entries = _rows(contest, problems, query, (page - 1) * (per_page or 0) + 1, filter_cells=bool(per_page))
+    if total is None:
+        total = len(entries)
+    return StandingsPage(page, per_page, total, entries)
+
+
+def contest_standings(contest: Contest, problems: Optional[List[Problem]] = None) -> List[Dict]:
+    """Every participant's leaderboard row, in rank order (see standings_page)"""
+    if problems is None:
+        problems = contest.problems.order_by(Problem.id.asc()).all()
+    return standings_page(contest, problems).rows
+
+
+def iter_standings(contest: Contest, problems: List[Problem], chunk_size: int) -> Iterator[Dict]:
+    """Every participant's leaderboard row in rank order, read `chunk_size` participants at a time
+
+    Each chunk starts after the last key of the previous one in the rank
+    index, so reading the whole leaderboard costs the same per chunk
+    however far down it goes, and only one chunk is held at a time.
+    """
+    query = _scores_query(contest.id)
+    rank, last = 1, None
+    while True:
+        chunk = (query if last is None else query.filter(_ranked(last, ahead=False))).limit(chunk_size).all()
+        if not chunk:
+            return
+        yield from _rows(contest, problems, chunk, rank, filter_cells=True)
+        rank += len(chunk)
+        last = chunk[-1]
+
+
+def _ranked(key, ahead: bool):
+    """Condition on the contest's ContestScore rows ranked ahead of (or behind) `key`
+
+    `key` has the rank columns of a ContestScore: score, last_accepted_at,
+    total_time and user_id.
+    """
+    better, earlier = (operator.gt, operator.lt) if ahead else (operator.lt, operator.gt)
+    if key.last_accepted_at is None:
+        # Nothing solved, and neither has anyone else with the same score
+        same_solve, earlier_solve = ContestScore.last_accepted_at.is_(None), false()
+    else:
+        same_solve = ContestScore.last_accepted_at == key.last_accepted_at
+        earlier_solve = earlier(ContestScore.last_accepted_at, key.last_accepted_at)
+    return or_(
+        better(ContestScore.score, key.score),
+        and_(ContestScore.score == key.score, or_(
+            earlier_solve,
+            and_(same_solve, or_(
+                earlier(ContestScore.total_time, key.total_time),
+                and_(ContestScore.total_time == key.total_time, earlier(ContestScore.user_id, key.user_id)),
+            )),
+        )),
+    )
+
+
+def rank_of(contest_id: int, user_id: int) -> Optional[int]:
+    """A participant's 1-based leaderboard position, counted in the rank index; None if not ranked"""
+    mine = ContestScore.query.filter_by(contest_id=contest_id, user_id=user_id).first()
+    if mine is None:
+        return None
+    ahead = db.session.query(func.count(ContestScore.id)).filter(
+        ContestScore.contest_id == contest_id, _ranked(mine, ahead=True)
+    ).scalar()
+    return ahead + 1
+
+
+def cached_page(contest: Contest, problems: List[Problem], page: int, per_page: int) -> Tuple[int, StandingsPage]:
+    """(standings version, standings_page()) through the shared cache
+
+    While another request computes the current version, the previous one
+    is returned, so the version may be older than contest.standings_version.
+    """
+    version = contest.standings_version
+    config = current_app.config
+    slot = f"standings:{contest.id}:{page}:{per_page}"
+
+    def compute():
+        return pickle.dumps((version, standings_page(contest, problems, page, per_page)))
+
+    data = get_or_compute(get_cache(current_app), f"{slot}:{version}", f"{slot}:latest",
+                          compute, config['LEADERBOARD_CACHE_SECONDS'], config['LEADERBOARD_LOCK_SECONDS'])
+    return pickle.loads(data)
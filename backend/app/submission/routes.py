@@ -1,62 +1,12 @@
-from flask import render_template, redirect, url_for, flash, abort, request, current_app
+from flask import render_template, redirect, url_for, flash, abort, request, current_app, Response
 from flask_login import login_required, current_user
-from app import db
+from app import db, live
 from app.submission import bp
 from app.submission.forms import SubmitSolutionForm
-from app.models import Submission, Problem, Contest
-from judge.mock_judge import judge_submission
+from app.models import Submission, Problem, Contest, SubmissionTestResult
+from judge.job_queue import PRIORITY_ADMIN, PRIORITY_LIVE, enqueue
+from judge.verdict_reuse import code_hash, try_reuse
 from datetime import datetime
-from threading import Thread
-
-def process_submission(app, submission):
-    """Process a submission in the background"""
-    try:
-        with app.app_context():
-            print(f"[Judge] Starting to judge submission {submission.id}")
-            
-            # Get the problem and test cases
-            problem = Problem.query.get(submission.problem_id)
-            if not problem:
-                print(f"[Judge] Error: Problem {submission.problem_id} not found")
-                submission.status = "Runtime Error"
-                submission.error_message = "Problem not found"
-                db.session.commit()
-                return
-            
-            # Check if there are test cases
-            test_cases = problem.test_cases.all()
-            if not test_cases:
-                print(f"[Judge] No test cases found, marking as accepted")
-                submission.status = "Accepted"
-                submission.execution_time = 0
-                db.session.commit()
-                return
-            
-            print(f"[Judge] Found {len(test_cases)} test cases")
-            
-            # Import judge function
-            from judge.mock_judge import judge_submission
-            
-            # Call the judge with the correct parameters
-            result = judge_submission(submission.id)
-            
-            if result:
-                print(f"[Judge] Judging completed for submission {submission.id}")
-            else:
-                print(f"[Judge] Judging failed for submission {submission.id}")
-                submission.status = "Runtime Error"
-                submission.error_message = "Judging process failed"
-                db.session.commit()
-                
-    except Exception as e:
-        print(f"[Judge] Error processing submission {submission.id}: {str(e)}")
-        try:
-            with app.app_context():
-                submission.status = "Runtime Error"
-                submission.error_message = f"Judge error: {str(e)}"
-                db.session.commit()
-        except Exception as commit_error:
-            print(f"[Judge] Failed to update submission status: {str(commit_error)}")
 
 @bp.route('/submit/<int:problem_id>', methods=['GET', 'POST'])
 @login_required
@@ -105,21 +55,20 @@ def submit(problem_id):
             contest_id=contest.id,
             code=source_code,
             language=form.language.data,
-            status='Pending'
         )
 
         try:
+            # Judging happens in the `flask judge-worker` pool; here we only enqueue.
+            # Admin test runs yield to contestants.
+            enqueue(submission, PRIORITY_ADMIN if current_user.role == 'admin' else PRIORITY_LIVE)
+            submission.code_hash = code_hash(source_code)
             db.session.add(submission)
+            # The same code was already judged against these tests: take that verdict
+            reused = try_reuse(submission)
             db.session.commit()
             
-            # Start background judging
-            try:
-                Thread(target=process_submission, args=(current_app._get_current_object(), submission)).start()
-            except Exception as e:
-                flash('Error starting judge process. Please try again.', 'error')
-                return redirect(url_for('submission.submit', problem_id=problem_id))
-            
-            flash('Solution submitted and is being judged!', 'info')
+            flash('Solution submitted and judged (identical to an earlier submission).' if reused
+                  else 'Solution submitted and is being judged!', 'info')
             return redirect(url_for('submission.view', submission_id=submission.id))
         except Exception as e:
             db.session.rollback()
@@ -147,7 +96,24 @@ def view(submission_id):
                          submission=submission,
                          problem=submission.problem,
                          contest=submission.problem.contest,
-                         recent_submissions=recent_submissions)
+                         recent_submissions=recent_submissions,
+                         test_results=submission.test_results.order_by(SubmissionTestResult.test_index).all(),
+                         test_count=submission.problem.test_cases.count())
+
+
+@bp.route('/submission/<int:submission_id>/events')
+@login_required
+def events(submission_id):
+    """Server-Sent Events with the submission's status and per-test results, see app.live"""
+    submission = Submission.query.get_or_404(submission_id)
+    if submission.user_id != current_user.id and current_user.role != 'admin':
+        abort(403)
+    # The stream reads through the shared poller; don't keep this request's connection
+    db.session.close()
+    hub = live.get_hub(current_app._get_current_object())
+    return Response(live.stream(hub, submission_id, current_app.config['LIVE_STREAM_SECONDS']),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @bp.route('/my_submissions', methods=['GET'])
 @login_required
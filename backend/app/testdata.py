@@ -0,0 +1,142 @@
+"""Content-addressed on-disk store for test case data.
+
+Test inputs and expected outputs live in TESTDATA_DIR as files named by the
+sha256 of their content (`ab/abcdef...`); the database only keeps hashes and
+sizes. Identical data shared by several tests or problems is stored once.
+Blobs are written to a temporary file and renamed into place, so a reader
+never sees a partial blob and concurrent writers of the same data agree.
+
+A store with a `remote_url` (a judge node on another machine) downloads
+blobs it does not have from the web app on first use; see `ensure`.
+"""
+import hashlib
+import io
+import mmap
+import os
+import tempfile
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Iterable, Tuple
+
+
+@contextmanager
+def map_file(path: str):
+    """Read-only mmap of a file; empty files give an empty BytesIO (mmap rejects them)"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield io.BytesIO()
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            yield m
+
+
+class BlobStore:
+    def __init__(self, root: str, remote_url: str = None, token: str = None):
+        self.root = root
+        self.remote_url = remote_url
+        self.token = token
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def ensure(self, digest: str) -> str:
+        """Path of blob `digest`, downloaded from the remote store first if it is missing here"""
+        path = self.path(digest)
+        if self.remote_url and not os.path.exists(path):
+            self._download(digest)
+        return path
+
+    def _download(self, digest: str):
+        request = urllib.request.Request(f"{self.remote_url.rstrip('/')}/{digest}")
+        if self.token:
+            request.add_header('Authorization', f'Bearer {self.token}')
+        fd, staging = tempfile.mkstemp(prefix='blob-', dir=self.root)
+        try:
+            sha = hashlib.sha256()
+            with os.fdopen(fd, 'wb') as f, urllib.request.urlopen(request, timeout=60) as response:
+                for chunk in iter(lambda: response.read(1024 * 1024), b''):
+                    sha.update(chunk)
+                    f.write(chunk)
+            if sha.hexdigest() != digest:
+                raise IOError(f"Downloaded test data {digest} does not match its hash")
+            self._rename(staging, digest)
+        finally:
+            if os.path.exists(staging):
+                os.unlink(staging)
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def put(self, data) -> Tuple[str, int]:
+        """Store `data` (str or bytes); returns (sha256, size in bytes)"""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        try:
+            # Refresh the mtime so garbage collection leaves the blob alone
+            os.utime(self.path(digest))
+        except FileNotFoundError:
+            self._publish(digest, data)
+        return digest, len(data)
+
+    def _publish(self, digest: str, data: bytes):
+        fd, staging = tempfile.mkstemp(prefix='blob-', dir=self.root)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            self._rename(staging, digest)
+        finally:
+            if os.path.exists(staging):
+                os.unlink(staging)
+
+    def _rename(self, staging: str, digest: str):
+        target = self.path(digest)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.chmod(staging, 0o444)
+        # Same content under the same name: replacing an existing blob is harmless
+        os.replace(staging, target)
+
+    def read_text(self, digest: str) -> str:
+        with open(self.path(digest), 'rb') as f:
+            return f.read().decode('utf-8', errors='replace')
+
+    def mapped(self, digest: str):
+        return map_file(self.path(digest))
+
+    def collect_garbage(self, referenced: Iterable[str], min_age: float = 3600) -> int:
+        """Delete blobs that are not in `referenced`; returns how many were removed
+
+        Blobs younger than `min_age` seconds are kept: they may belong to a
+        test upload whose transaction has not committed yet.
+        """
+        keep = set(referenced)
+        now = time.time()
+        removed = 0
+        for bucket in os.scandir(self.root):
+            if not bucket.is_dir() or len(bucket.name) != 2:
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name in keep or now - entry.stat().st_mtime < min_age:
+                    continue
+                os.unlink(entry.path)
+                removed += 1
+        return removed
+
+
+_stores = {}
+
+
+def get_store(root: str = None) -> BlobStore:
+    """The store at `root`, by default the app's TESTDATA_DIR (with its remote, if configured)"""
+    remote_url = token = None
+    if root is None:
+        from flask import current_app
+        root = current_app.config['TESTDATA_DIR']
+        remote_url = current_app.config.get('JUDGE_TESTDATA_URL')
+        token = current_app.config.get('JUDGE_NODE_TOKEN')
+    store = _stores.get(root)
+    if store is None:
+        store = _stores[root] = BlobStore(root, remote_url, token)
+    return store
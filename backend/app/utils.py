@@ -1,8 +1,12 @@
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.pagesizes import A4
+from reportlab.platypus import Table, TableStyle, Paragraph
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib import colors
 from openpyxl import Workbook
+import csv
+import io
+import re
 import secrets
 import string
 from flask_mail import Message
@@ -11,44 +15,86 @@ def generate_random_password(length=12):
     alphabet = string.ascii_letters + string.digits
     return ''.join(secrets.choice(alphabet) for i in range(length))
 
-def generate_leaderboard_pdf(file_path, contest, problems, leaderboard_data):
-    try:
-        doc = SimpleDocTemplate(file_path, pagesize=A4)
-        elements = []
-        styles = getSampleStyleSheet()
+def leaderboard_export_header(problems):
+    return ["Rank", "Participant", "Score", "Total Time", "Penalty"] + [f"P{index}" for index in range(1, len(problems) + 1)]
 
-        elements.append(Paragraph(f"{contest.title} – Leaderboard", styles['Title']))
-        elements.append(Spacer(1, 12))
+def leaderboard_export_row(entry, problems):
+    """One leaderboard row as the cells of an export"""
+    row = [entry['rank'], entry['user'].username, entry['total_score'], round(entry['total_time'], 3), entry['penalty']]
+    for problem in problems:
+        pdata = entry['problems'].get(problem.id)
+        if pdata and pdata['is_accepted']:
+            row.append(f"{pdata['time']}s / {pdata['attempts']} tries")
+        elif pdata:
+            row.append(f"— / {pdata['attempts']} tries")
+        else:
+            row.append("—")
+    return row
 
-        headers = ["Participant", "Score", "Total Time"] + [f"P{p.id}" for p in problems]
-        data = [headers]
+PDF_ROWS_PER_PAGE = 40
 
-        for entry in leaderboard_data:
-            row = [
-                entry['user'].username,
-                entry['total_score'],
-                entry['total_time']
-            ]
-            for problem in problems:
-                pdata = entry['problems'].get(problem.id)
-                if pdata:
-                    row.append(f"{pdata['time']}s / {pdata['attempts']} tries")
-                else:
-                    row.append("—")
-            data.append(row)
+def generate_leaderboard_pdf(file_path, contest, problems, leaderboard_rows):
+    """Write the leaderboard to a PDF, one table per page
 
-        table = Table(data)
-        table.setStyle(TableStyle([
+    `leaderboard_rows` may be any iterable, e.g. app.standings.iter_standings();
+    rows are drawn a page at a time, so only one page of them is held in memory.
+    """
+    try:
+        page_size = landscape(A4) if len(problems) > 5 else A4
+        width, height = page_size
+        margin = 36
+        styles = getSampleStyleSheet()
+        pdf = canvas.Canvas(file_path, pagesize=page_size, pageCompression=1)
+        pdf.setTitle(f"{contest.title} – Leaderboard")
+        headers = leaderboard_export_header(problems)
+        style = TableStyle([
             ('BACKGROUND', (0,0), (-1,0), colors.gray),
             ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
             ('GRID', (0,0), (-1,-1), 1, colors.black),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold')
-        ]))
+            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0,0), (-1,-1), 7),
+        ])
+
+        def draw(rows, first_page):
+            top = height - margin
+            if first_page:
+                title = Paragraph(f"{contest.title} – Leaderboard", styles['Title'])
+                _, title_height = title.wrapOn(pdf, width - 2 * margin, height)
+                title.drawOn(pdf, margin, top - title_height)
+                top -= title_height + 12
+            table = Table([headers] + rows, rowHeights=14)
+            table.setStyle(style)
+            _, table_height = table.wrapOn(pdf, width - 2 * margin, top - margin)
+            table.drawOn(pdf, margin, top - table_height)
+            pdf.showPage()
 
-        elements.append(table)
-        doc.build(elements)
+        page, first_page = [], True
+        for entry in leaderboard_rows:
+            page.append(leaderboard_export_row(entry, problems))
+            # The title takes the space of a few rows on the first page
+            if len(page) == PDF_ROWS_PER_PAGE - (4 if first_page else 0):
+                draw(page, first_page)
+                page, first_page = [], False
+        if page or first_page:
+            draw(page, first_page)
+        pdf.save()
     except Exception as e:
         raise Exception(f"Error generating PDF: {str(e)}")
+
+CSV_CHUNK_BYTES = 16384
+
+def leaderboard_csv(problems, leaderboard_rows):
+    """The leaderboard as CSV text, yielded in chunks of about CSV_CHUNK_BYTES"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(leaderboard_export_header(problems))
+    for entry in leaderboard_rows:
+        writer.writerow(leaderboard_export_row(entry, problems))
+        if buffer.tell() >= CSV_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
 from app import db
 from app.models import User
 
@@ -63,28 +109,21 @@ def create_admin_if_not_exists():
     else:
         print("Admin user already exists")
 
-def generate_leaderboard_excel(file_path, contest, problems, leaderboard_data):
-    try:
-        wb = Workbook()
-        ws = wb.active
-        ws.title = f"{contest.title} Leaderboard"
+def generate_leaderboard_excel(file_path, contest, problems, leaderboard_rows):
+    """Write the leaderboard to an XLSX workbook in write-only mode
 
-        headers = ["Participant", "Score", "Total Time"] + [f"P{p.id}" for p in problems]
-        ws.append(headers)
+    Rows go to the file as they come from `leaderboard_rows`, so memory does
+    not grow with the number of participants.
+    """
+    try:
+        wb = Workbook(write_only=True)
+        # Sheet titles are at most 31 characters, without []:*?/\
+        title = re.sub(r'[\[\]:*?/\\]', ' ', f"{contest.title} Leaderboard")[:31]
+        ws = wb.create_sheet(title=title)
 
-        for entry in leaderboard_data:
-            row = [
-                entry['user'].username,
-                entry['total_score'],
-                entry['total_time']
-            ]
-            for problem in problems:
-                pdata = entry['problems'].get(problem.id)
-                if pdata:
-                    ws.append(f"{pdata['time']}s / {pdata['attempts']} tries")
-                else:
-                    ws.append("—")
-            ws.append(row)
+        ws.append(leaderboard_export_header(problems))
+        for entry in leaderboard_rows:
+            ws.append(leaderboard_export_row(entry, problems))
 
         wb.save(file_path)
     except Exception as e:
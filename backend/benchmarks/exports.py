@@ -0,0 +1,147 @@
+"""Leaderboard exports: whole leaderboard in memory vs. streamed in chunks.
+
+Usage (from backend/):
+    python -m benchmarks.exports [--participants 1000 4000] [--problems 10] [--submissions-per-participant 25]
+
+For each participant count a contest is generated as in benchmarks.standings
+and its standings table is built. Each export format is then written twice:
+
+    before    the former exports: the whole leaderboard read into a list,
+              an openpyxl Workbook built in memory, and the PDF as one
+              platypus Table (there was no CSV; here it is a StringIO)
+    after     app.utils writers fed by app.standings.iter_standings:
+              write-only XLSX, a PDF drawn a page at a time, CSV chunks
+
+The report has the time and peak traced Python memory of each. Passing
+several participant counts shows how memory grows with contest size.
+"""
+import argparse
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.standings import _config, seed
+
+
+def _before_rows(contest, problems):
+    from app.standings import contest_standings
+    return contest_standings(contest, problems)
+
+
+def before_xlsx(path, contest, problems):
+    from openpyxl import Workbook
+    from app.utils import leaderboard_export_header, leaderboard_export_row
+
+    wb = Workbook()
+    ws = wb.active
+    ws.append(leaderboard_export_header(problems))
+    for entry in _before_rows(contest, problems):
+        ws.append(leaderboard_export_row(entry, problems))
+    wb.save(path)
+
+
+def before_pdf(path, contest, problems):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Table
+    from app.utils import leaderboard_export_header, leaderboard_export_row
+
+    data = [leaderboard_export_header(problems)]
+    data += [leaderboard_export_row(entry, problems) for entry in _before_rows(contest, problems)]
+    SimpleDocTemplate(path, pagesize=A4).build([Table(data, repeatRows=1)])
+
+
+def before_csv(path, contest, problems):
+    import csv
+    from app.utils import leaderboard_export_header, leaderboard_export_row
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(leaderboard_export_header(problems))
+    for entry in _before_rows(contest, problems):
+        writer.writerow(leaderboard_export_row(entry, problems))
+    with open(path, 'w') as f:
+        f.write(buffer.getvalue())
+
+
+def _rows(contest, problems):
+    from flask import current_app
+    from app.standings import iter_standings
+    return iter_standings(contest, problems, current_app.config['LEADERBOARD_EXPORT_CHUNK_SIZE'])
+
+
+def after_xlsx(path, contest, problems):
+    from app.utils import generate_leaderboard_excel
+    generate_leaderboard_excel(path, contest, problems, _rows(contest, problems))
+
+
+def after_pdf(path, contest, problems):
+    from app.utils import generate_leaderboard_pdf
+    generate_leaderboard_pdf(path, contest, problems, _rows(contest, problems))
+
+
+def after_csv(path, contest, problems):
+    from app.utils import leaderboard_csv
+    with open(path, 'w') as f:
+        for chunk in leaderboard_csv(problems, _rows(contest, problems)):
+            f.write(chunk)
+
+
+def measure(func, path, contest_id):
+    from app import db
+    from app.models import Contest, Problem
+
+    db.session.remove()
+    contest = db.session.get(Contest, contest_id)
+    problems = contest.problems.order_by(Problem.id.asc()).all()
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        func(path, contest, problems)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': round(elapsed, 2), 'peak_mb': round(peak / 2 ** 20, 1),
+            'file_kb': round(os.path.getsize(path) / 1024)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--participants', type=int, nargs='+', default=[1000, 4000])
+    parser.add_argument('--problems', type=int, default=10)
+    parser.add_argument('--submissions-per-participant', type=int, default=25)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bench-exports-')
+    overrides = {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(root, 'bench.db')}"}
+    report = {'config': {'problems': args.problems, 'submissions_per_participant': args.submissions_per_participant}}
+    try:
+        from app import create_judge_app, db
+        from app.models import Contest
+        from app.standings import rebuild
+
+        app = create_judge_app(_config(overrides))
+        with app.app_context():
+            for participants in args.participants:
+                contest_id = seed(participants, args.problems, participants * args.submissions_per_participant)
+                rebuild(db.session.get(Contest, contest_id))
+                db.session.commit()
+                results = {}
+                for extension in ('xlsx', 'pdf', 'csv'):
+                    results[extension] = {
+                        name: measure(func, os.path.join(root, f'{name}.{extension}'), contest_id)
+                        for name, func in (('before', globals()[f'before_{extension}']),
+                                           ('after', globals()[f'after_{extension}']))
+                    }
+                report[f'{participants} participants'] = results
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,431 @@
+"""End-to-end judge throughput and latency.
+
+Usage (from backend/):
+    python -m benchmarks.judge_bench [--workers 4] [--copies 2] [--languages python,cpp,java,javascript]
+                                     [--huge-n 1000000] [--output report.json]
+    python -m benchmarks.judge_bench --database postgresql://.../scratch --reset
+
+By default a fresh SQLite database, test data store and artifact cache are
+created in a temporary directory. `--database` points at a scratch database
+instead; its tables are dropped and recreated, so `--reset` must be given too.
+
+Four synthetic problems share one task (print the prefix sums of n numbers,
+so output grows with input) and differ in their test sets:
+
+    small_io    10 tests, n <= 100
+    large_io    10 tests, n = 100 000
+    many_tiny  200 tests, n <= 5
+    few_huge     3 tests, n = --huge-n
+
+For every problem and language an accepted solution and Wrong Answer,
+Time Limit Exceeded and Runtime Error solutions are submitted `--copies`
+times. Each copy carries a unique comment, so verdict reuse and the
+artifact cache cannot skip any work. Everything is queued up front. Then
+`--workers` processes drain the queue through claim_next, judge_submission
+and release, the same calls a judge worker makes.
+
+The JSON report has throughput, latency percentiles per phase and peak
+memory. The phases are queue wait, compile, tests, overhead (the rest of
+judge_submission: loading, verdict bookkeeping and commits), judge (claim
+to release) and turnaround (queued to released). Peak memory covers the
+worker processes and the judged solutions. Languages whose toolchain is
+missing are skipped.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import statistics
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+
+from config import Config
+
+LANGUAGES = ('python', 'cpp', 'java', 'javascript')
+REQUIRED_TOOLS = {'python': '/usr/bin/python3', 'cpp': 'g++', 'java': 'javac', 'javascript': 'node'}
+COMMENT = {'python': '#', 'cpp': '//', 'java': '//', 'javascript': '//'}
+TIME_LIMIT_MS = 2000
+
+SOLUTIONS = {
+    'python': {
+        'ac': "import sys\n"
+              "data = sys.stdin.buffer.read().split()\n"
+              "n = int(data[0])\n"
+              "total, out = 0, []\n"
+              "for x in data[1:n + 1]:\n"
+              "    total += int(x)\n"
+              "    out.append(total)\n"
+              "sys.stdout.write('\\n'.join(map(str, out)) + '\\n')\n",
+        'wa': "print(0)\n",
+        'tle': "while True:\n    pass\n",
+        're': "print([][1])\n",
+    },
+    'cpp': {
+        'ac': "#include <cstdio>\n"
+              "int main() {\n"
+              "    int n;\n"
+              "    if (scanf(\"%d\", &n) != 1) return 0;\n"
+              "    long long total = 0, x;\n"
+              "    for (int i = 0; i < n && scanf(\"%lld\", &x) == 1; i++) {\n"
+              "        total += x;\n"
+              "        printf(\"%lld\\n\", total);\n"
+              "    }\n"
+              "}\n",
+        'wa': "#include <cstdio>\nint main() { puts(\"0\"); }\n",
+        'tle': "int main() { volatile unsigned long long i = 0; for (;;) i++; }\n",
+        're': "int main() { volatile int *p = nullptr; return *p; }\n",
+    },
+    'java': {
+        'ac': "import java.io.*;\n"
+              "public class Solution {\n"
+              "    public static void main(String[] args) throws IOException {\n"
+              "        StreamTokenizer in = new StreamTokenizer(new BufferedInputStream(System.in));\n"
+              "        PrintWriter out = new PrintWriter(new BufferedOutputStream(System.out));\n"
+              "        in.nextToken();\n"
+              "        int n = (int) in.nval;\n"
+              "        long total = 0;\n"
+              "        for (int i = 0; i < n; i++) {\n"
+              "            in.nextToken();\n"
+              "            total += (long) in.nval;\n"
+              "            out.println(total);\n"
+              "        }\n"
+              "        out.flush();\n"
+              "    }\n"
+              "}\n",
+        'wa': "public class Solution {\n"
+              "    public static void main(String[] args) { System.out.println(0); }\n"
+              "}\n",
+        'tle': "public class Solution {\n"
+               "    public static void main(String[] args) { while (true) { } }\n"
+               "}\n",
+        're': "public class Solution {\n"
+              "    public static void main(String[] args) { throw new IllegalStateException(\"boom\"); }\n"
+              "}\n",
+    },
+    'javascript': {
+        'ac': "const data = require('fs').readFileSync(0, 'utf8').split(/\\s+/).filter(Boolean).map(Number);\n"
+              "const n = data[0];\n"
+              "const out = new Array(n);\n"
+              "let total = 0;\n"
+              "for (let i = 0; i < n; i++) {\n"
+              "    total += data[i + 1];\n"
+              "    out[i] = total;\n"
+              "}\n"
+              "process.stdout.write(out.join('\\n') + '\\n');\n",
+        'wa': "console.log(0);\n",
+        'tle': "for (;;) { }\n",
+        're': "throw new Error('boom');\n",
+    },
+}
+
+EXPECTED = {
+    'ac': 'Accepted',
+    'wa': 'Wrong Answer',
+    'tle': 'Time Limit Exceeded',
+    're': 'Runtime Error',
+}
+
+
+def _problems(huge_n):
+    """name -> list of test sizes"""
+    rng = random.Random(1)
+    return {
+        'small_io': [rng.randint(1, 100) for _ in range(10)],
+        'large_io': [100_000] * 10,
+        'many_tiny': [rng.randint(1, 5) for _ in range(200)],
+        'few_huge': [huge_n] * 3,
+    }
+
+
+def _test_data(n, rng):
+    values = [rng.randint(0, 1000) for _ in range(n)]
+    total, sums = 0, []
+    for value in values:
+        total += value
+        sums.append(total)
+    test_input = f"{n}\n" + ' '.join(map(str, values)) + '\n'
+    return test_input, '\n'.join(map(str, sums)) + '\n'
+
+
+def _config(overrides):
+    return type('BenchConfig', (Config,), overrides)
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def _summary(samples):
+    if not samples:
+        return None
+    return {
+        'count': len(samples),
+        'mean_ms': round(statistics.mean(samples) * 1000, 2),
+        'p50_ms': round(_percentile(samples, 0.50) * 1000, 2),
+        'p90_ms': round(_percentile(samples, 0.90) * 1000, 2),
+        'p99_ms': round(_percentile(samples, 0.99) * 1000, 2),
+        'max_ms': round(max(samples) * 1000, 2),
+    }
+
+
+def seed(app, languages, copies, huge_n):
+    """Create the problems, tests and queued submissions; returns {submission id: (language, kind)}"""
+    from app import db
+    from app.models import Contest, Problem, Submission, TestCase, User
+    from judge.job_queue import enqueue
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        now = datetime.now(timezone.utc)
+        contest = Contest(title='Judge benchmark', description='Synthetic load', is_public=False,
+                          start_time=now - timedelta(hours=1), end_time=now + timedelta(days=1))
+        db.session.add(contest)
+        users = {}
+        for language in languages:
+            users[language] = User(username=f'bench-{language}', email=f'bench-{language}@example.com',
+                                   role='participant')
+            users[language].set_password(User.generate_random_password())
+        db.session.add_all(users.values())
+        db.session.flush()
+
+        rng = random.Random(2)
+        problems = {}
+        for name, sizes in _problems(huge_n).items():
+            problem = Problem(contest_id=contest.id, title=name, description=name, time_limit=TIME_LIMIT_MS,
+                              expected_input='', expected_output='')
+            db.session.add(problem)
+            db.session.flush()
+            for n in sizes:
+                test_case = TestCase(problem_id=problem.id)
+                test_case.set_data(*_test_data(n, rng))
+                db.session.add(test_case)
+            problems[name] = problem
+        db.session.commit()
+
+        planned = {}
+        for copy in range(copies):
+            for problem in problems.values():
+                for language in languages:
+                    for kind, code in SOLUTIONS[language].items():
+                        submission = Submission(
+                            user_id=users[language].id,
+                            problem_id=problem.id,
+                            contest_id=contest.id,
+                            code=f"{code}{COMMENT[language]} bench {problem.title} {copy}\n",
+                            language=language,
+                        )
+                        enqueue(submission)
+                        db.session.add(submission)
+                        db.session.flush()
+                        planned[submission.id] = (language, kind)
+        db.session.commit()
+        return planned
+
+
+def _worker(overrides, results, verbose):
+    """One judge worker: drain the queue, timing each phase"""
+    from app import create_judge_app, db
+    from judge import mock_judge
+    from judge.job_queue import claim_next, fail, release
+    from judge.log import configure_logging
+
+    configure_logging('DEBUG' if verbose else 'WARNING', 0)
+
+    phases = Counter()
+
+    def timed(name, func):
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                phases[name] += time.perf_counter() - started
+        return wrapper
+
+    mock_judge.compile_code = timed('compile', mock_judge.compile_code)
+    mock_judge.run_tests = timed('tests', mock_judge.run_tests)
+
+    try:
+        app = create_judge_app(_config(overrides))
+        config = app.config
+        worker_id = f"bench:{os.getpid()}"
+        with app.app_context():
+            while True:
+                submission_id = claim_next(worker_id, config['JUDGE_LEASE_SECONDS'], config['JUDGE_MAX_ATTEMPTS'])
+                if submission_id is None:
+                    break
+                phases.clear()
+                claimed = time.perf_counter()
+                try:
+                    mock_judge.judge_submission(submission_id)
+                    release(submission_id, worker_id)
+                except Exception as e:
+                    fail(submission_id, worker_id, f"Judge error: {str(e)}")
+                finally:
+                    db.session.remove()
+                judge = time.perf_counter() - claimed
+                results.put({
+                    'id': submission_id,
+                    'released_at': time.time(),
+                    'judge': judge,
+                    'compile': phases['compile'],
+                    'tests': phases['tests'],
+                    'overhead': max(0.0, judge - phases['compile'] - phases['tests']),
+                })
+    finally:
+        # Always report in, so the parent never waits for a worker that crashed
+        results.put({'worker_peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss})
+
+
+def run(overrides, workers, verbose):
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    processes = [ctx.Process(target=_worker, args=(overrides, results, verbose)) for _ in range(workers)]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+
+    timings, worker_rss, finished = {}, [], 0
+    while finished < workers:
+        item = results.get()
+        if 'worker_peak_rss_kb' in item:
+            worker_rss.append(item['worker_peak_rss_kb'])
+            finished += 1
+        else:
+            timings[item['id']] = item
+    elapsed = time.perf_counter() - started
+    for process in processes:
+        process.join()
+    return timings, worker_rss, elapsed
+
+
+def report(app, planned, timings, worker_rss, elapsed):
+    from app.models import Submission
+    from app.timeutil import as_utc
+
+    phases = defaultdict(list)
+    by_language = defaultdict(lambda: {'turnaround': [], 'mismatches': 0, 'solution_peak_kb': 0})
+    verdicts = Counter()
+    mismatches = []
+    with app.app_context():
+        for submission in Submission.query.filter(Submission.id.in_(planned)).all():
+            language, kind = planned[submission.id]
+            verdicts[f"{kind}:{submission.status}"] += 1
+            stats = by_language[language]
+            stats['solution_peak_kb'] = max(stats['solution_peak_kb'], submission.memory_used or 0)
+            if submission.status != EXPECTED[kind]:
+                stats['mismatches'] += 1
+                mismatches.append({'id': submission.id, 'language': language, 'problem': submission.problem.title,
+                                   'expected': EXPECTED[kind], 'got': submission.status,
+                                   'error': submission.error_message})
+
+            timing = timings.get(submission.id)
+            if timing is None:
+                continue
+            for phase in ('compile', 'tests', 'overhead', 'judge'):
+                phases[phase].append(timing[phase])
+            if submission.queue_wait is not None:
+                phases['queue_wait'].append(submission.queue_wait)
+            queued_at = as_utc(submission.queued_at)
+            if queued_at is not None:
+                turnaround = timing['released_at'] - queued_at.timestamp()
+                phases['turnaround'].append(turnaround)
+                stats['turnaround'].append(turnaround)
+
+    return {
+        'submissions': len(planned),
+        'judged': len(timings),
+        'wall_seconds': round(elapsed, 3),
+        'throughput_per_second': round(len(timings) / elapsed, 3) if elapsed else None,
+        'phases': {name: _summary(samples) for name, samples in sorted(phases.items())},
+        'languages': {
+            language: {
+                'submissions': len(stats['turnaround']),
+                'turnaround': _summary(stats['turnaround']),
+                'verdict_mismatches': stats['mismatches'],
+                'solution_peak_kb': stats['solution_peak_kb'],
+            }
+            for language, stats in sorted(by_language.items())
+        },
+        'verdicts': dict(sorted(verdicts.items())),
+        'mismatches': mismatches[:20],
+        'memory': {
+            'worker_peak_rss_kb': max(worker_rss, default=0),
+            'solution_peak_kb': max((stats['solution_peak_kb'] for stats in by_language.values()), default=0),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--copies', type=int, default=1)
+    parser.add_argument('--languages', default=','.join(LANGUAGES))
+    parser.add_argument('--huge-n', type=int, default=1_000_000)
+    parser.add_argument('--test-parallelism', type=int, default=Config.JUDGE_TEST_PARALLELISM)
+    parser.add_argument('--warm-runtimes', default='', help='e.g. python,java,javascript')
+    parser.add_argument('--database', help='URI of a scratch database (its tables are dropped)')
+    parser.add_argument('--reset', action='store_true', help='confirm dropping the tables of --database')
+    parser.add_argument('--output', help='also write the report to this file')
+    parser.add_argument('--verbose', action='store_true', help='log every judging step of the workers')
+    args = parser.parse_args()
+
+    if args.database and not args.reset:
+        parser.error('--database drops and recreates every table; pass --reset to confirm')
+
+    languages, skipped = [], {}
+    for language in args.languages.split(','):
+        if shutil.which(REQUIRED_TOOLS[language]):
+            languages.append(language)
+        else:
+            skipped[language] = 'toolchain not installed'
+    if not languages:
+        raise SystemExit('None of the requested languages can be judged here')
+
+    root = tempfile.mkdtemp(prefix='bench-judge-')
+    overrides = {
+        'SQLALCHEMY_DATABASE_URI': args.database or f"sqlite:///{os.path.join(root, 'bench.db')}",
+        'TESTDATA_DIR': os.path.join(root, 'testdata'),
+        'JUDGE_ARTIFACT_CACHE_DIR': os.path.join(root, 'artifacts'),
+        'JUDGE_TEST_PARALLELISM': args.test_parallelism,
+        'JUDGE_WARM_RUNTIMES': [l for l in args.warm_runtimes.split(',') if l],
+    }
+    try:
+        from app import create_judge_app
+        app = create_judge_app(_config(overrides))
+        planned = seed(app, languages, args.copies, args.huge_n)
+        timings, worker_rss, elapsed = run(overrides, args.workers, args.verbose)
+        result = {
+            'config': {
+                'workers': args.workers,
+                'copies': args.copies,
+                'languages': languages,
+                'skipped': skipped,
+                'huge_n': args.huge_n,
+                'test_parallelism': args.test_parallelism,
+                'warm_runtimes': overrides['JUDGE_WARM_RUNTIMES'],
+                'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+                'cpus': os.cpu_count(),
+            },
+            **report(app, planned, timings, worker_rss, elapsed),
+        }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Per-submission judge setup overhead: full app per submission vs. shared judge app.
+
+Usage (from backend/, against the configured database):
+    python -m benchmarks.judge_setup [--submissions 200]
+
+"before" builds the web app with create_app() and pushes a fresh app context
+for every submission, as judge_submission used to. "after" reuses one
+create_judge_app() context for the whole run, as a judge worker does now.
+Each iteration loads one submission row, which is what judging needs before
+any program runs. Reported are the setup latency per submission and the
+number of new database connections opened.
+"""
+import argparse
+import json
+import statistics
+import time
+
+from sqlalchemy import event
+
+from app import create_app, create_judge_app, db
+from app.models import Submission
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def _summary(samples, connections):
+    return {
+        'mean_ms': round(statistics.mean(samples) * 1000, 3),
+        'p50_ms': round(_percentile(samples, 0.50) * 1000, 3),
+        'p95_ms': round(_percentile(samples, 0.95) * 1000, 3),
+        'connections_opened': connections,
+    }
+
+
+def _count_connections(app, counter):
+    with app.app_context():
+        event.listen(db.engine, 'connect', lambda *args: counter.append(1))
+
+
+def _load(submission_id):
+    db.session.get(Submission, submission_id)
+    db.session.remove()
+
+
+def before(submissions, submission_id):
+    samples, connections = [], []
+    for _ in range(submissions):
+        started = time.perf_counter()
+        app = create_app()
+        _count_connections(app, connections)
+        with app.app_context():
+            _load(submission_id)
+        samples.append(time.perf_counter() - started)
+    return _summary(samples, len(connections))
+
+
+def after(submissions, submission_id):
+    samples, connections = [], []
+    app = create_judge_app()
+    _count_connections(app, connections)
+    with app.app_context():
+        for _ in range(submissions):
+            started = time.perf_counter()
+            _load(submission_id)
+            samples.append(time.perf_counter() - started)
+    return _summary(samples, len(connections))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--submissions', type=int, default=200)
+    args = parser.parse_args()
+
+    with create_judge_app().app_context():
+        submission_id = db.session.query(db.func.min(Submission.id)).scalar()
+    if submission_id is None:
+        raise SystemExit('The database has no submissions to load')
+
+    print(json.dumps({
+        'before': before(args.submissions, submission_id),
+        'after': after(args.submissions, submission_id),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""Leaderboard page under concurrent refreshes: recomputed per view vs. cached per version.
+
+Usage (from backend/):
+    python -m benchmarks.leaderboard_cache [--clients 16] [--seconds 10] [--verdict-interval 1.0]
+                                           [--participants 2000] [--submissions 100000]
+                                           [--backend memory|filesystem]
+
+A contest is generated as in benchmarks.standings and its standings table
+is built. `--clients` threads then keep requesting the first page of its
+leaderboard for `--seconds`, each logged in as a different participant, while a
+verdict bumps the standings version every `--verdict-interval` seconds.
+
+    before        a backend that stores nothing, so every view computes
+                  the page again, as before the cache
+    after         the configured backend
+    revalidate    the same, but clients send If-None-Match with the ETag
+                  of their last page, as browsers do on a refresh
+
+Each phase reports requests per second, latency percentiles, how often
+the page was computed, and how many responses were 304s.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from benchmarks.standings import _config, seed
+
+
+class NullBackend:
+    """Stores nothing: every lookup misses and every lock is free"""
+
+    def __init__(self, app=None):
+        pass
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def add(self, key, value, ttl=None):
+        return True
+
+    def delete(self, key):
+        pass
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def _bump_versions(app, contest_id, interval, stop, bumps):
+    from app import db
+    from app.models import Contest
+    with app.app_context():
+        while not stop.wait(interval):
+            db.session.get(Contest, contest_id).bump_standings_version()
+            db.session.commit()
+            db.session.remove()
+            bumps.append(1)
+
+
+def _client(app, contest_id, user_id, revalidate, stop, samples, statuses):
+    etag = None
+    with app.test_client() as client:
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+        while not stop.is_set():
+            headers = {'If-None-Match': etag} if revalidate and etag else {}
+            started = time.perf_counter()
+            response = client.get(f'/contest/{contest_id}/leaderboard', headers=headers)
+            samples.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+            etag = response.headers.get('ETag') or etag
+
+
+def phase(app, contest_id, user_ids, clients, seconds, interval, revalidate):
+    import app.standings as standings
+
+    computed = []
+    compute = standings.standings_page
+
+    def counting(*args, **kwargs):
+        computed.append(1)
+        return compute(*args, **kwargs)
+
+    standings.standings_page = counting
+    stop, samples, statuses, bumps = threading.Event(), [], Counter(), []
+    threads = [threading.Thread(target=_client, args=(app, contest_id, user_ids[i % len(user_ids)], revalidate,
+                                                      stop, samples, statuses))
+               for i in range(clients)]
+    threads.append(threading.Thread(target=_bump_versions, args=(app, contest_id, interval, stop, bumps)))
+    try:
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        standings.standings_page = compute
+    return {
+        'requests': len(samples),
+        'requests_per_second': round(len(samples) / seconds, 1),
+        'mean_ms': round(statistics.mean(samples) * 1000, 1),
+        'p50_ms': round(_percentile(samples, 0.50) * 1000, 1),
+        'p95_ms': round(_percentile(samples, 0.95) * 1000, 1),
+        'standings_computed': len(computed),
+        'versions': len(bumps) + 1,
+        'status_counts': {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--verdict-interval', type=float, default=1.0)
+    parser.add_argument('--participants', type=int, default=2000)
+    parser.add_argument('--problems', type=int, default=10)
+    parser.add_argument('--submissions', type=int, default=100000)
+    parser.add_argument('--backend', default='memory', choices=['memory', 'filesystem'])
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bench-leaderboard-')
+    overrides = {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(root, 'bench.db')}",
+        'CACHE_DIR': os.path.join(root, 'cache'),
+        'WTF_CSRF_ENABLED': False,
+    }
+    try:
+        from app import create_app, db
+        from app.models import Contest, User
+        from app.standings import rebuild
+
+        setup = create_app(_config(overrides))
+        with setup.app_context():
+            contest_id = seed(args.participants, args.problems, args.submissions)
+            rebuild(db.session.get(Contest, contest_id))
+            db.session.commit()
+            user_ids = [id for id, in db.session.query(User.id).limit(args.clients)]
+
+        report = {'config': {'clients': args.clients, 'seconds': args.seconds,
+                             'verdict_interval': args.verdict_interval, 'participants': args.participants,
+                             'submissions': args.submissions, 'backend': args.backend}}
+        for name, backend, revalidate in (('before', 'benchmarks.leaderboard_cache:NullBackend', False),
+                                          ('after', args.backend, False),
+                                          ('revalidate', args.backend, True)):
+            app = create_app(_config({**overrides, 'CACHE_BACKEND': backend}))
+            report[name] = phase(app, contest_id, user_ids, args.clients, args.seconds,
+                                 args.verdict_interval, revalidate)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
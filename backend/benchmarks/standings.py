@@ -0,0 +1,244 @@
+"""Leaderboard computation: per-pair query loop vs. the standings engine.
+
+Usage (from backend/):
+    python -m benchmarks.standings [--participants 2000] [--problems 10] [--submissions 100000] [--runs 3]
+    python -m benchmarks.standings --database postgresql://.../scratch --reset
+
+By default a fresh SQLite database is created in a temporary directory.
+`--database` points at a scratch database instead; its tables are dropped
+and recreated, so `--reset` must be given too.
+
+One contest is generated with `--participants` users, `--problems`
+problems and `--submissions` submissions spread randomly over them. Each
+submission carries about 2 KB of code, and about a quarter of them are
+Accepted. "before" is the loop the leaderboard used to run: one query per
+participant-problem pair, loading whole submission rows. "rebuild" is
+`flask standings-rebuild` for the contest: one aggregate query over all its
+submissions, which is what a leaderboard would cost without the
+contest_standings table. "after" is app.standings.contest_standings, which
+reads that table. "page" is one leaderboard page of LEADERBOARD_PAGE_SIZE
+rows from the middle of the ranking, and "my_rank" is
+app.standings.rank_of for the participant ranked last. The report has the
+time and number of queries of each, and confirms that the old loop and
+the table give the same standings, and that rank_of agrees with the
+position of a sample of participants.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event, insert
+
+from config import Config
+
+CODE = "#include <bits/stdc++.h>\nint main() {\n" + "    // padding to a realistic source size\n" * 48 + "}\n"
+VERDICTS = ['Accepted', 'Wrong Answer', 'Wrong Answer', 'Time Limit Exceeded', 'Runtime Error']
+
+
+def _config(overrides):
+    return type('BenchConfig', (Config,), overrides)
+
+
+def seed(participants, problems, submissions):
+    """Create the contest; returns its id"""
+    from app import db
+    from app.models import Contest, Problem, Submission, User, contest_participants
+
+    db.drop_all()
+    db.create_all()
+    now = datetime.now(timezone.utc)
+    contest = Contest(title='Standings benchmark', description='Synthetic contest', is_public=True,
+                      start_time=now - timedelta(hours=5), end_time=now)
+    db.session.add(contest)
+    db.session.flush()
+    problem_ids = []
+    for index in range(problems):
+        problem = Problem(contest_id=contest.id, title=f'P{index + 1}', description='', time_limit=1000)
+        db.session.add(problem)
+        db.session.flush()
+        problem_ids.append(problem.id)
+    db.session.execute(insert(User), [
+        {'username': f'bench-{i}', 'email': f'bench-{i}@example.com', 'password_hash': '-', 'role': 'participant'}
+        for i in range(participants)
+    ])
+    user_ids = [id for id, in db.session.query(User.id).filter(User.username.like('bench-%'))]
+    db.session.execute(insert(contest_participants),
+                       [{'contest_id': contest.id, 'user_id': user_id} for user_id in user_ids])
+
+    rng = random.Random(20)
+    batch = []
+    for _ in range(submissions):
+        batch.append({
+            'user_id': rng.choice(user_ids),
+            'problem_id': rng.choice(problem_ids),
+            'contest_id': contest.id,
+            'code': CODE,
+            'language': 'cpp',
+            'timestamp': contest.start_time + timedelta(seconds=rng.randrange(5 * 3600)),
+            'status': rng.choice(VERDICTS),
+            'execution_time': round(rng.uniform(0.01, 1.0), 3),
+        })
+        if len(batch) == 5000:
+            db.session.execute(insert(Submission), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(Submission), batch)
+    db.session.commit()
+    return contest.id
+
+
+def before(contest):
+    """The leaderboard's former per-pair loop"""
+    from app.models import Problem, Submission
+
+    participants = contest.participants.all()
+    problems = contest.problems.order_by(Problem.id.asc()).all()
+    leaderboard_data = []
+    for user in participants:
+        user_data = {'user': user, 'problems': {}, 'timestamp': None, 'total_score': 0, 'total_time': 0,
+                     'submissions_count': 0}
+        latest_timestamp = None
+        for problem in problems:
+            submissions = Submission.query.filter_by(
+                user_id=user.id,
+                problem_id=problem.id
+            ).order_by(Submission.timestamp.asc()).all()
+            submission_count = len(submissions)
+            user_data['submissions_count'] += submission_count
+            accepted_submission = next((s for s in submissions if s.status == 'Accepted'), None)
+            if accepted_submission:
+                user_data['problems'][problem.id] = {'is_accepted': True, 'time': accepted_submission.execution_time,
+                                                     'attempts': submission_count,
+                                                     'status': accepted_submission.status}
+                user_data['total_score'] += 1
+                user_data['total_time'] += accepted_submission.execution_time
+                if not latest_timestamp or accepted_submission.timestamp > latest_timestamp:
+                    latest_timestamp = accepted_submission.timestamp
+            elif submission_count > 0:
+                user_data['problems'][problem.id] = {'is_accepted': False, 'attempts': submission_count}
+            else:
+                user_data['problems'][problem.id] = None
+        user_data['timestamp'] = latest_timestamp
+        leaderboard_data.append(user_data)
+    leaderboard_data.sort(key=lambda x: (-x['total_score'], x['timestamp'] or datetime.max, x['total_time']))
+    return leaderboard_data
+
+
+def rebuild(contest):
+    from app import db
+    from app.standings import rebuild
+    rebuild(contest)
+    db.session.commit()
+
+
+def after(contest):
+    from app.standings import contest_standings
+    return contest_standings(contest)
+
+
+def page(contest):
+    from flask import current_app
+    from app.models import Problem
+    from app.standings import standings_page
+    per_page = current_app.config['LEADERBOARD_PAGE_SIZE']
+    middle = max(1, contest.participants.count() // per_page // 2)
+    return standings_page(contest, contest.problems.order_by(Problem.id.asc()).all(), middle, per_page)
+
+
+def my_rank(contest, user_id):
+    from app.standings import rank_of
+    return rank_of(contest.id, user_id)
+
+
+def _comparable(standings):
+    return [(entry['user'].id, entry['problems'], entry['timestamp'], entry['total_score'],
+             round(entry['total_time'], 6), entry['submissions_count']) for entry in standings]
+
+
+def measure(func, contest_id, runs):
+    from app import db
+    from app.models import Contest
+
+    queries = []
+    listener = lambda *args: queries.append(1)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    samples = []
+    try:
+        for _ in range(runs):
+            db.session.remove()
+            contest = db.session.get(Contest, contest_id)
+            queries.clear()
+            started = time.perf_counter()
+            standings = func(contest)
+            samples.append(time.perf_counter() - started)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return standings, {
+        'mean_ms': round(statistics.mean(samples) * 1000, 1),
+        'min_ms': round(min(samples) * 1000, 1),
+        'queries': len(queries),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--participants', type=int, default=2000)
+    parser.add_argument('--problems', type=int, default=10)
+    parser.add_argument('--submissions', type=int, default=100000)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--database', help='URI of a scratch database (its tables are dropped)')
+    parser.add_argument('--reset', action='store_true', help='confirm dropping the tables of --database')
+    args = parser.parse_args()
+
+    if args.database and not args.reset:
+        parser.error('--database drops and recreates every table; pass --reset to confirm')
+
+    root = tempfile.mkdtemp(prefix='bench-standings-')
+    overrides = {'SQLALCHEMY_DATABASE_URI': args.database or f"sqlite:///{os.path.join(root, 'bench.db')}"}
+    try:
+        from app import create_judge_app, db
+        from app.models import Contest
+        app = create_judge_app(_config(overrides))
+        with app.app_context():
+            started = time.perf_counter()
+            contest_id = seed(args.participants, args.problems, args.submissions)
+            seeded = time.perf_counter() - started
+            old, report_before = measure(before, contest_id, args.runs)
+            _, report_rebuild = measure(rebuild, contest_id, args.runs)
+            new, report_after = measure(after, contest_id, args.runs)
+            _, report_page = measure(page, contest_id, args.runs)
+            last = new[-1]['user'].id
+            _, report_rank = measure(lambda contest: my_rank(contest, last), contest_id, args.runs)
+            contest = db.session.get(Contest, contest_id)
+            sample = new[::max(1, len(new) // 50)] + new[-1:]
+            report = {
+                'config': {
+                    'participants': args.participants,
+                    'problems': args.problems,
+                    'submissions': args.submissions,
+                    'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+                    'seed_s': round(seeded, 1),
+                },
+                'before': report_before,
+                'rebuild': report_rebuild,
+                'after': report_after,
+                'speedup': round(report_before['mean_ms'] / max(report_after['mean_ms'], 0.001), 1),
+                'same_standings': sorted(_comparable(old)) == sorted(_comparable(new)),
+                'same_ranking': [entry['user'].id for entry in old] == [entry['user'].id for entry in new],
+                'page': report_page,
+                'my_rank': report_rank,
+                'rank_of_matches': all(my_rank(contest, entry['user'].id) == entry['rank'] for entry in sample),
+            }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Does a forking submission slow down the runs after it?
+
+Usage (from backend/):
+    python -m benchmarks.stray_processes [--runs 10] [--width 0]
+
+A CPU-bound C++ program is timed `--runs` times, then a forking
+submission is run once, then the C++ program is timed again. The forking
+submission starts `--width` busy children in its own process group
+(default: 2 per CPU). It also starts as many that detach with setsid and
+a double fork, and exits as soon as they run. The report compares the timings
+before and after, and counts the forked processes still alive afterwards.
+Both figures should be the same before and after, and no forked process
+should be left.
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import statistics
+import tempfile
+import time
+
+from judge.compiler import ArtifactCache, compile_code
+from judge.metrics import registry
+from judge.mock_judge import Verdict, run_artifact
+
+BASELINE = ("#include <cstdio>\n"
+            "int main() {\n"
+            "    volatile unsigned long long x = 0;\n"
+            "    for (unsigned long long i = 0; i < 300000000ULL; i++) x += i ^ (x >> 3);\n"
+            "    std::printf(\"%llu\\n\", (unsigned long long) x);\n"
+            "}\n")
+
+FORKER = """import os, sys
+width = int(input())
+def spin():
+    while True:
+        pass
+for _ in range(width):
+    if os.fork() == 0:
+        spin()
+ready, started = os.pipe()
+for _ in range(width):
+    if os.fork() == 0:
+        os.setsid()
+        if os.fork() == 0:
+            os.write(started, b'.')
+            spin()
+        os._exit(0)
+# Only exit once every detached child is running outside this process group
+while width > 0:
+    width -= len(os.read(ready, width))
+print('forked')
+sys.stdout.flush()
+os._exit(0)
+"""
+
+
+def _summary(samples):
+    return {
+        'mean_ms': round(statistics.mean(samples) * 1000, 2),
+        'max_ms': round(max(samples) * 1000, 2),
+    }
+
+
+def _time_baseline(artifact, input_path, runs):
+    cpu, wall = [], []
+    for _ in range(runs):
+        result = run_artifact(artifact, input_path, 10)
+        if result.verdict != Verdict.ACCEPTED:
+            raise RuntimeError(f"baseline: {result.verdict} {result.output[:200]!r}")
+        cpu.append(result.exec_time)
+        wall.append(result.wall_time)
+    return {'cpu': _summary(cpu), 'wall': _summary(wall)}
+
+
+def _survivors(marker: str):
+    pids = []
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/cmdline', 'rb') as f:
+                if marker.encode() in f.read():
+                    pids.append(int(name))
+        except OSError:
+            continue
+    return pids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--width', type=int, default=0, help='children of each kind (default: 2 per CPU)')
+    args = parser.parse_args()
+    width = args.width or 2 * (os.cpu_count() or 1)
+
+    root = tempfile.mkdtemp(prefix='bench-strays-')
+    cache = ArtifactCache(root, 256 * 1024 * 1024)
+    empty_input = os.path.join(root, 'empty.txt')
+    open(empty_input, 'w').close()
+    width_input = os.path.join(root, 'width.txt')
+    with open(width_input, 'w') as f:
+        f.write(f"{width}\n")
+
+    survivors = []
+    try:
+        baseline, error = compile_code(BASELINE, 'cpp', cache, 'standard')
+        forker, error2 = compile_code(FORKER, 'python', cache, 'standard')
+        if baseline is None or forker is None:
+            raise RuntimeError(error or error2)
+
+        report = {'width': width, 'before': _time_baseline(baseline, empty_input, args.runs)}
+        result = run_artifact(forker, width_input, 5)
+        report['forker'] = {'verdict': result.verdict.value, 'wall_ms': round(result.wall_time * 1000, 2)}
+        report['after'] = _time_baseline(baseline, empty_input, args.runs)
+        time.sleep(0.5)
+        survivors = _survivors(forker.directory)
+        report['survivors'] = len(survivors)
+        report['reported_strays'] = sum(value for (name, _), value in registry.counters.items()
+                                        if name == 'judge_reaped_processes_total')
+        print(json.dumps(report, indent=2))
+    finally:
+        for pid in survivors:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
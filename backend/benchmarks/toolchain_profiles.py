@@ -0,0 +1,162 @@
+"""Compile and run time of each language under each toolchain profile.
+
+Usage (from backend/):
+    python -m benchmarks.toolchain_profiles [--compiles 5] [--runs 5] [--n 300000]
+        [--profiles plain,standard,gnu++20] [--languages cpp,java,python,javascript]
+
+Every compile builds a fresh artifact (the source carries a nonce), so the
+compile figures are real compiler invocations; building a profile's
+precompiled header is reported on its own as `pch_build_seconds`. The run
+figures are the CPU time of a sort-and-prefix-sum program over `--n`
+integers, measured through `run_artifact` like a judged test.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+
+from judge.compiler import ArtifactCache, compile_code, toolchain_version
+from judge.mock_judge import Verdict, run_artifact
+from judge.toolchains import PROFILES, precompiled_header_dir
+
+PROGRAMS = {
+    'cpp': "#include <bits/stdc++.h>\n"
+           "using namespace std;\n"
+           "int main() {\n"
+           "    ios::sync_with_stdio(false); cin.tie(nullptr);\n"
+           "    int n; cin >> n;\n"
+           "    vector<long long> a(n);\n"
+           "    for (auto &x : a) cin >> x;\n"
+           "    sort(a.begin(), a.end());\n"
+           "    long long s = 0, t = 0;\n"
+           "    for (auto x : a) { s += x; t = (t + s) % 1000000007; }\n"
+           "    cout << t << '\\n';\n"
+           "}\n",
+    'java': "import java.io.*;\n"
+            "import java.util.*;\n"
+            "public class Solution {\n"
+            "    public static void main(String[] args) throws IOException {\n"
+            "        DataInputStream in = new DataInputStream(new BufferedInputStream(System.in, 1 << 16));\n"
+            "        int n = next(in);\n"
+            "        long[] a = new long[n];\n"
+            "        for (int i = 0; i < n; i++) a[i] = next(in);\n"
+            "        Arrays.sort(a);\n"
+            "        long s = 0, t = 0;\n"
+            "        for (long x : a) { s += x; t = (t + s) % 1000000007L; }\n"
+            "        System.out.println(t);\n"
+            "    }\n"
+            "    static int next(DataInputStream in) throws IOException {\n"
+            "        int r = 0, c = in.read();\n"
+            "        while (c < '0') c = in.read();\n"
+            "        while (c >= '0') { r = r * 10 + c - '0'; c = in.read(); }\n"
+            "        return r;\n"
+            "    }\n"
+            "}\n",
+    'python': "import sys\n"
+              "data = sys.stdin.buffer.read().split()\n"
+              "a = sorted(map(int, data[1:int(data[0]) + 1]))\n"
+              "s = t = 0\n"
+              "for x in a:\n"
+              "    s += x\n"
+              "    t = (t + s) % 1000000007\n"
+              "print(t)\n",
+    'javascript': "const data = require('fs').readFileSync(0, 'utf8').trim().split(/\\s+/).map(Number);\n"
+                  "const a = Float64Array.from(data.slice(1, data[0] + 1)).sort();\n"
+                  "let s = 0n, t = 0n;\n"
+                  "for (const x of a) { s += BigInt(x); t = (t + s) % 1000000007n; }\n"
+                  "console.log(t.toString());\n",
+}
+
+COMMENT = {'cpp': '//', 'java': '//', 'javascript': '//', 'python': '#'}
+
+REQUIRED_TOOLS = {'cpp': 'g++', 'java': 'javac', 'python': '/usr/bin/python3', 'javascript': 'node'}
+
+
+def _summary(samples):
+    return {
+        'mean_ms': round(statistics.mean(samples) * 1000, 2),
+        'min_ms': round(min(samples) * 1000, 2),
+        'max_ms': round(max(samples) * 1000, 2),
+    }
+
+
+def _expected(values):
+    s = t = 0
+    for x in sorted(values):
+        s += x
+        t = (t + s) % 1000000007
+    return str(t)
+
+
+def _measure(profile, language, root, input_path, expected, args):
+    cache = ArtifactCache(os.path.join(root, profile.name), 1024 * 1024 * 1024)
+    result = {}
+    settings = profile.language(language)
+    if settings.precompiled_header:
+        started = time.perf_counter()
+        built = precompiled_header_dir(settings.compile_flags, toolchain_version(language), cache.root)
+        result['pch_build_seconds'] = round(time.perf_counter() - started, 2) if built else 'failed'
+
+    compile_times = []
+    artifact = None
+    for _ in range(args.compiles):
+        code = f"{PROGRAMS[language]}{COMMENT[language]} {uuid.uuid4().hex}\n"
+        started = time.perf_counter()
+        artifact, error = compile_code(code, language, cache, profile.name)
+        compile_times.append(time.perf_counter() - started)
+        if artifact is None:
+            raise RuntimeError(f"{profile.name}/{language}: compilation failed: {error}")
+    if language in ('cpp', 'java'):
+        result['compile'] = _summary(compile_times)
+    result['command'] = ' '.join(os.path.basename(part) for part in artifact.command)
+
+    exec_times = []
+    for _ in range(args.runs):
+        run = run_artifact(artifact, input_path, 30)
+        if run.verdict != Verdict.ACCEPTED or run.output.strip() != expected:
+            raise RuntimeError(f"{profile.name}/{language}: unexpected result {run.verdict} {run.output[:80]!r}")
+        exec_times.append(run.exec_time)
+    result['run'] = _summary(exec_times)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--compiles', type=int, default=5)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--n', type=int, default=300000)
+    parser.add_argument('--profiles', default=','.join(PROFILES))
+    parser.add_argument('--languages', default='cpp,java,python,javascript')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bench-toolchains-')
+    rng = random.Random(1)
+    values = [rng.randrange(10 ** 9) for _ in range(args.n)]
+    input_path = os.path.join(root, 'input.txt')
+    with open(input_path, 'w') as f:
+        f.write(f"{args.n}\n{' '.join(map(str, values))}\n")
+    expected = _expected(values)
+
+    report = {}
+    try:
+        for name in args.profiles.split(','):
+            profile = PROFILES[name]
+            report[name] = {}
+            for language in args.languages.split(','):
+                if not shutil.which(REQUIRED_TOOLS[language]):
+                    report[name][language] = 'skipped: toolchain not installed'
+                    continue
+                report[name][language] = _measure(profile, language, root, input_path, expected, args)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Cold start vs. warm runtime pool latency per language.
+
+Usage (from backend/):
+    python -m benchmarks.warm_runtimes [--runs 30] [--tests-per-submission 10] [--languages python,java,javascript]
+                                       [--pool-size 2] [--profile standard]
+
+For each language a trivial A+B program is run `--runs` times through
+`run_artifact`, once cold-started and once from a warm pool. The warm runs
+drive the pool as the judge does: `--runs` is split into submissions of
+`--tests-per-submission` tests, the pool is replenished before each
+submission (while the judge compiles), and tests that find it empty start
+a runtime and wait for it. The report shows the measured CPU and wall time
+(what the limits are checked against) and the end-to-end latency of each
+run.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from judge.compiler import ArtifactCache, compile_code
+from judge.mock_judge import Verdict, run_artifact
+from judge.warm import WarmPool
+
+PROGRAMS = {
+    'python': "a, b = map(int, input().split())\nprint(a + b)\n",
+    'javascript': "const [a, b] = require('fs').readFileSync(0, 'utf8').trim().split(/\\s+/).map(Number);\n"
+                  "console.log(a + b);\n",
+    'java': "import java.util.*;\n"
+            "public class Solution {\n"
+            "    public static void main(String[] args) {\n"
+            "        Scanner in = new Scanner(System.in);\n"
+            "        System.out.println(in.nextLong() + in.nextLong());\n"
+            "    }\n"
+            "}\n",
+}
+
+REQUIRED_TOOLS = {'python': '/usr/bin/python3', 'javascript': 'node', 'java': 'javac'}
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def _summary(samples):
+    return {
+        'mean_ms': round(statistics.mean(samples) * 1000, 2),
+        'p50_ms': round(_percentile(samples, 0.50) * 1000, 2),
+        'p95_ms': round(_percentile(samples, 0.95) * 1000, 2),
+        'stdev_ms': round(statistics.pstdev(samples) * 1000, 2),
+    }
+
+
+def _measure(artifact, input_path, runs, tests_per_submission, pool=None):
+    exec_times, wall_times, latencies = [], [], []
+    for run in range(runs):
+        if pool is not None and run % tests_per_submission == 0:
+            # What the judge does around compiling a submission
+            pool.replenish()
+            pool.warm_up()
+        started = time.perf_counter()
+        result = run_artifact(artifact, input_path, 10, warm_pool=pool)
+        latencies.append(time.perf_counter() - started)
+        if result.verdict != Verdict.ACCEPTED or result.output.strip() != '5':
+            raise RuntimeError(f"{artifact.language}: unexpected result {result.verdict} {result.output!r}")
+        exec_times.append(result.exec_time)
+        wall_times.append(result.wall_time)
+    return {'execution_time': _summary(exec_times), 'wall_time': _summary(wall_times), 'latency': _summary(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=30)
+    parser.add_argument('--tests-per-submission', type=int, default=10)
+    parser.add_argument('--pool-size', type=int, default=2)
+    parser.add_argument('--languages', default='python,java,javascript')
+    parser.add_argument('--profile', default=None, help='toolchain profile (default: standard)')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bench-warm-')
+    cache = ArtifactCache(root, 256 * 1024 * 1024)
+    input_path = os.path.join(root, 'input.txt')
+    with open(input_path, 'w') as f:
+        f.write("2 3\n")
+    report = {}
+    try:
+        for language in args.languages.split(','):
+            if not shutil.which(REQUIRED_TOOLS[language]):
+                report[language] = 'skipped: toolchain not installed'
+                continue
+            artifact, error = compile_code(PROGRAMS[language], language, cache, args.profile)
+            if artifact is None:
+                raise RuntimeError(f"{language}: compilation failed: {error}")
+
+            pool = WarmPool(language, args.pool_size, root, args.profile)
+            try:
+                report[language] = {
+                    'cold': _measure(artifact, input_path, args.runs, args.tests_per_submission),
+                    'warm': _measure(artifact, input_path, args.runs, args.tests_per_submission, pool),
+                }
+            finally:
+                pool.shutdown()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,6 @@
 import os
+import socket
+import tempfile
 from dotenv import load_dotenv
 from flask_mail import Message
 from flask import current_app
@@ -25,4 +27,96 @@ class Config:
     MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', 'true').lower() in ['true', '1', 'yes']
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD') 
-    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER')
\ No newline at end of file
+    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER')
+
+    # Live submission pages: one poller per web process feeds every open event stream;
+    # a stream is closed (and reconnected by the browser) after LIVE_STREAM_SECONDS
+    LIVE_POLL_INTERVAL = float(os.environ.get('LIVE_POLL_INTERVAL') or 1.0)
+    LIVE_STREAM_SECONDS = int(os.environ.get('LIVE_STREAM_SECONDS') or 300)
+
+    # Penalty minutes added per rejected attempt on a solved problem (contest_standings.penalty)
+    STANDINGS_PENALTY_MINUTES = int(os.environ.get('STANDINGS_PENALTY_MINUTES') or 20)
+
+    # Cache of computed pages, see app.cache: 'memory' (per process), 'filesystem' (shared
+    # through CACHE_DIR by the web workers of one host) or 'module:factory'
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or 'memory'
+    CACHE_DIR = os.environ.get('CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'logicomp-cache')
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES') or 256)
+    # Leaderboards are keyed by Contest.standings_version; the expiry only bounds memory use.
+    # One request computes a new version; others wait at most LEADERBOARD_LOCK_SECONDS for it
+    LEADERBOARD_CACHE_SECONDS = int(os.environ.get('LEADERBOARD_CACHE_SECONDS') or 3600)
+    LEADERBOARD_LOCK_SECONDS = float(os.environ.get('LEADERBOARD_LOCK_SECONDS') or 10)
+    # Participants per leaderboard page (?per_page= may ask for up to LEADERBOARD_MAX_PAGE_SIZE)
+    LEADERBOARD_PAGE_SIZE = int(os.environ.get('LEADERBOARD_PAGE_SIZE') or 50)
+    LEADERBOARD_MAX_PAGE_SIZE = int(os.environ.get('LEADERBOARD_MAX_PAGE_SIZE') or 500)
+    # Participants read at a time by the PDF, Excel and CSV exports
+    LEADERBOARD_EXPORT_CHUNK_SIZE = int(os.environ.get('LEADERBOARD_EXPORT_CHUNK_SIZE') or 1000)
+
+    # Content-addressed test data (inputs and expected outputs), see app.testdata
+    TESTDATA_DIR = os.environ.get('TESTDATA_DIR') or os.path.join(basedir, 'testdata')
+
+    # Judge queue / worker pool
+    JUDGE_WORKER_CONCURRENCY = int(os.environ.get('JUDGE_WORKER_CONCURRENCY') or 4)
+    JUDGE_POLL_INTERVAL = float(os.environ.get('JUDGE_POLL_INTERVAL') or 1.0)
+    # Leases are renewed every JUDGE_HEARTBEAT_SECONDS while judging, so a lease only has to
+    # outlast a few missed heartbeats; work of a node that died is requeued after it expires
+    JUDGE_LEASE_SECONDS = int(os.environ.get('JUDGE_LEASE_SECONDS') or 60)
+    JUDGE_HEARTBEAT_SECONDS = float(os.environ.get('JUDGE_HEARTBEAT_SECONDS') or 10)
+    JUDGE_NODE_NAME = os.environ.get('JUDGE_NODE_NAME') or socket.gethostname()
+    # Remote judge nodes without a shared TESTDATA_DIR download test data from the web app,
+    # e.g. JUDGE_TESTDATA_URL=https://judge.example.com/internal/testdata; both sides share the token
+    JUDGE_TESTDATA_URL = os.environ.get('JUDGE_TESTDATA_URL')
+    JUDGE_NODE_TOKEN = os.environ.get('JUDGE_NODE_TOKEN')
+    JUDGE_MAX_ATTEMPTS = int(os.environ.get('JUDGE_MAX_ATTEMPTS') or 3)
+    # Bulk rejudges judged at the same time across all workers; the rest stay free for live submissions
+    JUDGE_REJUDGE_SLOTS = int(os.environ.get('JUDGE_REJUDGE_SLOTS') or 2)
+    # Scheduler: claimable submissions ranked per claim, how many of them may come from one user,
+    # and the share boost for contests about to end
+    JUDGE_SCHEDULER_WINDOW = int(os.environ.get('JUDGE_SCHEDULER_WINDOW') or 500)
+    JUDGE_SCHEDULER_PER_USER = int(os.environ.get('JUDGE_SCHEDULER_PER_USER') or 3)
+    JUDGE_DEADLINE_BOOST_MINUTES = float(os.environ.get('JUDGE_DEADLINE_BOOST_MINUTES') or 15)
+    JUDGE_DEADLINE_BOOST_WEIGHT = float(os.environ.get('JUDGE_DEADLINE_BOOST_WEIGHT') or 4)
+    # DB connections kept per worker process (judging is single-threaded on the DB side)
+    JUDGE_DB_POOL_SIZE = int(os.environ.get('JUDGE_DB_POOL_SIZE') or 1)
+    # Per-test results of a running submission are published this often (seconds)
+    JUDGE_PROGRESS_INTERVAL = float(os.environ.get('JUDGE_PROGRESS_INTERVAL') or 0.5)
+    # Test cases of one submission run on this many processes at once (1 = sequential)
+    JUDGE_TEST_PARALLELISM = int(os.environ.get('JUDGE_TEST_PARALLELISM') or 1)
+    # Time limits apply to CPU time; wall clock may run this many times longer
+    JUDGE_WALL_TIME_FACTOR = float(os.environ.get('JUDGE_WALL_TIME_FACTOR') or 2.0)
+    JUDGE_DEFAULT_MEMORY_LIMIT_MB = int(os.environ.get('JUDGE_DEFAULT_MEMORY_LIMIT_MB') or 256)
+    # Java and JavaScript get the memory limit as their heap size; their peak RSS may exceed it by this
+    # much (runtime, JIT code, metaspace, young generation) before it counts as Memory Limit Exceeded
+    JUDGE_RUNTIME_MEMORY_HEADROOM_MB = int(os.environ.get('JUDGE_RUNTIME_MEMORY_HEADROOM_MB') or 128)
+    # A run printing more than this to stdout is stopped with Output Limit Exceeded
+    JUDGE_OUTPUT_LIMIT_BYTES = int(os.environ.get('JUDGE_OUTPUT_LIMIT_BYTES') or 64 * 1024 * 1024)
+
+    # Per-worker cache of problem limits and test lists, invalidated by Problem.version
+    JUDGE_TESTSET_CACHE_BYTES = int(os.environ.get('JUDGE_TESTSET_CACHE_BYTES') or 8 * 1024 * 1024)
+
+    # Compiled artifacts, keyed by (language, toolchain version, sha256(code))
+    JUDGE_ARTIFACT_CACHE_DIR = os.environ.get('JUDGE_ARTIFACT_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'logicomp-artifacts')
+    JUDGE_ARTIFACT_CACHE_MAX_BYTES = int(os.environ.get('JUDGE_ARTIFACT_CACHE_MAX_BYTES') or 512 * 1024 * 1024)
+
+    # Judge logging: level, and records per minute allowed per message template
+    JUDGE_LOG_LEVEL = os.environ.get('JUDGE_LOG_LEVEL') or 'INFO'
+    JUDGE_LOG_RATE_PER_MINUTE = int(os.environ.get('JUDGE_LOG_RATE_PER_MINUTE') or 60)
+    # Worker metric snapshots merged by /metrics; with a token set, scrapes must send it as a Bearer token
+    JUDGE_METRICS_DIR = os.environ.get('JUDGE_METRICS_DIR') or os.path.join(tempfile.gettempdir(), 'logicomp-metrics')
+    JUDGE_METRICS_TOKEN = os.environ.get('JUDGE_METRICS_TOKEN')
+
+    # Submission process containment: a delegated cgroup v2 directory (optional),
+    # its per-run process cap, and how often leftover processes are swept
+    JUDGE_CGROUP_ROOT = os.environ.get('JUDGE_CGROUP_ROOT')
+    JUDGE_CGROUP_PIDS_MAX = int(os.environ.get('JUDGE_CGROUP_PIDS_MAX') or 64)
+    JUDGE_REAPER_INTERVAL = float(os.environ.get('JUDGE_REAPER_INTERVAL') or 1.0)
+
+    # Working directories of submission processes (default: /dev/shm when available)
+    JUDGE_WORKSPACE_DIR = os.environ.get('JUDGE_WORKSPACE_DIR')
+
+    # Compiler and runtime flags for contests without their own (see judge/toolchains.py)
+    JUDGE_DEFAULT_TOOLCHAIN_PROFILE = os.environ.get('JUDGE_DEFAULT_TOOLCHAIN_PROFILE') or 'standard'
+
+    # Pre-started runtimes, e.g. JUDGE_WARM_RUNTIMES=python,java,javascript (empty = cold start)
+    JUDGE_WARM_RUNTIMES = [l for l in (os.environ.get('JUDGE_WARM_RUNTIMES') or '').split(',') if l]
+    JUDGE_WARM_POOL_SIZE = int(os.environ.get('JUDGE_WARM_POOL_SIZE') or 2)
@@ -0,0 +1,57 @@
+"""Streaming comparison of a program's output with the expected output.
+
+Outputs match when their lines agree after surrounding whitespace is
+stripped, with blank lines skipped. Lines are read one at a time from the
+captured stdout and from the mmap'd expected output, so memory use is
+bounded by the longest line rather than the whole output, and the
+comparison stops at the first mismatching line.
+"""
+from itertools import zip_longest
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+# Longest excerpt of a line quoted in mismatch details
+EXCERPT_LENGTH = 80
+
+_MISSING = object()
+
+
+def significant_lines(lines: Iterable[str]) -> Iterator[str]:
+    """Stripped, non-blank lines of `lines`"""
+    for line in lines:
+        # splitlines() also breaks on \r, \v, \f etc. like str.splitlines did on the whole text
+        for part in line.splitlines():
+            part = part.strip()
+            if part:
+                yield part
+
+
+def _decoded(stream) -> Iterator[str]:
+    # readline() rather than iteration: mmap objects only support the former
+    for raw in iter(stream.readline, b''):
+        yield raw.decode('utf-8', errors='replace')
+
+
+def _excerpt(line) -> str:
+    if line is _MISSING:
+        return 'end of output'
+    if len(line) > EXCERPT_LENGTH:
+        line = line[:EXCERPT_LENGTH] + '...'
+    return f"'{line}'"
+
+
+def compare_output(actual: BinaryIO, expected) -> Optional[str]:
+    """None if `actual` matches `expected`, otherwise a short description of the first difference
+
+    `expected` is anything with a binary readline(), e.g. an mmap.
+    """
+    pairs = zip_longest(significant_lines(_decoded(actual)), significant_lines(_decoded(expected)),
+                        fillvalue=_MISSING)
+    for number, (got, want) in enumerate(pairs, 1):
+        if got != want:
+            return f"line {number}: expected {_excerpt(want)}, got {_excerpt(got)}"
+    return None
+
+
+def read_output(stream: BinaryIO) -> str:
+    """Whole captured output as text, for callers that need it verbatim"""
+    return stream.read().decode('utf-8', errors='replace')
@@ -0,0 +1,268 @@
+"""Compilation of submissions and the on-disk build artifact cache.
+
+A submission is built once and the resulting artifact is run against every
+test case. Artifacts are content addressed by (language, toolchain version,
+toolchain profile, sha256(code)), so resubmissions and rejudges of identical
+code skip the compiler entirely. The cache is evicted least-recently-used first once it
+grows past its byte budget.
+
+An artifact returned by get_or_build() is pinned: its directory is held
+under a shared flock() until release(). Eviction only removes directories
+it can lock exclusively, so an artifact is never deleted while any worker
+still runs tests from it, however long they take.
+"""
+import fcntl
+import functools
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from judge.toolchains import Profile, fingerprint, get_profile, precompiled_header_dir
+
+SOURCE_FILES = {
+    'python': 'solution.py',
+    'cpp': 'solution.cpp',
+    'java': 'Solution.java',
+    'javascript': 'solution.js'
+}
+
+TOOLCHAINS = {
+    'python': ['/usr/bin/python3', '--version'],
+    'cpp': ['g++', '--version'],
+    'java': ['javac', '-version'],
+    'javascript': ['node', '--version']
+}
+
+COMPILE_ERROR_FILE = 'compile_error.txt'
+
+
+class Artifact(NamedTuple):
+    language: str
+    directory: str
+    command: List[str]
+    profile: str = ''
+
+
+@functools.lru_cache(maxsize=None)
+def toolchain_version(language: str) -> str:
+    """First line of the toolchain's version banner, or 'missing'"""
+    try:
+        result = subprocess.run(TOOLCHAINS[language], capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return 'missing'
+    banner = (result.stdout or result.stderr).strip().splitlines()
+    return banner[0] if banner else 'unknown'
+
+
+def artifact_key(code: str, language: str, profile: Profile) -> str:
+    digest = hashlib.sha256()
+    for part in (language, toolchain_version(language), fingerprint(profile, language), code):
+        digest.update(part.encode('utf-8', errors='surrogatepass'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def run_command(language: str, directory: str, profile: Profile) -> List[str]:
+    """Command line that executes a built artifact"""
+    flags = list(profile.language(language).runtime_flags)
+    if language == 'cpp':
+        return [os.path.join(directory, 'solution')]
+    if language == 'java':
+        return ['java', *flags, '-cp', directory, 'Solution']
+    if language == 'javascript':
+        return ['node', *flags, os.path.join(directory, SOURCE_FILES[language])]
+    return ['/usr/bin/python3', *flags, os.path.join(directory, SOURCE_FILES[language])]
+
+
+def build(code: str, language: str, directory: str, profile: Profile, pch_root: Optional[str] = None) -> Optional[str]:
+    """Build `code` into `directory`; return the compiler output on failure
+
+    `pch_root` is where precompiled headers are kept; without it the
+    profile's precompiled header is skipped.
+    """
+    code_path = os.path.join(directory, SOURCE_FILES[language])
+    with open(code_path, 'w') as f:
+        f.write(code)
+
+    settings = profile.language(language)
+    if language == 'cpp':
+        include = []
+        if settings.precompiled_header and pch_root:
+            pch_dir = precompiled_header_dir(settings.compile_flags, toolchain_version(language), pch_root)
+            if pch_dir:
+                include = ['-I', pch_dir]
+        result = subprocess.run(
+            ['g++', *settings.compile_flags, *include, code_path, '-o', os.path.join(directory, 'solution')],
+            capture_output=True,
+            text=True
+        )
+    elif language == 'java':
+        result = subprocess.run(
+            ['javac', *settings.compile_flags, code_path],
+            cwd=directory,
+            capture_output=True,
+            text=True
+        )
+    else:
+        return None
+
+    if result.returncode != 0:
+        return result.stderr
+    return None
+
+
+class ArtifactCache:
+    """Content-addressed build directories under `root` with LRU eviction"""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._last_evict = 0.0
+        # Pinned artifact directories of this process: path -> [locked descriptor, pin count]
+        self._pins: Dict[str, list] = {}
+        self._pins_lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def _build(self, code: str, language: str, profile: Profile, path: str):
+        staging = tempfile.mkdtemp(prefix='build-', dir=self.root)
+        try:
+            error = build(code, language, staging, profile, pch_root=self.root)
+            if error is not None:
+                with open(os.path.join(staging, COMPILE_ERROR_FILE), 'w') as f:
+                    f.write(error)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.rename(staging, path)
+        except OSError:
+            # Another worker published the same artifact first
+            if not os.path.isdir(path):
+                raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        if time.time() - self._last_evict > 30:
+            self.evict()
+
+    def _pin(self, path: str):
+        """Hold a shared lock on `path`; FileNotFoundError if it was evicted meanwhile"""
+        with self._pins_lock:
+            pinned = self._pins.get(path)
+            if pinned is not None:
+                pinned[1] += 1
+                return
+            fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_SH)
+                # Evicted (and maybe rebuilt) between open() and the lock
+                if os.fstat(fd).st_ino != os.stat(path).st_ino:
+                    raise FileNotFoundError(path)
+                os.utime(path)
+            except BaseException:
+                os.close(fd)
+                raise
+            self._pins[path] = [fd, 1]
+
+    def release(self, artifact: Artifact):
+        """Unpin an artifact from get_or_build() once its tests have run"""
+        with self._pins_lock:
+            pinned = self._pins.get(artifact.directory)
+            if pinned is None:
+                return
+            pinned[1] -= 1
+            if pinned[1] == 0:
+                del self._pins[artifact.directory]
+                os.close(pinned[0])
+
+    def get_or_build(self, code: str, language: str, profile: Profile) -> Tuple[Optional[Artifact], Optional[str]]:
+        """The artifact for `code`, pinned until release(); or (None, compiler output)"""
+        key = artifact_key(code, language, profile)
+        path = self._path(key)
+
+        while True:
+            if not os.path.isdir(path):
+                self._build(code, language, profile, path)
+            error_path = os.path.join(path, COMPILE_ERROR_FILE)
+            if os.path.exists(error_path):
+                try:
+                    with open(error_path) as f:
+                        return None, f.read()
+                except FileNotFoundError:
+                    continue  # evicted after the check; build it again
+            try:
+                self._pin(path)
+            except FileNotFoundError:
+                continue  # evicted after the check; build it again
+            return Artifact(language, path, run_command(language, path, profile), profile.name), None
+
+    def evict(self, min_age: float = 60):
+        """Drop least recently used artifacts until the cache fits its budget
+
+        Pinned artifacts (locked by any worker) are skipped, as are ones
+        published less than `min_age` seconds ago and not pinned yet.
+        """
+        self._last_evict = time.time()
+        entries = []
+        total = 0
+        for bucket in os.scandir(self.root):
+            if not bucket.is_dir() or len(bucket.name) != 2:
+                continue
+            for entry in os.scandir(bucket.path):
+                try:
+                    size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+                    entries.append((entry.stat().st_mtime, size, entry.path))
+                except FileNotFoundError:
+                    # Evicted concurrently by another worker
+                    continue
+                total += size
+
+        now = time.time()
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if now - mtime < min_age:
+                continue
+            try:
+                fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+            except FileNotFoundError:
+                total -= size
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Tests are running from it
+                os.close(fd)
+                continue
+            try:
+                shutil.rmtree(path, ignore_errors=True)
+            finally:
+                os.close(fd)
+            total -= size
+
+
+_caches = {}
+
+
+def get_artifact_cache(root: str, max_bytes: int) -> ArtifactCache:
+    cache = _caches.get(root)
+    if cache is None or cache.max_bytes != max_bytes:
+        cache = _caches[root] = ArtifactCache(root, max_bytes)
+    return cache
+
+
+def compile_code(code: str, language: str, cache: ArtifactCache,
+                 profile: Optional[str] = None) -> Tuple[Optional[Artifact], Optional[str]]:
+    """Return the artifact for `code` under toolchain `profile`, building it if it is not cached yet
+
+    The artifact stays pinned in `cache` until `cache.release(artifact)`.
+    """
+    if language not in SOURCE_FILES:
+        return None, f"Unsupported language: {language}"
+    if language == 'javascript' and not shutil.which('node'):
+        return None, "Node.js not installed."
+    return cache.get_or_build(code, language, get_profile(profile))
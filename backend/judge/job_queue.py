@@ -0,0 +1,226 @@
+"""Durable judge queue stored in the submissions table.
+
+A submission is queued while its status is 'Pending'. Workers claim it by
+writing their id and a lease expiry onto the row. The lease is renewed
+while the worker judges (see judge.nodes). A claim whose lease has expired
+(the worker or its machine died mid-judge) becomes claimable again.
+
+Which submission a worker claims next is decided by judge.scheduler:
+priority classes first (live, then admin runs, then rejudges), fair shares
+between contests and users within a class. At most `rejudge_slots` rejudges
+are judged at once so that a bulk rejudge never occupies every worker when
+live traffic arrives. How long each submission waited is recorded in
+`queue_wait`.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import func, or_, update
+from app import db
+from app.models import Contest, Submission
+from app.timeutil import as_utc
+from judge.scheduler import Candidate, SchedulerSettings, rank
+
+PENDING = 'Pending'
+PRIORITY_LIVE = 0
+PRIORITY_ADMIN = 5  # submissions made by admins, e.g. checking a new problem
+PRIORITY_REJUDGE = 10
+
+
+class LeaseLost(Exception):
+    """The worker's lease expired and the submission was handed to someone else"""
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+def _claimable(now):
+    return (
+        Submission.status == PENDING,
+        or_(Submission.lease_expires_at.is_(None), Submission.lease_expires_at < now),
+    )
+
+
+def enqueue(submission: Submission, priority: int = PRIORITY_LIVE):
+    """Put a submission (new or already judged) on the queue; the caller commits"""
+    submission.status = PENDING
+    submission.priority = priority
+    submission.queued_at = _utcnow()
+    submission.queue_wait = None
+    submission.execution_time = None
+    submission.error_message = None
+    submission.test_version = None
+    submission.reused_from_id = None
+    submission.claimed_by = None
+    submission.claimed_at = None
+    submission.lease_expires_at = None
+    submission.judge_attempts = 0
+
+
+def _running(now):
+    """(user_id, contest_id, priority) of submissions held under a live lease"""
+    return db.session.query(Submission.user_id, Submission.contest_id, Submission.priority).filter(
+        Submission.status == PENDING,
+        Submission.claimed_by.isnot(None),
+        Submission.lease_expires_at >= now,
+    ).all()
+
+
+def _candidates(now, include_rejudges: bool, settings: SchedulerSettings):
+    """The first `settings.per_user` claimable submissions of each user in each contest and class
+
+    Taking the oldest rows overall would let one user's flood fill the
+    window and hide everyone queued behind it from the fair share.
+    """
+    filters = list(_claimable(now))
+    if not include_rejudges:
+        filters.append(Submission.priority < PRIORITY_REJUDGE)
+    position = func.row_number().over(
+        partition_by=(Submission.priority, Submission.contest_id, Submission.user_id),
+        order_by=Submission.id
+    ).label('position')
+    queued = db.session.query(
+        Submission.id, Submission.user_id, Submission.contest_id, Submission.priority,
+        Submission.queued_at, Submission.judge_attempts, position
+    ).filter(*filters).subquery()
+    rows = db.session.query(
+        queued.c.id, queued.c.user_id, queued.c.contest_id, queued.c.priority,
+        queued.c.queued_at, queued.c.judge_attempts
+    ).filter(queued.c.position <= settings.per_user) \
+        .order_by(queued.c.priority.asc(), queued.c.position.asc(), queued.c.id.asc()).limit(settings.window).all()
+    return [Candidate(*row) for row in rows]
+
+
+def _lock(submission_id: int, now):
+    """Lock a candidate that is still claimable; None if another worker holds or took it
+
+    SKIP LOCKED lets concurrent workers pass over the row at once instead
+    of waiting for the holder to commit. Dialects without it (SQLite)
+    serialize writers anyway, and the conditional updates still apply.
+    """
+    return db.session.query(Submission.judge_attempts).filter(Submission.id == submission_id, *_claimable(now)) \
+        .with_for_update(skip_locked=True).first()
+
+
+def _contest_end_times(contest_ids):
+    contest_ids = {contest_id for contest_id in contest_ids if contest_id is not None}
+    if not contest_ids:
+        return {}
+    return dict(db.session.query(Contest.id, Contest.end_time).filter(Contest.id.in_(contest_ids)).all())
+
+
+def claim_next(worker_id: str, lease_seconds: int, max_attempts: int,
+               rejudge_slots: Optional[int] = None,
+               settings: SchedulerSettings = SchedulerSettings()) -> Optional[int]:
+    """Claim the best claimable submission for `worker_id` and return its id"""
+    from app.standings import update_submission_standing
+    while True:
+        now = _utcnow()
+        running = _running(now)
+        rejudges_running = sum(1 for *_, priority in running if priority >= PRIORITY_REJUDGE)
+        include_rejudges = rejudge_slots is None or rejudges_running < rejudge_slots
+        candidates = _candidates(now, include_rejudges, settings)
+
+        if not candidates:
+            db.session.commit()
+            return None
+
+        ranked = rank(candidates, [(user_id, contest_id) for user_id, contest_id, _ in running],
+                      _contest_end_times(c.contest_id for c in candidates), now, settings)
+        for candidate in ranked:
+            locked = _lock(candidate.id, now)
+            if locked is None:
+                continue
+            attempts = locked.judge_attempts or 0
+            if attempts >= max_attempts:
+                # The submission keeps killing whoever judges it; stop retrying
+                gave_up = db.session.execute(
+                    update(Submission)
+                    .where(Submission.id == candidate.id, *_claimable(now))
+                    .values(status='Runtime Error',
+                            error_message=f"Judge error: gave up after {attempts} attempts", test_version=None,
+                            claimed_by=None, claimed_at=None, lease_expires_at=None)
+                )
+                if gave_up.rowcount == 1:
+                    update_submission_standing(candidate.id)
+                db.session.commit()
+                continue
+
+            queued_at = as_utc(candidate.queued_at)
+            # The conditional update makes the claim safe against other workers
+            result = db.session.execute(
+                update(Submission)
+                .where(Submission.id == candidate.id, *_claimable(now))
+                .values(claimed_by=worker_id,
+                        claimed_at=now,
+                        lease_expires_at=now + timedelta(seconds=lease_seconds),
+                        judge_attempts=attempts + 1,
+                        queue_wait=(now - queued_at).total_seconds() if queued_at else None)
+            )
+            db.session.commit()
+            if result.rowcount == 1:
+                return candidate.id
+        # Every ranked candidate was taken by someone else meanwhile; look again
+
+
+def renew_lease(submission_id: int, worker_id: str, lease_seconds: int) -> bool:
+    """Extend the lease `worker_id` holds; False once it has lost the submission
+
+    Called from a worker's heartbeat, and inside the transaction that writes
+    a verdict. There the row it updates stays locked until commit, so a
+    worker whose lease was taken over cannot overwrite the new holder.
+    """
+    result = db.session.execute(
+        update(Submission)
+        .where(Submission.id == submission_id, Submission.claimed_by == worker_id)
+        .values(lease_expires_at=_utcnow() + timedelta(seconds=lease_seconds))
+    )
+    return result.rowcount == 1
+
+
+def requeue_expired() -> int:
+    """Hand submissions whose lease ran out back to the queue; returns how many"""
+    result = db.session.execute(
+        update(Submission)
+        .where(Submission.status == PENDING, Submission.claimed_by.isnot(None),
+               Submission.lease_expires_at < _utcnow())
+        .values(claimed_by=None, claimed_at=None, lease_expires_at=None)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def release(submission_id: int, worker_id: str):
+    """Drop the lease once the verdict has been committed"""
+    db.session.execute(
+        update(Submission)
+        .where(Submission.id == submission_id, Submission.claimed_by == worker_id)
+        .values(claimed_by=None, lease_expires_at=None)
+    )
+    db.session.commit()
+
+
+def fail(submission_id: int, worker_id: str, message: str):
+    """Record a judge-side failure for a claimed submission"""
+    from app.standings import update_submission_standing
+    db.session.rollback()
+    result = db.session.execute(
+        update(Submission)
+        .where(Submission.id == submission_id, Submission.claimed_by == worker_id)
+        .values(status='Runtime Error', error_message=message, test_version=None,
+                claimed_by=None, lease_expires_at=None)
+    )
+    if result.rowcount == 1:
+        update_submission_standing(submission_id)
+    db.session.commit()
+
+
+def queue_depth() -> int:
+    return Submission.query.filter(Submission.status == PENDING).count()
+
+
+def in_flight() -> int:
+    """Submissions a worker holds an unexpired lease on"""
+    return Submission.query.filter(Submission.status == PENDING,
+                                   Submission.claimed_by.isnot(None),
+                                   Submission.lease_expires_at >= _utcnow()).count()
@@ -0,0 +1,65 @@
+"""Levelled, rate-limited logging for the judge.
+
+Judge messages go to the `judge` logger hierarchy. Per-test progress is
+DEBUG. Verdicts are INFO. Judge failures are WARNING or ERROR. Program
+output and stderr are only ever logged as a short excerpt.
+
+Each message template (the unformatted `msg` at a call site) may log at
+most JUDGE_LOG_RATE_PER_MINUTE records per minute. When a template is let
+through again, its next record says how many were dropped in between.
+"""
+import logging
+import sys
+import threading
+import time
+
+EXCERPT_CHARS = 200
+
+
+def get_logger(name: str = 'judge') -> logging.Logger:
+    return logging.getLogger(name)
+
+
+def excerpt(text, limit: int = EXCERPT_CHARS) -> str:
+    """`text` shortened for a log line"""
+    text = (text or '').replace('\n', '\\n')
+    return text if len(text) <= limit else f"{text[:limit]}... ({len(text)} chars)"
+
+
+class RateLimitFilter(logging.Filter):
+    def __init__(self, per_minute: int):
+        super().__init__()
+        self.per_minute = per_minute
+        self.windows = {}  # (logger, template) -> [window start, records let through, records dropped]
+        self.lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.per_minute <= 0:
+            return True
+        now = time.monotonic()
+        key = (record.name, record.msg)
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= 60:
+                dropped = window[2] if window is not None else 0
+                window = self.windows[key] = [now, 0, 0]
+                if dropped:
+                    record.msg = f"{record.msg} ({dropped} similar message(s) suppressed)"
+            if window[1] >= self.per_minute:
+                window[2] += 1
+                return False
+            window[1] += 1
+            return True
+
+
+def configure_logging(level: str = 'INFO', per_minute: int = 60):
+    """Send the judge loggers to stderr at `level`, rate-limited per message template"""
+    logger = get_logger()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter('%(asctime)s [%(name)s] %(levelname)s %(message)s'))
+    handler.addFilter(RateLimitFilter(per_minute))
+    logger.addHandler(handler)
+    logger.setLevel(level.upper())
+    logger.propagate = False
@@ -0,0 +1,190 @@
+"""Judge metrics: timing spans, histograms and counters.
+
+Each judge worker process records into its own in-memory registry and,
+after every submission, writes a snapshot to JUDGE_METRICS_DIR (one file
+per process, replaced atomically). The web app's /metrics endpoint merges
+the snapshots and adds gauges read from the database, then renders the
+Prometheus text format. Snapshots of exited workers are kept so counters
+only go up; a judge node clears its own snapshots when it starts. Nodes on
+other machines are included when JUDGE_METRICS_DIR is shared storage.
+
+Phases timed with `span`:
+- queue_wait: queued until claimed
+- compile
+- run: one test execution
+- compare: checking its output
+- db_commit: writing the verdict
+- judge: the whole judge_submission call
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+
+# Seconds; the top buckets are there for TLE runs and huge tests
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRICS = {
+    'judge_phase_seconds': ('histogram', 'Time spent per judging phase'),
+    'judge_verdicts_total': ('counter', 'Submissions judged, by language and verdict'),
+    'judge_reused_verdicts_total': ('counter', 'Verdicts copied from an identical earlier submission'),
+    'judge_errors_total': ('counter', 'Submissions that failed inside the judge'),
+    'judge_reaped_processes_total': ('counter', 'Stray submission processes killed after their run ended'),
+    'judge_lost_leases_total': ('counter', 'Verdicts dropped because the lease had passed to another worker'),
+    'judge_testset_cache_hits_total': ('counter', 'Test set cache lookups served from memory'),
+    'judge_testset_cache_misses_total': ('counter', 'Test set cache lookups that loaded from the database'),
+    'judge_testset_cache_evictions_total': ('counter', 'Test sets evicted from the cache'),
+    'judge_testset_cache_bytes': ('gauge', 'Estimated size of the cached test sets'),
+    'judge_queue_depth': ('gauge', 'Submissions waiting for or being judged'),
+    'judge_in_flight': ('gauge', 'Submissions currently held by a judge worker'),
+    'judge_nodes': ('gauge', 'Judge nodes with a recent heartbeat'),
+}
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.gauges = {}
+        self.histograms = {}  # key -> [per-bucket counts (last is +Inf), sum]
+
+    def inc(self, name: str, value: float = 1, **labels):
+        with self.lock:
+            self.counters[_key(name, labels)] += value
+
+    def set(self, name: str, value: float, **labels):
+        """Set a gauge, or a counter whose running total is kept elsewhere"""
+        with self.lock:
+            target = self.gauges if METRICS[name][0] == 'gauge' else self.counters
+            target[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        with self.lock:
+            entry = self.histograms.get(_key(name, labels))
+            if entry is None:
+                entry = self.histograms[_key(name, labels)] = [[0] * (len(BUCKETS) + 1), 0.0]
+            entry[0][bisect_left(BUCKETS, value)] += 1
+            entry[1] += value
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                'counters': [[name, dict(labels), value] for (name, labels), value in self.counters.items()],
+                'gauges': [[name, dict(labels), value] for (name, labels), value in self.gauges.items()],
+                'histograms': [[name, dict(labels), list(counts), total]
+                               for (name, labels), (counts, total) in self.histograms.items()],
+            }
+
+    def merge(self, snapshot: dict):
+        """Add another process's snapshot to this registry"""
+        with self.lock:
+            for name, labels, value in snapshot.get('counters', ()):
+                self.counters[_key(name, labels)] += value
+            for name, labels, value in snapshot.get('gauges', ()):
+                key = _key(name, labels)
+                self.gauges[key] = self.gauges.get(key, 0) + value
+            for name, labels, counts, total in snapshot.get('histograms', ()):
+                entry = self.histograms.setdefault(_key(name, labels), [[0] * (len(BUCKETS) + 1), 0.0])
+                entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                entry[1] += total
+
+
+registry = Registry()
+
+
+@contextmanager
+def span(phase: str, **labels):
+    """Time the enclosed block into judge_phase_seconds{phase=...}"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe('judge_phase_seconds', time.perf_counter() - started, phase=phase, **labels)
+
+
+def flush(directory: str, test_set_cache=None, prefix: str = ''):
+    """Write this process's snapshot to `directory`
+
+    `prefix` (the judge node name) keeps nodes sharing a directory apart.
+    """
+    if test_set_cache is not None:
+        stats = test_set_cache.stats()
+        for stat in ('hits', 'misses', 'evictions'):
+            registry.set(f'judge_testset_cache_{stat}_total', stats[stat])
+        registry.set('judge_testset_cache_bytes', stats['bytes'])
+
+    os.makedirs(directory, exist_ok=True)
+    fd, staging = tempfile.mkstemp(prefix='.metrics-', dir=directory)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(registry.snapshot(), f)
+    os.replace(staging, os.path.join(directory, f'{prefix}@{os.getpid()}.json'))
+
+
+def clear(directory: str, prefix: str = ''):
+    """Forget the snapshots of earlier worker processes of node `prefix`"""
+    if not os.path.isdir(directory):
+        return
+    for entry in os.scandir(directory):
+        if entry.name.startswith(f'{prefix}@') and entry.name.endswith('.json'):
+            os.unlink(entry.path)
+
+
+def collect(directory: str) -> Registry:
+    """Merge every worker snapshot in `directory`"""
+    merged = Registry()
+    if not os.path.isdir(directory):
+        return merged
+    for entry in os.scandir(directory):
+        if not entry.name.endswith('.json'):
+            continue
+        try:
+            with open(entry.path) as f:
+                merged.merge(json.load(f))
+        except (OSError, ValueError):
+            continue  # a worker's file vanished or is being replaced; it is merged next scrape
+    return merged
+
+
+def _labels(labels: Iterable, extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(labels) + list((extra or {}).items())
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def render(reg: Registry) -> str:
+    """Prometheus text exposition format (version 0.0.4)"""
+    by_name = defaultdict(list)
+    for (name, labels), value in list(reg.counters.items()) + list(reg.gauges.items()):
+        by_name[name].append((labels, value))
+    for (name, labels), entry in reg.histograms.items():
+        by_name[name].append((labels, entry))
+
+    lines = []
+    for name in sorted(by_name):
+        kind, help_text = METRICS.get(name, ('untyped', ''))
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(by_name[name], key=lambda item: item[0]):
+            if kind != 'histogram':
+                lines.append(f'{name}{_labels(labels)} {value:g}')
+                continue
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip(BUCKETS + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                lines.append(f'{name}_bucket{_labels(labels, {"le": le})} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {total:g}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
@@ -1,165 +1,425 @@
-import subprocess
-import os
-import time
+import signal
 import tempfile
-import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from typing import Tuple
-from app.models import TestCase
+from typing import List, NamedTuple, Optional, Tuple
+from app.testdata import get_store, map_file
+from judge.checker import compare_output, read_output
+from judge.compiler import Artifact, compile_code, get_artifact_cache
+from judge.log import excerpt, get_logger
+from judge.metrics import registry, span
+from judge.runner import Limits, execute
+from judge.testset_cache import get_test_set_cache
+from judge.warm import configured_pool, handoff_target
+from judge.workspace import get_workspaces
+
+WARM_LANGUAGES = ('python', 'java', 'javascript')
+# JVM and V8 reserve far more address space than they use; they get heap flags instead
+ADDRESS_SPACE_LIMITED_LANGUAGES = ('python', 'cpp')
+# A cold-started one gets the memory limit as its heap size (running out is Memory Limit Exceeded). The
+# runtime itself lives outside the heap, so their RSS may exceed the limit by JUDGE_RUNTIME_MEMORY_HEADROOM_MB
+HEAP_LIMITED_LANGUAGES = ('java', 'javascript')
+DEFAULT_RUNTIME_MEMORY_HEADROOM_MB = 128
+OUT_OF_MEMORY_MARKERS = (
+    'MemoryError',
+    'std::bad_alloc',
+    'java.lang.OutOfMemoryError',
+    'JavaScript heap out of memory',
+)
+DEFAULT_WALL_TIME_FACTOR = 2.0
+DEFAULT_OUTPUT_LIMIT_BYTES = 64 * 1024 * 1024
+
+logger = get_logger('judge')
 
 class Verdict(Enum):
     ACCEPTED = "Accepted"
     WRONG_ANSWER = "Wrong Answer"
     TIME_LIMIT_EXCEEDED = "Time Limit Exceeded"
+    MEMORY_LIMIT_EXCEEDED = "Memory Limit Exceeded"
+    OUTPUT_LIMIT_EXCEEDED = "Output Limit Exceeded"
     RUNTIME_ERROR = "Runtime Error"
     COMPILATION_ERROR = "Compilation Error"
 
-def run_code(code: str, language: str, input_data: str, time_limit: int) -> Tuple[Verdict, str, float]:
-    import shutil
-
-    with tempfile.TemporaryDirectory() as temp_dir:
-        filename_map = {
-            'python': 'solution.py',
-            'cpp': 'solution.cpp',
-            'java': 'Solution.java',
-            'javascript': 'solution.js'
-        }
-
-        if language not in filename_map:
-            return Verdict.COMPILATION_ERROR, f"Unsupported language: {language}", 0
-
-        filename = filename_map[language]
-        code_path = os.path.join(temp_dir, filename)
-
-        # Write user code
-        with open(code_path, 'w') as f:
-            f.write(code)
-
-        # === Compilation ===
-        if language == 'cpp':
-            executable = os.path.join(temp_dir, 'solution')
-            compile_result = subprocess.run(
-                ['g++', code_path, '-o', executable],
-                capture_output=True,
-                text=True
-            )
-            if compile_result.returncode != 0:
-                return Verdict.COMPILATION_ERROR, compile_result.stderr, 0
-
-        elif language == 'java':
-            compile_result = subprocess.run(
-                ['javac', code_path],
-                cwd=temp_dir,
-                capture_output=True,
-                text=True
-            )
-            if compile_result.returncode != 0:
-                return Verdict.COMPILATION_ERROR, compile_result.stderr, 0
-            executable = ['java', '-cp', temp_dir, 'Solution']
-
-        elif language == 'javascript':
-            if not shutil.which("node"):
-                return Verdict.COMPILATION_ERROR, "Node.js not installed.", 0
-            executable = ['node', code_path]
-
-        else:  # Python
-            executable = ['/usr/bin/python3', code_path]
-
-        # === Execution ===
+class RunResult(NamedTuple):
+    verdict: Verdict
+    output: str
+    exec_time: float  # CPU seconds
+    wall_time: float = 0.0
+    memory_kb: int = 0
+
+def _config(key, default):
+    from flask import current_app, has_app_context
+    return current_app.config.get(key, default) if has_app_context() else default
+
+def _memory_limited_command(artifact: Artifact, memory_limit_mb: Optional[int]) -> List[str]:
+    if memory_limit_mb and artifact.language == 'java':
+        return [artifact.command[0], f'-Xmx{memory_limit_mb}m'] + artifact.command[1:]
+    if memory_limit_mb and artifact.language == 'javascript':
+        return [artifact.command[0], f'--max-old-space-size={memory_limit_mb}'] + artifact.command[1:]
+    return artifact.command
+
+def run_artifact(artifact: Artifact, input_path: str, time_limit: float, memory_limit_mb: Optional[int] = None,
+                 on_start=None, warm_pool=None, expected_path: Optional[str] = None) -> RunResult:
+    """Run an already built submission against a single input
+
+    The time limit applies to CPU time; a wall-clock guard of
+    JUDGE_WALL_TIME_FACTOR times the limit catches programs that block.
+    Stdout is capped at JUDGE_OUTPUT_LIMIT_BYTES. With `expected_path` the
+    output is checked against that file (through mmap) and only mismatch
+    details are returned; otherwise the whole output is.
+    `on_start` is called with a killable handle right after the child starts.
+    With a warm pool (by default the one configured for the language) the
+    runtime is already started and only the submission itself is measured.
+    """
+    if warm_pool is None and artifact.language in WARM_LANGUAGES:
+        warm_pool = configured_pool(artifact.language, artifact.profile)
+
+    memory_limit_kb = memory_limit_mb * 1024 if memory_limit_mb else None
+    limits = Limits(
+        cpu_seconds=time_limit,
+        wall_seconds=time_limit * _config('JUDGE_WALL_TIME_FACTOR', DEFAULT_WALL_TIME_FACTOR),
+        address_space_bytes=memory_limit_kb * 1024
+        if memory_limit_kb and artifact.language in ADDRESS_SPACE_LIMITED_LANGUAGES else None,
+        output_bytes=_config('JUDGE_OUTPUT_LIMIT_BYTES', DEFAULT_OUTPUT_LIMIT_BYTES)
+    )
+
+    with _workspaces().acquire() as workspace:
+        warm = warm_pool.acquire() if warm_pool is not None else None
         try:
-            start_time = time.time()
-            env = os.environ.copy()
-            process = subprocess.run(
-                executable,
-                input=input_data,
-                capture_output=True,
-                text=True,
-                timeout=time_limit,
-                cwd=temp_dir,
-                env=env
-            )
-
-            exec_time = time.time() - start_time
-
-            if process.returncode != 0:
-                return Verdict.RUNTIME_ERROR, process.stderr.strip(), exec_time
-
-            return Verdict.ACCEPTED, process.stdout, exec_time
-
-        except subprocess.TimeoutExpired:
-            return Verdict.TIME_LIMIT_EXCEEDED, f"Time Limit Exceeded (>{time_limit}s)", time_limit
-
-def judge_submission(submission_id: int):
-    """Judge a submission against all test cases"""
-    from app import create_app, db
-    from app.models import Submission, TestCase
-
-    app = create_app()
-    with app.app_context():
-        submission = Submission.query.get(submission_id)
-        if not submission:
-            print(f"[Judge] Submission {submission_id} not found")
-            return None
-
-        problem = submission.problem
-        test_cases = TestCase.query.filter_by(problem_id=problem.id).all()
-        
-        print(f"[Judge] Judging submission {submission_id} for problem {problem.id}")
-        print(f"[Judge] Found {len(test_cases)} test cases")
-        
-        if not test_cases:
-            submission.status = Verdict.ACCEPTED.value
-            submission.execution_time = 0
-            db.session.commit()
-            print(f"[Judge] No test cases found, marked as Accepted")
-            return True
-            
-        submission.status = Verdict.ACCEPTED.value
-        submission.execution_time = 0
-        submission.error_message = None
-
-        def normalize_output(text: str) -> str:
-            return '\n'.join(
-                line.strip()
-                for line in text.strip().splitlines()
-                if line.strip() != ''
-            )
-
-        print(f"[Judge] Starting test case evaluation...")
-        for i, test_case in enumerate(test_cases, 1):
-            print(f"[Judge] Testing case {i}/{len(test_cases)}: input='{test_case.expected_input}', expected='{test_case.expected_output}'")
-            
-            time_limit_seconds = max(1, problem.time_limit / 1000)
-            
-            verdict, output, exec_time = run_code(
-                submission.code,
-                submission.language,
-                test_case.expected_input,
-                time_limit_seconds
-            )
-
-            submission.execution_time = max(submission.execution_time, exec_time)
-
-            if verdict != Verdict.ACCEPTED:
-                # e.g. Runtime Error, Time Limit Exceeded, etc.
-                submission.status = verdict.value
-                submission.error_message = f"Error in test case {i}: {verdict.value}"
-                print(f"[Judge] {submission.error_message} -> {output}")
-                db.session.commit()
-                return False
-
-            expected_normalized = normalize_output(test_case.expected_output)
-            actual_normalized = normalize_output(output)
-            
-            if actual_normalized != expected_normalized:
-                submission.status = Verdict.WRONG_ANSWER.value
-                submission.error_message = f"Error in test case {i}: Wrong Answer"
-                print(f"[Judge] {submission.error_message}: expected '{expected_normalized}', got '{actual_normalized}'")
-                db.session.commit()
-                return False
+            with span('run', language=artifact.language):
+                result = execute(
+                    _memory_limited_command(artifact, memory_limit_mb),
+                    input_path,
+                    limits,
+                    cwd=workspace.path,
+                    env=workspace.env,
+                    on_start=on_start,
+                    warm=warm,
+                    handoff=handoff_target(artifact, workspace.path) if warm is not None else None
+                )
+        finally:
+            if warm is not None:
+                warm.remove_directory()
+
+    with result.stdout:
+        return _verdict(result, time_limit, memory_limit_mb, limits.output_bytes, expected_path, artifact.language)
+
+def _verdict(result, time_limit: float, memory_limit_mb: Optional[int], output_limit: int,
+             expected_path: Optional[str], language: str) -> RunResult:
+    if result.output_limit_exceeded:
+        return RunResult(Verdict.OUTPUT_LIMIT_EXCEEDED, f"Output Limit Exceeded (>{output_limit} bytes)",
+                         result.cpu_time, result.wall_time, result.max_rss_kb)
+
+    if (result.wall_timeout or result.cpu_time > time_limit
+            or result.returncode in (-signal.SIGXCPU, -signal.SIGKILL) and result.cpu_time >= time_limit):
+        return RunResult(Verdict.TIME_LIMIT_EXCEEDED, f"Time Limit Exceeded (>{time_limit}s)",
+                         time_limit, result.wall_time, result.max_rss_kb)
+
+    memory_limit_kb = memory_limit_mb * 1024 if memory_limit_mb else None
+    rss_limit_kb = memory_limit_kb
+    if memory_limit_kb and language in HEAP_LIMITED_LANGUAGES:
+        rss_limit_kb += _config('JUDGE_RUNTIME_MEMORY_HEADROOM_MB', DEFAULT_RUNTIME_MEMORY_HEADROOM_MB) * 1024
+    if memory_limit_kb and (result.max_rss_kb > rss_limit_kb or (
+            result.returncode != 0 and any(marker in result.stderr for marker in OUT_OF_MEMORY_MARKERS))):
+        return RunResult(Verdict.MEMORY_LIMIT_EXCEEDED, f"Memory Limit Exceeded (>{memory_limit_mb}MB)",
+                         result.cpu_time, result.wall_time, result.max_rss_kb)
+
+    if result.output_incomplete:
+        return RunResult(Verdict.RUNTIME_ERROR, "A process left running kept the output open after the program exited",
+                         result.cpu_time, result.wall_time, result.max_rss_kb)
+
+    if result.returncode != 0:
+        return RunResult(Verdict.RUNTIME_ERROR, result.stderr.strip(),
+                         result.cpu_time, result.wall_time, result.max_rss_kb)
+
+    if expected_path is None:
+        return RunResult(Verdict.ACCEPTED, read_output(result.stdout),
+                         result.cpu_time, result.wall_time, result.max_rss_kb)
+
+    with span('compare', language=language), map_file(expected_path) as expected:
+        mismatch = compare_output(result.stdout, expected)
+    verdict = Verdict.ACCEPTED if mismatch is None else Verdict.WRONG_ANSWER
+    return RunResult(verdict, mismatch or '', result.cpu_time, result.wall_time, result.max_rss_kb)
+
+def _test_set_cache():
+    from flask import current_app
+    return get_test_set_cache(current_app.config['JUDGE_TESTSET_CACHE_BYTES'])
+
+def _workspaces():
+    return get_workspaces(_config('JUDGE_WORKSPACE_DIR', None))
+
+def _artifact_cache():
+    from flask import current_app
+    return get_artifact_cache(current_app.config['JUDGE_ARTIFACT_CACHE_DIR'],
+                              current_app.config['JUDGE_ARTIFACT_CACHE_MAX_BYTES'])
+
+def run_code(code: str, language: str, input_data: str, time_limit: int,
+             memory_limit_mb: Optional[int] = None, profile: Optional[str] = None) -> RunResult:
+    """Compile (or fetch from the artifact cache) and run `code` on one input"""
+    cache = _artifact_cache()
+    artifact, error = compile_code(code, language, cache, profile)
+    if artifact is None:
+        return RunResult(Verdict.COMPILATION_ERROR, error, 0)
+    try:
+        with tempfile.NamedTemporaryFile('w', suffix='.in') as input_file:
+            input_file.write(input_data)
+            input_file.flush()
+            return run_artifact(artifact, input_file.name, time_limit, memory_limit_mb)
+    finally:
+        cache.release(artifact)
+
+def evaluate_test(artifact: Artifact, input_path: str, expected_path: str, time_limit: float,
+                  memory_limit_mb: Optional[int] = None, on_start=None) -> RunResult:
+    """Run one test case and compare its output; `output` of the result holds details"""
+    return run_artifact(artifact, input_path, time_limit, memory_limit_mb, on_start=on_start,
+                        expected_path=expected_path)
+
+class _ParallelTestRun:
+    """Runs tests on a bounded pool and cancels everything past the first failure
+
+    Tests with a lower index than a known failure always run to completion, so
+    the reported failure is the lowest failing index, exactly as in sequential
+    mode. Each pool thread only drives one child process.
+    """
+
+    def __init__(self, artifact: Artifact, tests: List[Tuple[str, str]], time_limit: float,
+                 memory_limit_mb: Optional[int], on_result=None):
+        self.artifact = artifact
+        self.on_result = on_result
+        self.tests = tests
+        self.time_limit = time_limit
+        self.memory_limit_mb = memory_limit_mb
+        self.cutoff = len(tests)
+        self.processes = {}
+        self.lock = threading.Lock()
+
+    def _register(self, index, process):
+        with self.lock:
+            if index > self.cutoff:
+                process.kill()
             else:
-                print(f"[Judge] Test case {i} passed")
+                self.processes[index] = process
+
+    def _run_one(self, index):
+        with self.lock:
+            if index > self.cutoff:
+                return None
+
+        input_path, expected_path = self.tests[index]
+        result = evaluate_test(self.artifact, input_path, expected_path, self.time_limit,
+                               self.memory_limit_mb, on_start=lambda process: self._register(index, process))
+
+        with self.lock:
+            self.processes.pop(index, None)
+            if result.verdict != Verdict.ACCEPTED and index < self.cutoff:
+                self.cutoff = index
+                for other, process in self.processes.items():
+                    if other > index:
+                        process.kill()
+            relevant = index <= self.cutoff
+        if relevant and self.on_result is not None:
+            self.on_result(index, result)
+        return result
 
+    def run(self, parallelism: int) -> List[Optional[RunResult]]:
+        with ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix='judge-test') as pool:
+            results = list(pool.map(self._run_one, range(len(self.tests))))
+        return results[:self.cutoff + 1]
+
+def run_tests(artifact: Artifact, tests: List[Tuple[str, str]], time_limit: float,
+              memory_limit_mb: Optional[int] = None, parallelism: int = 1, on_result=None) -> List[RunResult]:
+    """Evaluate tests in order and stop at the first failure
+
+    `tests` holds (input path, expected output path) pairs. The returned list
+    ends with the failing test, if any. With parallelism > 1
+    tests are fanned out over a pool and the lowest failing index is reported.
+    `on_result(index, result)` is called as each test finishes (0-based index,
+    possibly out of order and from pool threads).
+    """
+    if parallelism > 1 and len(tests) > 1:
+        return _ParallelTestRun(artifact, tests, time_limit, memory_limit_mb,
+                                on_result).run(min(parallelism, len(tests)))
+
+    results = []
+    for i, (input_path, expected_path) in enumerate(tests, 1):
+        logger.debug("Testing case %d/%d: input=%s, expected=%s", i, len(tests), input_path, expected_path)
+        result = evaluate_test(artifact, input_path, expected_path, time_limit, memory_limit_mb)
+        results.append(result)
+        if on_result is not None:
+            on_result(i - 1, result)
+        if result.verdict != Verdict.ACCEPTED:
+            break
+        logger.debug("Test case %d passed", i)
+    return results
+
+def effective_parallelism(problem) -> int:
+    """Effective per-submission parallelism: worker cap, narrowed by the problem's cap
+
+    `problem` is a Problem or a cached TestSet; both carry the limits.
+    """
+    from flask import current_app
+    parallelism = current_app.config['JUDGE_TEST_PARALLELISM']
+    if problem.max_parallel_tests:
+        parallelism = min(parallelism, problem.max_parallel_tests)
+    return max(1, parallelism)
+
+def memory_limit_mb(problem) -> int:
+    from flask import current_app
+    return problem.memory_limit or current_app.config['JUDGE_DEFAULT_MEMORY_LIMIT_MB']
+
+_judge_app = None
+
+def judge_app():
+    """The process-wide judge app, created on first use"""
+    global _judge_app
+    if _judge_app is None:
+        from app import create_judge_app
+        _judge_app = create_judge_app()
+    return _judge_app
+
+def judge_submission(submission_id: int, worker_id: Optional[str] = None, progress=None):
+    """Judge a submission against all test cases
+
+    Runs in the caller's app context (a judge worker pushes one for its whole
+    life); without one, the shared judge app is used. With `worker_id` the
+    verdict is only written while that worker still holds the submission's
+    lease; otherwise LeaseLost is raised. A ProgressWriter (`progress`)
+    publishes per-test results while the tests run.
+    """
+    from flask import has_app_context
+    if has_app_context():
+        return _judge_submission(submission_id, worker_id, progress)
+    with judge_app().app_context():
+        return _judge_submission(submission_id, worker_id, progress)
+
+def _fence(submission_id: int, worker_id: Optional[str]):
+    """Renew the lease inside the verdict's transaction, or raise LeaseLost"""
+    from flask import current_app
+    from judge.job_queue import LeaseLost, renew_lease
+    if worker_id is not None and not renew_lease(submission_id, worker_id, current_app.config['JUDGE_LEASE_SECONDS']):
+        raise LeaseLost(f"{worker_id} no longer holds submission {submission_id}")
+
+def _judge_submission(submission_id: int, worker_id: Optional[str], progress=None):
+    from app.models import Submission
+
+    submission = Submission.query.get(submission_id)
+    if not submission:
+        logger.warning("Submission %s not found", submission_id)
+        return None
+
+    language = submission.language
+    if submission.queue_wait is not None:
+        registry.observe('judge_phase_seconds', submission.queue_wait, phase='queue_wait', language=language)
+    with span('judge', language=language):
+        verdict = _judge_loaded(submission, worker_id, progress)
+    registry.inc('judge_verdicts_total', language=language, verdict=verdict.value)
+    return verdict == Verdict.ACCEPTED
+
+def _judge_loaded(submission, worker_id: Optional[str], progress=None) -> Verdict:
+    from app import db
+    from app.models import SubmissionTestResult
+    from app.standings import update_standing
+    from judge.job_queue import PRIORITY_REJUDGE
+    from judge.verdict_reuse import code_hash, try_reuse
+
+    submission_id = submission.id
+    problem = submission.problem
+    # Limits and tests of the problem's current version, cached per worker
+    test_set = _test_set_cache().get(problem, get_store())
+    test_cases = test_set.tests
+
+    logger.info("Judging submission %s for problem %s (version %s)", submission_id, problem.id, test_set.version)
+
+    if submission.code_hash is None:
+        submission.code_hash = code_hash(submission.code)
+    # An identical submission may have been judged while this one was queued.
+    # Rejudges always run: they exist to get a fresh verdict.
+    if submission.priority < PRIORITY_REJUDGE and try_reuse(submission):
+        with span('db_commit', language=submission.language):
+            _fence(submission_id, worker_id)
+            db.session.commit()
+        registry.inc('judge_reused_verdicts_total', language=submission.language)
+        logger.info("Submission %s reused the verdict of submission %s: %s",
+                    submission_id, submission.reused_from_id, submission.status)
+        return Verdict(submission.status)
+
+    code, language = submission.code, submission.language
+    # A rejudge's live progress starts from scratch
+    SubmissionTestResult.query.filter_by(submission_id=submission_id).delete()
+    # No transaction stays open while programs run; it would hold up other workers' writes
+    db.session.commit()
+
+    logger.debug("Found %d test cases", len(test_cases))
+    if progress is None:
+        verdict, failed_at, results = _run_submission(code, language, test_set)
+    else:
+        with progress.judging(submission_id, [tc.test_case_id for tc in test_cases]) as report:
+            verdict, failed_at, results = _run_submission(code, language, test_set, report)
+
+    # Record the outcome in one short transaction; a rejudge replaces the previous per-test results
+    with span('db_commit', language=language):
+        _fence(submission_id, worker_id)
+        SubmissionTestResult.query.filter_by(submission_id=submission_id).delete()
+        submission.status = verdict.value
+        submission.error_message = f"Error in test case {failed_at}: {verdict.value}" if failed_at else None
+        submission.execution_time = max((result.exec_time for result in results), default=0)
+        submission.memory_used = max((result.memory_kb for result in results), default=0 if test_cases else None)
+        submission.reused_from_id = None
+        submission.test_version = test_set.version
+        for i, (test_case, result) in enumerate(zip(test_cases, results), 1):
+            db.session.add(SubmissionTestResult(
+                submission_id=submission_id,
+                test_case_id=test_case.test_case_id,
+                test_index=i,
+                verdict=result.verdict.value,
+                execution_time=result.exec_time,
+                wall_time=result.wall_time,
+                memory_kb=result.memory_kb
+            ))
+        update_standing(submission.contest_id, submission.user_id, submission.problem_id)
         db.session.commit()
-        print(f"[Judge] Final result: {submission.status}")
-        return True
+    logger.info("Submission %s: %s", submission_id, verdict.value)
+    return verdict
+
+def _run_submission(code: str, language: str, test_set,
+                    on_result=None) -> Tuple[Verdict, Optional[int], List[RunResult]]:
+    """Compile and run against `test_set`: (verdict, 1-based failing test or None, results so far)"""
+    test_cases = test_set.tests
+    if not test_cases:
+        logger.info("No test cases found, marked as Accepted")
+        return Verdict.ACCEPTED, None, []
+
+    # Files written by the previous submission's programs must not be visible to this one
+    _workspaces().reset()
+
+    # Runtimes used up by the previous submission boot while this one compiles, not during its tests
+    warm_pool = configured_pool(language, test_set.toolchain_profile) if language in WARM_LANGUAGES else None
+    if warm_pool is not None:
+        warm_pool.replenish()
+
+    # Build once; every test case runs the same artifact, pinned in the cache until they are done
+    cache = _artifact_cache()
+    with span('compile', language=language):
+        artifact, compile_error = compile_code(code, language, cache, test_set.toolchain_profile)
+    if artifact is None:
+        logger.info("Error in test case 1: %s -> %s", Verdict.COMPILATION_ERROR.value, excerpt(compile_error))
+        return Verdict.COMPILATION_ERROR, 1, []
+    try:
+        if warm_pool is not None:
+            warm_pool.warm_up()
+
+        time_limit_seconds = max(1, test_set.time_limit / 1000)
+        tests = [(tc.input_path, tc.expected_path) for tc in test_cases]
+        parallelism = effective_parallelism(test_set)
+
+        logger.debug("Starting test case evaluation (parallelism %d)", parallelism)
+        results = run_tests(artifact, tests, time_limit_seconds, memory_limit_mb(test_set), parallelism, on_result)
+    finally:
+        cache.release(artifact)
+    for i, result in enumerate(results, 1):
+        if result.verdict != Verdict.ACCEPTED:
+            # e.g. Wrong Answer, Runtime Error, Time Limit Exceeded, etc.
+            logger.info("Error in test case %d: %s -> %s", i, result.verdict.value, excerpt(result.output))
+            return result.verdict, i, results[:i]
+    return Verdict.ACCEPTED, None, results
@@ -0,0 +1,113 @@
+"""Judge nodes: worker pools on any number of machines sharing one database.
+
+A node is one `flask judge-worker` pool, on the web host or on any other
+machine that can reach the database. All nodes claim from the same queue
+under time-limited leases (judge.job_queue):
+
+- While a worker judges, a LeaseKeeper thread renews its lease every
+  JUDGE_HEARTBEAT_SECONDS. JUDGE_LEASE_SECONDS therefore only has to cover
+  a few missed heartbeats, not the longest judging run.
+- The transaction that writes a verdict renews the lease first. A worker
+  whose lease was taken over gets LeaseLost and its verdict is dropped.
+- Each node's supervisor keeps a row in judge_nodes alive and hands
+  submissions with an expired lease (from any node) back to the queue.
+
+Verdicts and per-test results are written straight to the database. Test
+data comes from a shared TESTDATA_DIR or, with JUDGE_TESTDATA_URL set, is
+downloaded on first use from the web app's /internal/testdata endpoint and
+kept in the node's own store.
+
+Several nodes can share one machine for local testing:
+    flask judge-worker --node-name node-a -c 2 &
+    flask judge-worker --node-name node-b -c 2 &
+"""
+import socket
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app import db
+from app.models import JudgeNode
+from judge.job_queue import renew_lease
+from judge.log import get_logger
+
+logger = get_logger('judge.nodes')
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+def register_node(name: str, concurrency: int) -> JudgeNode:
+    node = JudgeNode.query.filter_by(name=name).first()
+    if node is None:
+        node = JudgeNode(name=name)
+        db.session.add(node)
+    now = _utcnow()
+    node.hostname = socket.gethostname()
+    node.concurrency = concurrency
+    node.started_at = now
+    node.last_heartbeat = now
+    node.stopped_at = None
+    db.session.commit()
+    return node
+
+
+def heartbeat(name: str):
+    JudgeNode.query.filter_by(name=name).update({'last_heartbeat': _utcnow()})
+    db.session.commit()
+
+
+def stop_node(name: str):
+    JudgeNode.query.filter_by(name=name).update({'stopped_at': _utcnow()})
+    db.session.commit()
+
+
+def live_nodes(timeout_seconds: float) -> int:
+    """Nodes that are running and sent a heartbeat within `timeout_seconds`"""
+    return JudgeNode.query.filter(
+        JudgeNode.stopped_at.is_(None),
+        JudgeNode.last_heartbeat >= _utcnow() - timedelta(seconds=timeout_seconds)
+    ).count()
+
+
+class LeaseKeeper:
+    """Renews the lease of the submission a worker is judging, from a background thread"""
+
+    def __init__(self, app, worker_id: str, lease_seconds: int, interval: float):
+        self.app = app
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.interval = interval
+        self.submission_id: Optional[int] = None
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='lease-keeper', daemon=True)
+        self.thread.start()
+
+    @contextmanager
+    def holding(self, submission_id: int):
+        self.submission_id = submission_id
+        try:
+            yield
+        finally:
+            self.submission_id = None
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        # Its own app context, hence its own session and connection
+        with self.app.app_context():
+            while not self.stopped.wait(self.interval):
+                submission_id = self.submission_id
+                if submission_id is None:
+                    continue
+                try:
+                    if not renew_lease(submission_id, self.worker_id, self.lease_seconds):
+                        logger.warning("%s lost the lease on submission %s", self.worker_id, submission_id)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Renewing the lease on submission %s failed", submission_id)
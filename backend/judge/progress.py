@@ -0,0 +1,95 @@
+"""Per-test progress of the submission a worker is judging.
+
+Test results are handed to a background thread and written to
+submission_test_results every JUDGE_PROGRESS_INTERVAL seconds, so the
+submission page can show them while the remaining tests still run (see
+app/live.py). Test threads never wait on the database.
+
+These rows are provisional. The final verdict transaction replaces them
+with the authoritative set. Each batch is only written while the worker
+still holds the lease, renewed in the same transaction, so a worker that
+lost the submission cannot add rows next to the new holder's.
+"""
+import threading
+from contextlib import contextmanager
+from typing import List, Optional
+
+from app import db
+from app.models import SubmissionTestResult
+from judge.job_queue import renew_lease
+from judge.log import get_logger
+
+logger = get_logger('judge.progress')
+
+
+class ProgressWriter:
+    def __init__(self, app, worker_id: str, lease_seconds: int, interval: float):
+        self.app = app
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.interval = interval
+        self.submission_id: Optional[int] = None
+        self.test_case_ids: List[int] = []
+        self.pending = []
+        self.lock = threading.Lock()  # guards the fields above
+        self.write_lock = threading.Lock()  # held while a batch is written
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='progress-writer', daemon=True)
+        self.thread.start()
+
+    @contextmanager
+    def judging(self, submission_id: int, test_case_ids: List[int]):
+        """Collect results for `submission_id`; yields the callback test runs report to
+
+        Nothing of this submission is written after the block exits, so the
+        final verdict transaction that follows cannot be interleaved.
+        """
+        with self.lock:
+            self.submission_id = submission_id
+            self.test_case_ids = test_case_ids
+            self.pending = []
+        try:
+            yield self.report
+        finally:
+            with self.write_lock, self.lock:
+                self.submission_id = None
+                self.pending = []
+
+    def report(self, index: int, result):
+        """Called from test threads with the 0-based test index and its RunResult"""
+        with self.lock:
+            if self.submission_id is None:
+                return
+            self.pending.append(SubmissionTestResult(
+                submission_id=self.submission_id,
+                test_case_id=self.test_case_ids[index] if index < len(self.test_case_ids) else None,
+                test_index=index + 1,
+                verdict=result.verdict.value,
+                execution_time=result.exec_time,
+                wall_time=result.wall_time,
+                memory_kb=result.memory_kb
+            ))
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def _flush(self):
+        with self.write_lock:
+            with self.lock:
+                submission_id, batch, self.pending = self.submission_id, self.pending, []
+            if submission_id is None or not batch:
+                return
+            try:
+                if renew_lease(submission_id, self.worker_id, self.lease_seconds):
+                    db.session.add_all(batch)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                logger.exception("Writing test progress of submission %s failed", submission_id)
+
+    def _run(self):
+        # Its own app context, hence its own session and connection
+        with self.app.app_context():
+            while not self.stopped.wait(self.interval):
+                self._flush()
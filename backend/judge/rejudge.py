@@ -0,0 +1,75 @@
+"""Bulk rejudges of a problem's or a contest's submissions.
+
+A rejudge puts the matching submissions back on the judge queue at
+PRIORITY_REJUDGE, so live submissions are always judged first and only
+JUDGE_REJUDGE_SLOTS rejudges run at once. Each job records the submissions
+it queued (rejudge_job_submissions), so its progress stays right when a
+later rejudge queues some of them again. Unchanged code is not recompiled:
+the artifact cache already has it under the same key.
+"""
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import insert, update
+
+from app import db
+from app.models import RejudgeJob, Submission, rejudge_job_submissions
+from judge.job_queue import PENDING, PRIORITY_REJUDGE
+from judge.log import get_logger
+
+BATCH_SIZE = 500
+
+logger = get_logger('judge.rejudge')
+
+
+def matching_submissions(problem_id: Optional[int] = None, contest_id: Optional[int] = None,
+                         statuses: Iterable[str] = ()):
+    """Judged submissions in scope; queued ones are left where they are"""
+    query = Submission.query.filter(Submission.status != PENDING)
+    if problem_id is not None:
+        query = query.filter(Submission.problem_id == problem_id)
+    if contest_id is not None:
+        query = query.filter(Submission.contest_id == contest_id)
+    statuses = list(statuses)
+    if statuses:
+        query = query.filter(Submission.status.in_(statuses))
+    return query
+
+
+def start_rejudge(problem_id: Optional[int] = None, contest_id: Optional[int] = None,
+                  statuses: Iterable[str] = (), created_by_id: Optional[int] = None) -> RejudgeJob:
+    """Queue the matching submissions for rejudging and return the tracking job"""
+    if problem_id is None and contest_id is None:
+        raise ValueError('A rejudge needs a problem or a contest')
+    statuses = [s for s in statuses if s]
+
+    queued_at = datetime.now(timezone.utc)
+    job = RejudgeJob(problem_id=problem_id, contest_id=contest_id, statuses=','.join(statuses),
+                     created_by_id=created_by_id, created_at=queued_at, total=0)
+    db.session.add(job)
+    db.session.commit()
+
+    ids = [row.id for row in matching_submissions(problem_id, contest_id, statuses)
+           .with_entities(Submission.id).order_by(Submission.id)]
+    # Short transactions: live claims keep flowing while a large rejudge is queued
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = ids[start:start + BATCH_SIZE]
+        queued = db.session.execute(
+            update(Submission)
+            .where(Submission.id.in_(batch), Submission.status != PENDING)
+            .values(status=PENDING, priority=PRIORITY_REJUDGE, rejudge_job_id=job.id,
+                    queued_at=queued_at, queue_wait=None,
+                    execution_time=None, memory_used=None, error_message=None,
+                    test_version=None, reused_from_id=None,
+                    claimed_by=None, claimed_at=None, lease_expires_at=None, judge_attempts=0)
+            .returning(Submission.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        if queued:
+            db.session.execute(insert(rejudge_job_submissions),
+                               [{'job_id': job.id, 'submission_id': submission_id} for submission_id in queued])
+        job.total += len(queued)
+        db.session.commit()
+
+    logger.info("Rejudge %s: queued %s submission(s)", job.id, job.total)
+    return job
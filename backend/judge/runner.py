@@ -0,0 +1,232 @@
+"""Low-level execution of one submission process with resource accounting.
+
+Children are started by the judge spawner (see judge.spawner), which reaps
+them with wait4() so their CPU time and peak RSS come straight from the
+kernel. The time limit is enforced on CPU time through RLIMIT_CPU,
+and a separate wall-clock guard kills processes that sleep or block, together
+with their whole process group (see judge.spawner). Memory is capped with
+RLIMIT_AS where the runtime tolerates it.
+
+Stdout is streamed into a spooled temporary file (in memory while small, on
+disk past SPOOL_MEMORY_BYTES) and the child is killed as soon as it writes
+more than the output limit, so a runaway program never sits in judge memory.
+A descendant that escaped the process group and still holds stdout open
+after the program exited is found through /proc and killed. If the output
+still does not end, it is reported incomplete instead of judged.
+"""
+import math
+import os
+import resource
+import signal
+import tempfile
+import threading
+import time
+from typing import BinaryIO, List, NamedTuple, Optional
+
+from judge.spawner import get_spawner
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+SPOOL_MEMORY_BYTES = 1024 * 1024
+# Only the start of stderr is kept (for runtime error details and OOM markers)
+STDERR_LIMIT_BYTES = 64 * 1024
+# How long the output pipes may stay open after the program exited, before and after killing their holders
+PUMP_GRACE_SECONDS = 1
+
+
+class Limits(NamedTuple):
+    cpu_seconds: float
+    wall_seconds: float
+    address_space_bytes: Optional[int] = None  # RLIMIT_AS; None leaves it unlimited
+    output_bytes: Optional[int] = None  # stdout cap; None leaves it unlimited
+
+
+class ExecutionResult(NamedTuple):
+    returncode: int
+    stdout: BinaryIO  # spooled file positioned at the start; the caller closes it
+    stderr: str
+    cpu_time: float
+    wall_time: float
+    max_rss_kb: int
+    wall_timeout: bool
+    output_limit_exceeded: bool
+    output_incomplete: bool = False  # stdout was still held open by a process that could not be killed
+
+
+def _rlimits(limits: Limits, cpu_offset: float = 0):
+    # The kernel sends SIGXCPU at the soft limit and SIGKILL at the hard limit
+    cpu = math.ceil(cpu_offset + limits.cpu_seconds) + 1
+    rlimits = [(resource.RLIMIT_CPU, (cpu, cpu + 1))]
+    if limits.address_space_bytes:
+        rlimits.append((resource.RLIMIT_AS, (limits.address_space_bytes, limits.address_space_bytes)))
+    return rlimits
+
+
+def process_cpu_time(pid: int) -> float:
+    """CPU seconds a live process has used so far"""
+    try:
+        # Nanosecond runtime; /proc/<pid>/stat only has clock-tick resolution.
+        # Kernels without schedstats report 0 here.
+        with open(f'/proc/{pid}/schedstat') as f:
+            runtime = int(f.read().split()[0])
+        if runtime:
+            return runtime / 1e9
+    except (OSError, ValueError, IndexError):
+        pass
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def _drain(stream, chunks: List[bytes], limit: int):
+    kept = 0
+    for chunk in iter(lambda: stream.read(65536), b''):
+        if kept < limit:
+            chunks.append(chunk[:limit - kept])
+            kept += len(chunk)
+    stream.close()
+
+
+def _spool(stream, sink: BinaryIO, limit: Optional[int], on_overflow):
+    """Copy stdout into `sink`, stopping once more than `limit` bytes arrive"""
+    written = 0
+    try:
+        for chunk in iter(lambda: stream.read(65536), b''):
+            if limit is not None and written + len(chunk) > limit:
+                sink.write(chunk[:limit - written])
+                on_overflow()
+                break
+            sink.write(chunk)
+            written += len(chunk)
+    except ValueError:
+        pass  # execute() gave up on this output and closed the sink
+    stream.close()
+
+
+def _kill_pipe_holders(streams) -> int:
+    """SIGKILL every other process with one of `streams`' pipes open; returns how many"""
+    pipes = set()
+    for stream in streams:
+        try:
+            pipes.add(f'pipe:[{os.fstat(stream.fileno()).st_ino}]')
+        except (OSError, ValueError):
+            pass  # closed meanwhile: its pump finished
+    killed = 0
+    me = os.getpid()
+    for entry in os.scandir('/proc'):
+        if not entry.name.isdigit() or int(entry.name) == me:
+            continue
+        try:
+            with os.scandir(f'{entry.path}/fd') as fds:
+                holds = any(os.readlink(fd.path) in pipes for fd in fds)
+        except OSError:
+            continue  # exited, or not ours to inspect
+        if holds:
+            try:
+                os.kill(int(entry.name), signal.SIGKILL)
+                killed += 1
+            except (ProcessLookupError, PermissionError):
+                pass
+    return killed
+
+
+def _feed(stream, input_path: str):
+    """Copy the input file into a stdin pipe with sendfile(), without passing through Python"""
+    try:
+        with open(input_path, 'rb') as f:
+            offset, size = 0, os.fstat(f.fileno()).st_size
+            while offset < size:
+                sent = os.sendfile(stream.fileno(), f.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+    except (BrokenPipeError, OSError):
+        # The program exited without reading all of its input
+        pass
+    finally:
+        try:
+            stream.close()
+        except OSError:
+            pass
+
+
+def execute(command: List[str], input_path: str, limits: Limits, cwd: str, env: dict,
+            on_start=None, warm=None, handoff: Optional[str] = None) -> ExecutionResult:
+    """Run `command` (or hand `handoff` to the pre-started `warm` runtime) on `input_path`
+
+    A cold-started child reads the input file directly as its stdin; a warm
+    runtime already has a stdin pipe, which is filled with sendfile().
+    """
+    if warm is not None:
+        process = warm.process
+        startup_cpu = process_cpu_time(process.pid)
+        for which, value in _rlimits(limits, startup_cpu):
+            resource.prlimit(process.pid, which, value)
+        start_time = time.monotonic()
+        warm.handoff(handoff)
+    else:
+        startup_cpu = 0
+        start_time = time.monotonic()
+        with open(input_path, 'rb') as stdin:
+            process = get_spawner().popen(command, cwd, env, rlimits=_rlimits(limits), setsid=True,
+                                          stdin_fd=stdin.fileno())
+    if on_start is not None:
+        on_start(process)
+
+    timed_out = threading.Event()
+    output_exceeded = threading.Event()
+
+    def overflow():
+        output_exceeded.set()
+        process.kill()
+
+    stdout = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    stderr_chunks = []
+    spool = threading.Thread(target=_spool, args=(process.stdout, stdout, limits.output_bytes, overflow),
+                             daemon=True)
+    pumps = [
+        spool,
+        threading.Thread(target=_drain, args=(process.stderr, stderr_chunks, STDERR_LIMIT_BYTES), daemon=True),
+    ]
+    if process.stdin is not None:
+        pumps.append(threading.Thread(target=_feed, args=(process.stdin, input_path), daemon=True))
+    for pump in pumps:
+        pump.start()
+
+    def guard():
+        timed_out.set()
+        process.kill()
+
+    watchdog = threading.Timer(limits.wall_seconds, guard)
+    watchdog.start()
+    try:
+        process.wait()
+    finally:
+        watchdog.cancel()
+    wall_time = time.monotonic() - start_time
+
+    for pump in pumps:
+        # A leaked grandchild may keep the pipes open; don't wait on it forever
+        pump.join(timeout=PUMP_GRACE_SECONDS)
+    if any(pump.is_alive() for pump in pumps):
+        # It left the process group, so the spawner did not kill it with the program
+        _kill_pipe_holders([stream for stream in (process.stdin, process.stdout, process.stderr) if stream])
+        for pump in pumps:
+            pump.join(timeout=PUMP_GRACE_SECONDS)
+    output_incomplete = spool.is_alive()
+    if output_incomplete:
+        # Its pump may still write; the partial output is not judged
+        stdout.close()
+        stdout = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    stdout.seek(0)
+
+    return ExecutionResult(
+        returncode=process.returncode,
+        stdout=stdout,
+        stderr=b''.join(stderr_chunks).decode('utf-8', errors='replace'),
+        cpu_time=max(0.0, process.rusage['utime'] + process.rusage['stime'] - startup_cpu),
+        wall_time=wall_time,
+        max_rss_kb=process.rusage['maxrss'],
+        wall_timeout=timed_out.is_set(),
+        output_limit_exceeded=output_exceeded.is_set(),
+        output_incomplete=output_incomplete
+    )
@@ -0,0 +1,91 @@
+"""Fair-share, deadline-aware ordering of the judge queue.
+
+Instead of strictly oldest-first, a worker ranks the first few claimable
+submissions of every (contest, user) and claims the best one:
+
+- Priority classes stay strict: live submissions, then admin test runs,
+  then rejudges.
+- Within a class, contests are served round-robin: a contest's k-th queued
+  submission is scheduled at virtual time k (plus the submissions it already
+  has on workers). One large contest therefore cannot hold back a small one.
+- Inside a contest, users are served round-robin the same way, so one user
+  submitting in a loop only delays their own later submissions.
+- A contest close to its end_time gets a larger share (its virtual time
+  advances more slowly) rather than absolute precedence, so it is judged
+  first without shutting out everyone else.
+- Ties go to the submission that has waited longest.
+
+A user's later submissions are reached as their earlier ones are judged,
+so nothing waits forever.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.timeutil import as_utc
+
+
+class Candidate(NamedTuple):
+    id: int
+    user_id: Optional[int]
+    contest_id: Optional[int]
+    priority: int
+    queued_at: Optional[datetime]
+    judge_attempts: int
+
+
+class SchedulerSettings(NamedTuple):
+    window: int = 500  # claimable submissions considered per claim...
+    per_user: int = 3  # ...at most this many of them from one user in one contest and class
+    deadline_window_seconds: float = 15 * 60  # contests ending this soon are boosted...
+    deadline_weight: float = 4.0  # ...to this many times their normal share
+
+
+def contest_weight(end_time: Optional[datetime], now: datetime, settings: SchedulerSettings) -> float:
+    end_time = as_utc(end_time)
+    if end_time is None:
+        return 1.0
+    remaining = (end_time - now).total_seconds()
+    if 0 <= remaining <= settings.deadline_window_seconds:
+        return settings.deadline_weight
+    return 1.0
+
+
+def rank(candidates: Iterable[Candidate], running: Iterable[Tuple[Optional[int], Optional[int]]],
+         contest_end_times: Dict[int, datetime], now: datetime,
+         settings: SchedulerSettings = SchedulerSettings()) -> List[Candidate]:
+    """Order `candidates` best first
+
+    `running` holds (user_id, contest_id) of submissions currently being
+    judged; they count against their user's and contest's share.
+    """
+    running = list(running)
+    user_running = Counter(user_id for user_id, _ in running)
+    contest_running = Counter(contest_id for _, contest_id in running)
+    never = datetime.max.replace(tzinfo=timezone.utc)
+
+    def waited(candidate):
+        return as_utc(candidate.queued_at) or never, candidate.id
+
+    # Round-robin over users within each (priority class, contest)
+    queues = defaultdict(list)
+    for candidate in sorted(candidates, key=waited):
+        queues[candidate.priority, candidate.contest_id].append(candidate)
+
+    keyed = []
+    for (priority, contest_id), queue in queues.items():
+        user_seen = Counter()
+        user_order = []
+        for candidate in queue:
+            user_order.append((user_running[candidate.user_id] + user_seen[candidate.user_id], waited(candidate),
+                               candidate))
+            user_seen[candidate.user_id] += 1
+        user_order.sort(key=lambda item: item[:2])
+
+        weight = contest_weight(contest_end_times.get(contest_id), now, settings)
+        for k, (_, wait_key, candidate) in enumerate(user_order):
+            virtual_time = (contest_running[contest_id] + k) / weight
+            keyed.append(((priority, virtual_time, wait_key), candidate))
+
+    keyed.sort(key=lambda item: item[0])
+    return [candidate for _, candidate in keyed]
@@ -0,0 +1,451 @@
+"""Small fork server that starts submission processes for a judge worker.
+
+Linux carries a process's peak RSS across fork and exec, so a child forked
+straight from a judge worker reports the worker's own footprint as its
+ru_maxrss. All submission processes are therefore forked from this tiny,
+separately exec'd server: it applies resource limits, execs the program,
+reaps it with wait4() and sends the exit status and rusage back.
+
+Requests and replies are JSON datagrams on a SOCK_SEQPACKET socket pair;
+stdio pipes travel with the request as SCM_RIGHTS file descriptors.
+
+Submission processes are started in a session of their own. A program
+may fork, and a JVM or node may leave helpers behind. When the started
+process exits, or is killed on a limit, its whole process group goes with
+it. The group is killed while the exited leader is still an unreaped
+zombie, so its pid cannot have been reused. With a delegated cgroup v2
+directory (JUDGE_CGROUP_ROOT) every run also gets its own cgroup. That
+cgroup is killed as a whole and caps the number of processes.
+
+Descendants that leave the group (setsid, double fork) are reparented
+to the server, which is a child subreaper. After every run, and every
+JUDGE_REAPER_INTERVAL seconds, a sweeper kills and reaps any live process
+the server did not start itself, and reports it to the worker.
+"""
+import fcntl
+import json
+import os
+import resource
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+MAX_MESSAGE = 1 << 20
+PR_SET_CHILD_SUBREAPER = 36
+# Killing a stray re-parents its own children to the server; sweep again until none are left
+MAX_SWEEP_PASSES = 20
+
+
+# === Server side (runs in its own interpreter) ===
+
+def _exec_child(request: dict, fds: List[int]):
+    """In the forked child: set up limits and descriptors, then exec"""
+    try:
+        if request.get('cgroup'):
+            with open(os.path.join(request['cgroup'], 'cgroup.procs'), 'w') as f:
+                f.write(str(os.getpid()))
+        for which, soft, hard in request['rlimits']:
+            resource.setrlimit(which, (soft, hard))
+        if request.get('setsid'):
+            os.setsid()
+        # stdin, stdout, stderr, then extra descriptors as 3, 4, ...; move them
+        # out of the way first so that no target clobbers a later source
+        moved = [fcntl.fcntl(fd, fcntl.F_DUPFD, 256) for fd in fds]
+        for target, fd in enumerate(moved):
+            os.dup2(fd, target)
+        os.closerange(len(fds), 65536)
+        os.chdir(request['cwd'])
+        os.execvpe(request['argv'][0], request['argv'], request['env'])
+    except BaseException as e:
+        try:
+            os.write(2, f"spawn failed: {e}\n".encode())
+        finally:
+            os._exit(127)
+
+
+def _become_subreaper() -> bool:
+    try:
+        import ctypes
+        return ctypes.CDLL(None, use_errno=True).prctl(PR_SET_CHILD_SUBREAPER, 1, 0, 0, 0) == 0
+    except (OSError, AttributeError):
+        return False
+
+
+def _children(parent: int) -> List[Tuple[int, str, int]]:
+    """(pid, state, process group) of every process whose parent is `parent`"""
+    found = []
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat', 'rb') as f:
+                fields = f.read().rsplit(b')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == parent:
+            found.append((int(name), fields[0].decode(), int(fields[2])))
+    return found
+
+
+def _kill(pid: int, group: bool = False):
+    try:
+        if group:
+            os.killpg(pid, signal.SIGKILL)
+        else:
+            os.kill(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _cgroup_create(root: str, name: str, pids_max: Optional[int]) -> Optional[str]:
+    path = os.path.join(root, name)
+    try:
+        os.mkdir(path)
+        if pids_max:
+            with open(os.path.join(path, 'pids.max'), 'w') as f:
+                f.write(str(pids_max))
+    except FileExistsError:
+        pass
+    except OSError:
+        # pids controller not enabled: still usable for killing the run as a whole
+        if not os.path.isdir(path):
+            return None
+    return path
+
+
+def _cgroup_remove(path: str) -> bool:
+    """Kill everything left in the cgroup and remove it; False if it is still populated"""
+    try:
+        with open(os.path.join(path, 'cgroup.kill'), 'w') as f:
+            f.write('1')
+    except OSError:
+        # Kernels before 5.14 have no cgroup.kill
+        try:
+            with open(os.path.join(path, 'cgroup.procs')) as f:
+                for pid in f.read().split():
+                    _kill(int(pid))
+        except OSError:
+            pass
+    try:
+        os.rmdir(path)
+        return True
+    except FileNotFoundError:
+        return True
+    except OSError:
+        return False
+
+
+def serve(sock: socket.socket, options: Optional[dict] = None):
+    options = options or {}
+    cgroup_root = options.get('cgroup_root')
+    send_lock = threading.Lock()
+    children = threading.Semaphore(0)
+    # Processes this server started and has not reaped yet: pid -> (own session, cgroup path).
+    # Held across fork() so the reaper never mistakes a fresh child for a stray.
+    state_lock = threading.Lock()
+    spawned: Dict[int, Tuple[bool, Optional[str]]] = {}
+    leftover_cgroups = []
+    killed_groups = set()  # groups of finished runs; their members are already dying
+    sweep_now = threading.Event()
+    me = os.getpid()
+    subreaper = _become_subreaper()
+
+    def send(message):
+        with send_lock:
+            sock.send(json.dumps(message).encode())
+
+    def reap():
+        while True:
+            children.acquire()
+            while True:
+                # Peek first: while the exited child is an unreaped zombie its pid
+                # (and so its process group id) cannot be reused
+                pid = os.waitid(os.P_ALL, 0, os.WEXITED | os.WNOWAIT).si_pid
+                with state_lock:
+                    ours = pid in spawned
+                    session, cgroup = spawned.get(pid, (False, None))
+                if session:
+                    _kill(pid, group=True)
+                    with state_lock:
+                        killed_groups.add(pid)
+                if cgroup and not _cgroup_remove(cgroup):
+                        leftover_cgroups.append(cgroup)
+                try:
+                    pid, status, rusage = os.wait4(pid, 0)
+                except ChildProcessError:
+                    continue  # an adopted stray, reaped by the sweeper meanwhile
+                if not ours:
+                    continue
+                with state_lock:
+                    del spawned[pid]
+                send({
+                    'pid': pid,
+                    'status': status,
+                    'utime': rusage.ru_utime,
+                    'stime': rusage.ru_stime,
+                    'maxrss': rusage.ru_maxrss,
+                })
+                sweep_now.set()
+                break
+
+    def sweep():
+        while True:
+            sweep_now.wait(options.get('sweep_interval') or 1.0)
+            sweep_now.clear()
+            strays = []
+            for _ in range(MAX_SWEEP_PASSES):
+                live = 0
+                for pid, state, group in _children(me):
+                    with state_lock:
+                        if pid in spawned:
+                            continue
+                        if state != 'Z':
+                            live += 1
+                            if group not in killed_groups:
+                                strays.append(pid)
+                            _kill(pid)
+                            _kill(pid, group=True)
+                        try:
+                            os.waitpid(pid, os.WNOHANG)
+                        except ChildProcessError:
+                            pass
+                if not live:
+                    break
+                time.sleep(0.01)
+            with state_lock:
+                killed_groups.clear()
+            for cgroup in list(leftover_cgroups):
+                if _cgroup_remove(cgroup):
+                    leftover_cgroups.remove(cgroup)
+            if strays:
+                send({'reaped': sorted(set(strays))})
+
+    threading.Thread(target=reap, daemon=True).start()
+    if subreaper:
+        threading.Thread(target=sweep, daemon=True).start()
+
+    while True:
+        try:
+            data, fds, _, _ = socket.recv_fds(sock, MAX_MESSAGE, 16)
+        except OSError:
+            return
+        if not data:
+            return
+        request = json.loads(data)
+        if cgroup_root and request.get('setsid'):
+            request['cgroup'] = _cgroup_create(cgroup_root, f"run-{me}-{request['id']}", options.get('pids_max'))
+        with state_lock:
+            try:
+                pid = os.fork()
+            except OSError as e:
+                for fd in fds:
+                    os.close(fd)
+                send({'id': request['id'], 'error': str(e)})
+                continue
+            if pid == 0:
+                sock.close()
+                _exec_child(request, fds)
+            spawned[pid] = (bool(request.get('setsid')), request.get('cgroup'))
+        for fd in fds:
+            os.close(fd)
+        children.release()
+        send({'id': request['id'], 'pid': pid})
+
+
+# === Client side (runs in the judge worker) ===
+
+class SpawnedProcess:
+    """A child of the spawner; mirrors the parts of Popen the judge uses"""
+
+    def __init__(self, spawner: 'Spawner', pid: int, stdin=None, stdout=None, stderr=None, group: bool = False):
+        self.spawner = spawner
+        self.pid = pid
+        self.group = group  # leads its own process group; signals go to the whole group
+        self.stdin = stdin
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = None
+        self.rusage = None
+        self._exited = threading.Event()
+        self._lock = threading.Lock()
+
+    def _set_exit(self, message: dict):
+        with self._lock:
+            self.returncode = os.waitstatus_to_exitcode(message['status'])
+            self.rusage = message
+        self._exited.set()
+
+    def send_signal(self, sig: int):
+        # Once the exit has been reported the pid may already be reused
+        with self._lock:
+            if self.returncode is not None:
+                return
+            try:
+                if self.group:
+                    os.killpg(self.pid, sig)
+                else:
+                    os.kill(self.pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+    def poll(self) -> Optional[int]:
+        return self.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[int]:
+        self._exited.wait(timeout)
+        return self.returncode
+
+
+class Spawner:
+    def __init__(self, options: Optional[dict] = None):
+        """`options`: cgroup_root, pids_max and sweep_interval for the server"""
+        # Imported here so the server process stays as small as possible
+        import subprocess
+
+        ours, theirs = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.server = subprocess.Popen(
+            [sys.executable, '-S', os.path.abspath(__file__), str(theirs.fileno()), json.dumps(options or {})],
+            pass_fds=(theirs.fileno(),),
+            stdin=subprocess.DEVNULL
+        )
+        theirs.close()
+        self.sock = ours
+        self.lock = threading.Lock()
+        self.next_id = 0
+        self.replies: Dict[int, dict] = {}
+        self.reply_ready = threading.Condition(self.lock)
+        self.processes: Dict[int, SpawnedProcess] = {}
+        self.early_exits: Dict[int, dict] = {}
+        self.alive = True
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        while True:
+            try:
+                data = self.sock.recv(MAX_MESSAGE)
+            except OSError:
+                data = b''
+            if not data:
+                break
+            message = json.loads(data)
+            if 'reaped' in message:
+                _report_strays(message['reaped'])
+                continue
+            with self.lock:
+                if 'id' in message:
+                    self.replies[message['id']] = message
+                    self.reply_ready.notify_all()
+                    continue
+                process = self.processes.pop(message['pid'], None)
+                if process is None:
+                    # Exited before the spawn reply was processed
+                    self.early_exits[message['pid']] = message
+            if process is not None:
+                process._set_exit(message)
+
+        with self.lock:
+            self.alive = False
+            self.reply_ready.notify_all()
+            orphans = list(self.processes.values())
+            self.processes.clear()
+        for process in orphans:
+            process._set_exit({'status': 255 << 8, 'utime': 0, 'stime': 0, 'maxrss': 0})
+
+    def spawn(self, argv: Sequence[str], cwd: str, env: dict, fds: Sequence[int],
+              rlimits=(), setsid: bool = False, **streams) -> SpawnedProcess:
+        """Start `argv` with `fds` as its descriptors 0, 1, 2, 3, ..."""
+        with self.lock:
+            if not self.alive:
+                raise RuntimeError('judge spawner is not running')
+            request_id = self.next_id
+            self.next_id += 1
+        request = {
+            'id': request_id,
+            'argv': list(argv),
+            'cwd': cwd,
+            'env': env,
+            'rlimits': [[which, soft, hard] for which, (soft, hard) in rlimits],
+            'setsid': setsid,
+        }
+        socket.send_fds(self.sock, [json.dumps(request).encode()], list(fds))
+
+        with self.lock:
+            while request_id not in self.replies and self.alive:
+                self.reply_ready.wait()
+            reply = self.replies.pop(request_id, None)
+            if reply is None:
+                raise RuntimeError('judge spawner exited')
+            if 'error' in reply:
+                raise OSError(reply['error'])
+            process = SpawnedProcess(self, reply['pid'], group=setsid, **streams)
+            early = self.early_exits.pop(process.pid, None)
+            if early is None:
+                self.processes[process.pid] = process
+        if early is not None:
+            process._set_exit(early)
+        return process
+
+    def popen(self, argv: Sequence[str], cwd: str, env: dict, rlimits=(), setsid: bool = False,
+              extra_fds: Sequence[int] = (), stdin_fd: Optional[int] = None) -> SpawnedProcess:
+        """Like Popen with stdout/stderr pipes (binary) and stdin from `stdin_fd` or a pipe"""
+        stdin_read, stdin_write = os.pipe() if stdin_fd is None else (None, None)
+        stdout_read, stdout_write = os.pipe()
+        stderr_read, stderr_write = os.pipe()
+        pipe_ends = [fd for fd in (stdin_read, stdout_write, stderr_write) if fd is not None]
+        child_fds = [stdin_fd if stdin_fd is not None else stdin_read, stdout_write, stderr_write]
+        try:
+            return self.spawn(argv, cwd, env, child_fds + list(extra_fds), rlimits, setsid,
+                              stdin=os.fdopen(stdin_write, 'wb') if stdin_write is not None else None,
+                              stdout=os.fdopen(stdout_read, 'rb'),
+                              stderr=os.fdopen(stderr_read, 'rb'))
+        finally:
+            for fd in pipe_ends:
+                os.close(fd)
+
+    def close(self):
+        self.sock.close()
+        self.server.kill()
+        self.server.wait()
+
+
+def _report_strays(pids: List[int]):
+    from judge.log import get_logger
+    from judge.metrics import registry
+    registry.inc('judge_reaped_processes_total', len(pids))
+    get_logger('judge.spawner').warning("Killed %d stray submission process(es) left running: %s",
+                                        len(pids), ' '.join(map(str, pids[:20])))
+
+
+def _options() -> dict:
+    from flask import current_app, has_app_context
+    if not has_app_context():
+        return {}
+    config = current_app.config
+    return {
+        'cgroup_root': config.get('JUDGE_CGROUP_ROOT'),
+        'pids_max': config.get('JUDGE_CGROUP_PIDS_MAX'),
+        'sweep_interval': config.get('JUDGE_REAPER_INTERVAL'),
+    }
+
+
+_spawner = None
+_spawner_lock = threading.Lock()
+
+
+def get_spawner() -> Spawner:
+    global _spawner
+    with _spawner_lock:
+        if _spawner is None or not _spawner.alive:
+            _spawner = Spawner(_options())
+        return _spawner
+
+
+if __name__ == '__main__':
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    serve(socket.socket(fileno=int(sys.argv[1])), json.loads(sys.argv[2]) if len(sys.argv) > 2 else None)
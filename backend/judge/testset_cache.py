@@ -0,0 +1,128 @@
+"""Per-worker cache of problem test sets.
+
+Judging a submission needs the problem's limits and the list of its test
+cases. Both change only when an admin edits the problem, which bumps
+Problem.version, so a worker keeps them keyed by (problem id, version) and
+reloads only when the version it sees on the submission's problem differs.
+Limits and tests are loaded in a single statement so an entry is always a
+consistent snapshot of one version. On a remote judge node, loading also
+downloads test data the node does not have yet.
+
+The cache is least-recently-used with a total size budget. Test data itself
+stays in the blob store; entries hold paths, so their size is an estimate of
+the Python objects they keep alive.
+"""
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+
+# Rough per-object overheads used for the size estimate
+ENTRY_OVERHEAD_BYTES = 512
+TEST_OVERHEAD_BYTES = 200
+
+
+class CachedTest(NamedTuple):
+    test_case_id: int
+    input_path: str
+    expected_path: str
+
+
+class TestSet(NamedTuple):
+    problem_id: int
+    version: int
+    time_limit: int  # ms
+    memory_limit: Optional[int]  # MB
+    max_parallel_tests: Optional[int]
+    tests: Tuple[CachedTest, ...]
+    toolchain_profile: Optional[str] = None  # the contest's
+
+    @property
+    def size_bytes(self) -> int:
+        return ENTRY_OVERHEAD_BYTES + sum(
+            TEST_OVERHEAD_BYTES + len(test.input_path) + len(test.expected_path) for test in self.tests
+        )
+
+
+def load_test_set(problem_id: int, store) -> Optional[TestSet]:
+    """Read a problem's limits, toolchain profile and tests (ordered by id) in one query"""
+    from app import db
+    from app.models import Contest, Problem, TestCase
+
+    rows = (
+        db.session.query(Problem.version, Problem.time_limit, Problem.memory_limit, Problem.max_parallel_tests,
+                         Contest.toolchain_profile, TestCase.id, TestCase.input_hash, TestCase.output_hash)
+        .outerjoin(Contest, Contest.id == Problem.contest_id)
+        .outerjoin(TestCase, TestCase.problem_id == Problem.id)
+        .filter(Problem.id == problem_id)
+        .order_by(TestCase.id)
+        .all()
+    )
+    if not rows:
+        return None
+    version, time_limit, memory_limit, max_parallel_tests, toolchain_profile = rows[0][:5]
+    tests = tuple(
+        CachedTest(test_id, store.ensure(input_hash), store.ensure(output_hash))
+        for *_, test_id, input_hash, output_hash in rows
+        if test_id is not None
+    )
+    return TestSet(problem_id, version, time_limit, memory_limit, max_parallel_tests, tests, toolchain_profile)
+
+
+class TestSetCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, problem, store) -> Optional[TestSet]:
+        """The test set for `problem`, reloaded if its version moved on"""
+        with self.lock:
+            entry = self.entries.get(problem.id)
+            if entry is not None and entry.version == problem.version:
+                self.entries.move_to_end(problem.id)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        entry = load_test_set(problem.id, store)
+        if entry is not None:
+            self._put(entry)
+        return entry
+
+    def _put(self, entry: TestSet):
+        with self.lock:
+            old = self.entries.pop(entry.problem_id, None)
+            if old is not None:
+                self.total_bytes -= old.size_bytes
+            if entry.size_bytes > self.max_bytes:
+                return
+            self.entries[entry.problem_id] = entry
+            self.total_bytes += entry.size_bytes
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= evicted.size_bytes
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+            }
+
+
+_cache = None
+
+
+def get_test_set_cache(max_bytes: int) -> TestSetCache:
+    global _cache
+    if _cache is None or _cache.max_bytes != max_bytes:
+        _cache = TestSetCache(max_bytes)
+    return _cache
@@ -0,0 +1,119 @@
+"""Toolchain profiles: compiler and runtime flags per language.
+
+A contest picks a profile (Contest.toolchain_profile; unset means
+JUDGE_DEFAULT_TOOLCHAIN_PROFILE). The profile decides how each language is
+built and started:
+
+    plain       the original bare commands: `g++ file`, `javac`, `java`,
+                `python3`, `node`; kept for contests judged that way
+    standard    -O2 -std=gnu++17 with a precompiled <bits/stdc++.h>;
+                java with a 64 MB thread stack and the serial GC;
+                python3 -B -S
+    gnu++20     standard, but C++ compiled as -std=gnu++20
+
+Flags are part of the artifact cache key, so artifacts built under
+different profiles never mix. The precompiled header is built once per
+(profile flags, compiler version) into the artifact cache directory.
+g++ uses it when <bits/stdc++.h> is the first include. Otherwise it
+silently parses the header as usual.
+
+Measured with `python -m benchmarks.toolchain_profiles`.
+"""
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+PCH_HEADER = 'bits/stdc++.h'
+
+
+class LanguageProfile(NamedTuple):
+    compile_flags: Tuple[str, ...] = ()
+    runtime_flags: Tuple[str, ...] = ()  # between the interpreter / JVM and the program
+    precompiled_header: bool = False
+
+
+class Profile(NamedTuple):
+    name: str
+    description: str
+    languages: Dict[str, LanguageProfile]
+
+    def language(self, language: str) -> LanguageProfile:
+        return self.languages.get(language, LanguageProfile())
+
+
+_STANDARD_JAVA = LanguageProfile(compile_flags=('-encoding', 'UTF-8'),
+                                 runtime_flags=('-Xss64m', '-XX:+UseSerialGC'))
+_STANDARD_PYTHON = LanguageProfile(runtime_flags=('-B', '-S'))
+
+PROFILES = {
+    profile.name: profile for profile in (
+        Profile('plain', 'Bare compiler and interpreter commands, no optimization', {}),
+        Profile('standard', 'C++17 -O2 with precompiled bits/stdc++.h, tuned JVM, python3 -B -S', {
+            'cpp': LanguageProfile(compile_flags=('-O2', '-std=gnu++17', '-pipe'), precompiled_header=True),
+            'java': _STANDARD_JAVA,
+            'python': _STANDARD_PYTHON,
+        }),
+        Profile('gnu++20', 'As standard, with C++ compiled as gnu++20', {
+            'cpp': LanguageProfile(compile_flags=('-O2', '-std=gnu++20', '-pipe'), precompiled_header=True),
+            'java': _STANDARD_JAVA,
+            'python': _STANDARD_PYTHON,
+        }),
+    )
+}
+
+DEFAULT_PROFILE = 'standard'
+
+
+def get_profile(name: Optional[str]) -> Profile:
+    """The profile called `name`; unknown or empty names get the configured default"""
+    if name in PROFILES:
+        return PROFILES[name]
+    from flask import current_app, has_app_context
+    default = current_app.config.get('JUDGE_DEFAULT_TOOLCHAIN_PROFILE') if has_app_context() else None
+    return PROFILES.get(default) or PROFILES[DEFAULT_PROFILE]
+
+
+def profile_choices() -> List[Tuple[str, str]]:
+    return [(name, f"{name}: {profile.description}") for name, profile in PROFILES.items()]
+
+
+def fingerprint(profile: Profile, language: str) -> str:
+    """Everything about the profile that changes what a build produces"""
+    return repr((profile.name, profile.language(language)))
+
+
+def precompiled_header_dir(compile_flags: Tuple[str, ...], compiler_version: str, root: str) -> Optional[str]:
+    """Include directory holding bits/stdc++.h.gch built with `compile_flags`, or None if it cannot be built
+
+    A .gch is only used by compilations with the same flags, so each flag set
+    gets its own directory. Concurrent workers build into a staging
+    directory and rename it into place; the first one wins.
+    """
+    key = hashlib.sha256(repr((compile_flags, compiler_version)).encode()).hexdigest()[:16]
+    directory = os.path.join(root, 'pch', key)
+    if os.path.exists(os.path.join(directory, PCH_HEADER + '.gch')):
+        return directory
+
+    os.makedirs(os.path.dirname(directory), exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='pch-', dir=os.path.dirname(directory))
+    try:
+        header = os.path.join(staging, PCH_HEADER)
+        os.makedirs(os.path.dirname(header))
+        with open(header, 'w') as f:
+            # Stands in for the system header; #include_next finds the real one
+            f.write('#include_next <bits/stdc++.h>\n')
+        result = subprocess.run(['g++', *compile_flags, '-x', 'c++-header', header, '-o', header + '.gch'],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+        try:
+            os.rename(staging, directory)
+        except OSError:
+            if not os.path.isdir(directory):
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return directory
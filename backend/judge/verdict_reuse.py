@@ -0,0 +1,78 @@
+"""Reuse of verdicts for identical resubmissions.
+
+Every submission stores a hash of its normalized code. Once judged, it also
+records the problem version it was judged against (`test_version`). A new
+submission with the same problem, language and hash whose problem is still
+at that version gets the earlier verdict, timings and per-test results
+copied instead of being compiled and run again.
+
+Normalization only removes differences that cannot change what a program
+does: Windows line endings and trailing whitespace at the end of the file.
+
+Problems whose verdicts depend on timing noise can turn this off with
+Problem.reuse_verdicts.
+"""
+import hashlib
+from typing import Optional
+
+from app import db
+from app.models import Problem, Submission, SubmissionTestResult
+from judge.job_queue import PENDING
+
+
+def code_hash(code: str) -> str:
+    normalized = (code or '').replace('\r\n', '\n').replace('\r', '\n').rstrip()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def find_reusable(submission: Submission, version: int) -> Optional[Submission]:
+    """An earlier submission judged on `version` with the same code, if any"""
+    if not submission.code_hash:
+        return None
+    return (
+        Submission.query
+        .filter(Submission.problem_id == submission.problem_id,
+                Submission.language == submission.language,
+                Submission.code_hash == submission.code_hash,
+                Submission.test_version == version,
+                Submission.status != PENDING,
+                Submission.id != submission.id)
+        .order_by(Submission.id)
+        .first()
+    )
+
+
+def copy_verdict(submission: Submission, source: Submission):
+    """Give `submission` the verdict of `source`, and update its standing; the caller commits"""
+    from app.standings import update_standing
+
+    SubmissionTestResult.query.filter_by(submission_id=submission.id).delete()
+    submission.status = source.status
+    submission.execution_time = source.execution_time
+    submission.memory_used = source.memory_used
+    submission.error_message = source.error_message
+    submission.test_version = source.test_version
+    submission.reused_from_id = source.reused_from_id or source.id
+    for result in source.test_results:
+        submission.test_results.append(SubmissionTestResult(
+            test_case_id=result.test_case_id,
+            test_index=result.test_index,
+            verdict=result.verdict,
+            execution_time=result.execution_time,
+            wall_time=result.wall_time,
+            memory_kb=result.memory_kb
+        ))
+    update_standing(submission.contest_id, submission.user_id, submission.problem_id)
+
+
+def try_reuse(submission: Submission) -> bool:
+    """Copy a verdict for `submission` from an identical judged one; the caller commits"""
+    problem = db.session.get(Problem, submission.problem_id)
+    if problem is None or not problem.reuse_verdicts:
+        return False
+    db.session.flush()  # a new submission needs its id before it can be compared and copied into
+    source = find_reusable(submission, problem.version)
+    if source is None:
+        return False
+    copy_verdict(submission, source)
+    return True
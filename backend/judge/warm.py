@@ -0,0 +1,279 @@
+"""Warm runtime pools for interpreted and JVM submissions.
+
+Cold-starting python3, node or a JVM for every test case makes interpreter
+startup part of the measured run time. A warm pool keeps a few runtime
+processes that have already started and are blocked on a control pipe. A
+test takes one of them, hands it the program to run and starts the clock
+only then. Every process runs exactly one program, so each test still gets
+a clean child. Replacements are started between submissions (see
+replenish()), never while a test is measured. A test that finds the pool
+empty starts a single runtime and waits for it.
+
+A JVM cannot change its working directory, so every Java runtime is started
+in a directory of its own, which is the program's working directory and is
+removed after its run. Python and node chdir into the test's workspace.
+
+Runtimes are started with the runtime flags of a toolchain profile, so
+there is one pool per (language, profile).
+"""
+import atexit
+import os
+import select
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import deque
+from typing import List, Optional
+
+from judge.compiler import Artifact
+from judge.toolchains import Profile, get_profile
+from judge.workspace import minimal_env
+from judge.spawner import get_spawner
+
+READY_TIMEOUT = 10
+
+PYTHON_BOOTSTRAP = '''
+import os, sys, runpy
+control, ready = int(sys.argv[1]), int(sys.argv[2])
+os.write(ready, b'R')
+os.close(ready)
+target = b''
+while not target.endswith(b'\\n'):
+    chunk = os.read(control, 4096)
+    if not chunk:
+        sys.exit(0)
+    target += chunk
+os.close(control)
+target, cwd = target.decode().strip().split('\\t')
+os.chdir(cwd)
+sys.argv = [target]
+sys.path[0] = os.path.dirname(target)
+runpy.run_path(target, run_name='__main__')
+'''
+
+NODE_BOOTSTRAP = '''
+const fs = require('fs');
+const [control, ready] = process.argv.slice(1).map(Number);
+fs.writeSync(ready, 'R');
+fs.closeSync(ready);
+const buffer = Buffer.alloc(4096);
+let target = '';
+while (!target.endsWith('\\n')) {
+    const n = fs.readSync(control, buffer, 0, buffer.length, null);
+    if (n === 0) process.exit(0);
+    target += buffer.toString('utf8', 0, n);
+}
+fs.closeSync(control);
+const [script, cwd] = target.trim().split('\\t');
+process.chdir(cwd);
+process.argv = [process.argv[0], script];
+require('module').runMain();
+'''
+
+JAVA_BOOTSTRAP = '''
+import java.io.*;
+import java.lang.reflect.*;
+import java.net.*;
+
+public class WarmStart {
+    public static void main(String[] args) throws Throwable {
+        try (FileOutputStream ready = new FileOutputStream("/proc/self/fd/" + args[1])) {
+            ready.write('R');
+        }
+        String line;
+        try (BufferedReader control = new BufferedReader(new InputStreamReader(
+                new FileInputStream("/proc/self/fd/" + args[0])))) {
+            line = control.readLine();
+        }
+        if (line == null) {
+            return;
+        }
+        String[] target = line.trim().split("\\t");
+        URLClassLoader loader = new URLClassLoader(
+            new URL[] { new File(target[0]).toURI().toURL() }, ClassLoader.getPlatformClassLoader());
+        Thread.currentThread().setContextClassLoader(loader);
+        Method main = loader.loadClass(target[1]).getMethod("main", String[].class);
+        try {
+            main.invoke(null, (Object) new String[0]);
+        } catch (InvocationTargetException e) {
+            throw e.getCause();
+        } finally {
+            System.out.flush();
+        }
+    }
+}
+'''
+
+
+def _java_bootstrap_dir(root: str) -> str:
+    """Compile the WarmStart launcher once into `root`"""
+    directory = os.path.join(root, 'warm-java')
+    if not os.path.exists(os.path.join(directory, 'WarmStart.class')):
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'WarmStart.java'), 'w') as f:
+            f.write(JAVA_BOOTSTRAP)
+        subprocess.run(['javac', 'WarmStart.java'], cwd=directory, check=True, capture_output=True)
+    return directory
+
+
+def bootstrap_command(language: str, root: str, profile: Profile) -> List[str]:
+    flags = list(profile.language(language).runtime_flags)
+    if language == 'python':
+        return ['/usr/bin/python3', *flags, '-c', PYTHON_BOOTSTRAP]
+    if language == 'javascript':
+        return ['node', *flags, '-e', NODE_BOOTSTRAP]
+    if language == 'java':
+        return ['java', *flags, '-cp', _java_bootstrap_dir(root), 'WarmStart']
+    raise ValueError(f"No warm runtime for {language}")
+
+
+def handoff_target(artifact: Artifact, cwd: str) -> str:
+    """What the bootstrap needs to start the submission in `cwd`
+
+    A Java runtime always runs in the directory it was started in.
+    """
+    if artifact.language == 'java':
+        return f"{artifact.directory}\tSolution"
+    return f"{artifact.command[-1]}\t{cwd}"
+
+
+class WarmProcess:
+    def __init__(self, command: List[str], cwd: str, env: dict, own_directory: bool = False):
+        # With `own_directory`, `cwd` belongs to this process alone and is removed with it
+        self.directory = cwd if own_directory else None
+        control_read, self.control = os.pipe()
+        self.ready, ready_write = os.pipe()
+        self.is_ready = False
+        try:
+            # The control and ready pipes become descriptors 3 and 4 in the child
+            self.process = get_spawner().popen(command + ['3', '4'], cwd, env, setsid=True,
+                                               extra_fds=(control_read, ready_write))
+        finally:
+            os.close(control_read)
+            os.close(ready_write)
+
+    def wait_ready(self, timeout: float) -> bool:
+        if self.is_ready:
+            return True
+        if self.process.poll() is not None:
+            return False
+        readable, _, _ = select.select([self.ready], [], [], timeout)
+        self.is_ready = bool(readable) and os.read(self.ready, 1) == b'R'
+        return self.is_ready
+
+    def handoff(self, target: str):
+        os.write(self.control, (target + '\n').encode())
+        self.close_pipes()
+
+    def close_pipes(self):
+        for fd in (self.control, self.ready):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def remove_directory(self):
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def discard(self):
+        self.close_pipes()
+        self.process.kill()
+        for stream in (self.process.stdin, self.process.stdout, self.process.stderr):
+            stream.close()
+        self.process.wait()
+        self.remove_directory()
+
+
+class WarmPool:
+    """A few pre-started runtimes of one language and toolchain profile"""
+
+    def __init__(self, language: str, size: int, root: str, profile: Optional[str] = None):
+        self.language = language
+        self.size = size
+        self.root = root
+        self.profile = get_profile(profile)
+        self.command = bootstrap_command(language, root, self.profile)
+        self.cwd = os.path.join(root, 'warm-cwd')
+        self.env = minimal_env(self.cwd)
+        os.makedirs(self.cwd, exist_ok=True)
+        self.idle = deque()
+        self.lock = threading.Lock()
+        self._fill()
+
+    def _start(self) -> WarmProcess:
+        if self.language != 'java':
+            return WarmProcess(self.command, self.cwd, self.env)
+        # The pool's root is shared with the other judge processes
+        directory = tempfile.mkdtemp(prefix='java-', dir=self.cwd)
+        return WarmProcess(self.command, directory, minimal_env(directory), own_directory=True)
+
+    def _fill(self):
+        while len(self.idle) < self.size:
+            self.idle.append(self._start())
+
+    def acquire(self) -> Optional[WarmProcess]:
+        """Take a started runtime, or None if none became ready in time
+
+        With none left, one is started and waited for here; nothing else
+        boots alongside the test.
+        """
+        with self.lock:
+            warm = self.idle.popleft() if self.idle else self._start()
+        if warm is None or not warm.wait_ready(READY_TIMEOUT):
+            if warm is not None:
+                warm.discard()
+            return None
+        return warm
+
+    def replenish(self):
+        """Start replacements for the runtimes used up; call between submissions
+
+        Runtimes booting while a test runs would share the CPU with it and
+        inflate its wall time, so tests never call this.
+        """
+        with self.lock:
+            self._fill()
+
+    def warm_up(self, timeout: float = READY_TIMEOUT):
+        """Block until every idle runtime has finished starting"""
+        with self.lock:
+            idle = list(self.idle)
+        for warm in idle:
+            warm.wait_ready(timeout)
+
+    def shutdown(self):
+        with self.lock:
+            while self.idle:
+                self.idle.popleft().discard()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_warm_pool(language: str, size: int, root: str, profile: Optional[str] = None) -> WarmPool:
+    key = (language, get_profile(profile).name)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = WarmPool(language, size, root, key[1])
+        return pool
+
+
+def configured_pool(language: str, profile: Optional[str] = None) -> Optional[WarmPool]:
+    """The warm pool for `language` under `profile` if enabled in JUDGE_WARM_RUNTIMES"""
+    from flask import current_app, has_app_context
+    if not has_app_context():
+        return None
+    config = current_app.config
+    if language not in config['JUDGE_WARM_RUNTIMES']:
+        return None
+    return get_warm_pool(language, config['JUDGE_WARM_POOL_SIZE'], config['JUDGE_ARTIFACT_CACHE_DIR'], profile)
+
+
+@atexit.register
+def _shutdown_pools():
+    for pool in list(_pools.values()):
+        pool.shutdown()
@@ -0,0 +1,155 @@
+"""Standalone judge worker pool draining the submission queue.
+
+Started with `flask judge-worker --concurrency N [--node-name NAME]`; each
+pool is one judge node (see judge.nodes). The parent process supervises:
+it keeps N worker processes alive, restarts any that die, records the
+node's heartbeat, requeues submissions whose lease expired and takes the
+leaderboard freeze snapshots that are due (see app.snapshots).
+"""
+import os
+import signal
+import time
+import multiprocessing
+
+from judge.log import configure_logging, get_logger
+from judge import metrics, workspace
+
+logger = get_logger('judge.worker')
+
+_stopping = False
+
+
+def _request_stop(signum, frame):
+    global _stopping
+    _stopping = True
+
+
+def _worker_main(slot: int, node_name: str):
+    """Claim-and-judge loop of a single worker process"""
+    from app import create_judge_app, db
+    from judge.job_queue import LeaseLost, claim_next, release, fail
+    from judge.nodes import LeaseKeeper
+    from judge.progress import ProgressWriter
+    from judge.scheduler import SchedulerSettings
+    from judge.mock_judge import judge_submission
+    from judge.testset_cache import get_test_set_cache
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # One lightweight app (and connection pool) for the life of the process
+    app = create_judge_app()
+    config = app.config
+    configure_logging(config['JUDGE_LOG_LEVEL'], config['JUDGE_LOG_RATE_PER_MINUTE'])
+    settings = SchedulerSettings(
+        window=config['JUDGE_SCHEDULER_WINDOW'],
+        per_user=config['JUDGE_SCHEDULER_PER_USER'],
+        deadline_window_seconds=config['JUDGE_DEADLINE_BOOST_MINUTES'] * 60,
+        deadline_weight=config['JUDGE_DEADLINE_BOOST_WEIGHT']
+    )
+    worker_id = f"{node_name}/{slot}:{os.getpid()}"
+    logger.info("Worker %d started as %s", slot, worker_id)
+    keeper = LeaseKeeper(app, worker_id, config['JUDGE_LEASE_SECONDS'], config['JUDGE_HEARTBEAT_SECONDS'])
+    progress = ProgressWriter(app, worker_id, config['JUDGE_LEASE_SECONDS'], config['JUDGE_PROGRESS_INTERVAL'])
+
+    with app.app_context():
+        while not _stopping:
+            submission_id = claim_next(worker_id,
+                                       config['JUDGE_LEASE_SECONDS'],
+                                       config['JUDGE_MAX_ATTEMPTS'],
+                                       config['JUDGE_REJUDGE_SLOTS'],
+                                       settings)
+            if submission_id is None:
+                time.sleep(config['JUDGE_POLL_INTERVAL'])
+                continue
+
+            logger.debug("Worker %d judging submission %s", slot, submission_id)
+            try:
+                with keeper.holding(submission_id):
+                    judge_submission(submission_id, worker_id, progress)
+                release(submission_id, worker_id)
+            except LeaseLost:
+                # Someone else is judging it now; their verdict counts
+                logger.warning("Worker %d: lease on submission %s lost, verdict dropped", slot, submission_id)
+                metrics.registry.inc('judge_lost_leases_total')
+            except Exception as e:
+                logger.exception("Worker %d: error judging submission %s", slot, submission_id)
+                metrics.registry.inc('judge_errors_total')
+                try:
+                    fail(submission_id, worker_id, f"Judge error: {str(e)}")
+                except Exception:
+                    logger.exception("Worker %d: failed to update submission %s", slot, submission_id)
+            finally:
+                # Start every submission with an empty identity map
+                db.session.remove()
+                metrics.flush(config['JUDGE_METRICS_DIR'], get_test_set_cache(config['JUDGE_TESTSET_CACHE_BYTES']),
+                              prefix=node_name)
+
+    keeper.stop()
+    progress.stop()
+    logger.info("Worker %d stopped", slot)
+
+
+def _supervise(node_name: str):
+    """Node heartbeat, requeueing of work whose lease ran out on any node, and due freeze snapshots"""
+    from app import db
+    from app.snapshots import take_due_freezes
+    from judge.job_queue import requeue_expired
+    from judge.nodes import heartbeat
+
+    try:
+        heartbeat(node_name)
+        requeued = requeue_expired()
+        if requeued:
+            logger.warning("Requeued %d submission(s) whose lease expired", requeued)
+    except Exception:
+        db.session.rollback()
+        logger.exception("Node heartbeat failed")
+    try:
+        frozen = take_due_freezes()
+        if frozen:
+            logger.info("Took %d leaderboard freeze snapshot(s)", frozen)
+    except Exception:
+        db.session.rollback()
+        logger.exception("Taking freeze snapshots failed")
+
+
+def run_worker_pool(concurrency: int, node_name: str, config):
+    """Run `concurrency` worker processes until SIGINT/SIGTERM"""
+    from judge.nodes import register_node, stop_node
+
+    # Counters restart with the pool
+    metrics.clear(config['JUDGE_METRICS_DIR'], prefix=node_name)
+    workspace.sweep(config['JUDGE_WORKSPACE_DIR'])
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    register_node(node_name, concurrency)
+    logger.info("Judge node %s started", node_name)
+    ctx = multiprocessing.get_context('spawn')
+    workers = {}
+    last_heartbeat = 0.0
+
+    while not _stopping:
+        if time.monotonic() - last_heartbeat >= config['JUDGE_HEARTBEAT_SECONDS']:
+            _supervise(node_name)
+            last_heartbeat = time.monotonic()
+        for slot in range(concurrency):
+            process = workers.get(slot)
+            if process is not None and process.is_alive():
+                continue
+            if process is not None:
+                logger.warning("Worker %d exited with code %s, restarting", slot, process.exitcode)
+                workspace.sweep(config['JUDGE_WORKSPACE_DIR'])
+            process = ctx.Process(target=_worker_main, args=(slot, node_name), daemon=True)
+            process.start()
+            workers[slot] = process
+        time.sleep(1)
+
+    logger.info("Shutting down workers...")
+    for process in workers.values():
+        if process.is_alive():
+            process.terminate()
+    for process in workers.values():
+        process.join()
+    stop_node(node_name)
@@ -0,0 +1,149 @@
+"""Reusable working directories for submission processes.
+
+Each judge process keeps a few directories under JUDGE_WORKSPACE_DIR
+(by default on tmpfs, /dev/shm, when it is available). A test run borrows
+one as its working directory, HOME and TMPDIR, and returns it afterwards.
+Sequential tests of a submission all use the same directory, and parallel
+tests each use their own. Nothing is created or removed per test.
+Between submissions the directories that were used are emptied. Usually
+they are already empty, and checking that takes one scandir.
+
+Children get a small environment computed once per directory instead of
+a copy of the judge's own, which may hold database URLs and tokens.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+TMPFS = '/dev/shm'
+# Passed through from the judge's environment when set; toolchains may need them
+PASSTHROUGH_ENV = ('PATH', 'LANG', 'LC_ALL', 'TZ', 'JAVA_HOME')
+
+
+def default_root() -> str:
+    if os.path.isdir(TMPFS) and os.access(TMPFS, os.W_OK | os.X_OK):
+        return os.path.join(TMPFS, 'logicomp-workspaces')
+    return os.path.join(tempfile.gettempdir(), 'logicomp-workspaces')
+
+
+def minimal_env(home: str) -> Dict[str, str]:
+    env = {name: os.environ[name] for name in PASSTHROUGH_ENV if name in os.environ}
+    env.setdefault('PATH', '/usr/local/bin:/usr/bin:/bin')
+    env.setdefault('LANG', 'C.UTF-8')
+    env.update(HOME=home, TMPDIR=home)
+    return env
+
+
+def _unlock(path: str):
+    """Give the owner full access to everything under `path`"""
+    os.chmod(path, 0o700)
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                _unlock(entry.path)
+
+
+class Workspace:
+    def __init__(self, path: str):
+        self.path = path
+        self.env = minimal_env(path)
+        os.makedirs(path, exist_ok=True)
+
+    def clear(self):
+        """Remove whatever the last programs left behind"""
+        with os.scandir(self.path) as entries:
+            leftovers = [entry.path for entry in entries]
+        for path in leftovers:
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+        if leftovers and os.listdir(self.path):
+            # Something refused to go (e.g. a directory chmod'ed to 0); start over
+            try:
+                _unlock(self.path)
+            except OSError:
+                pass
+            shutil.rmtree(self.path, ignore_errors=True)
+            os.makedirs(self.path, exist_ok=True)
+
+
+class WorkspacePool:
+    """The workspaces of one judge process"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.directory = os.path.join(root, str(os.getpid()))
+        # Left over by an earlier process with the same pid
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.idle = []
+        self.used = set()
+        self.count = 0
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self):
+        with self.lock:
+            if self.idle:
+                workspace = self.idle.pop()
+            else:
+                workspace = Workspace(os.path.join(self.directory, str(self.count)))
+                self.count += 1
+            self.used.add(workspace)
+        try:
+            yield workspace
+        finally:
+            with self.lock:
+                self.idle.append(workspace)
+
+    def reset(self):
+        """Empty every workspace used since the last reset; call between submissions"""
+        with self.lock:
+            used, self.used = self.used, set()
+        for workspace in used:
+            workspace.clear()
+
+    def remove(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+_pool: Optional[WorkspacePool] = None
+_pool_lock = threading.Lock()
+
+
+def get_workspaces(root: Optional[str] = None) -> WorkspacePool:
+    """This process's workspace pool, created under `root` (default: tmpfs) on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.directory != os.path.join(root or default_root(), str(os.getpid())):
+            _pool = WorkspacePool(root or default_root())
+        return _pool
+
+
+def sweep(root: Optional[str] = None):
+    """Remove the workspaces of judge processes that no longer exist"""
+    root = root or default_root()
+    if not os.path.isdir(root):
+        return
+    for entry in os.scandir(root):
+        if not entry.name.isdigit():
+            continue
+        try:
+            os.kill(int(entry.name), 0)
+        except ProcessLookupError:
+            shutil.rmtree(entry.path, ignore_errors=True)
+        except PermissionError:
+            pass
+
+
+@atexit.register
+def _remove_workspaces():
+    if _pool is not None and _pool.directory.endswith(f'/{os.getpid()}'):
+        _pool.remove()
@@ -0,0 +1,39 @@
+"""
+Migration script to rank contest participants in the database
+Adds the contest_scores table, one row per participant with the totals the
+leaderboard is ordered by, and indexes contest_participants by contest; fill
+contest_scores for existing contests with `flask standings-rebuild`
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'add_contest_scores'
+down_revision = 'add_standings_version'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('contest_scores',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('contest_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_accepted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('total_time', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('penalty', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['contest_id'], ['contests.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('contest_id', 'user_id', name='uq_contest_scores_contest_user')
+    )
+    op.create_index('ix_contest_scores_rank', 'contest_scores',
+                    ['contest_id', sa.text('score DESC'), 'last_accepted_at', 'total_time', 'user_id'])
+    op.create_index('ix_contest_participants_contest_user', 'contest_participants', ['contest_id', 'user_id'])
+
+def downgrade():
+    op.drop_index('ix_contest_participants_contest_user', table_name='contest_participants')
+    op.drop_index('ix_contest_scores_rank', table_name='contest_scores')
+    op.drop_table('contest_scores')
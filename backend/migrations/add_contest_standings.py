@@ -0,0 +1,39 @@
+"""
+Migration script to materialize contest standings
+Adds the contest_standings table, one row per participant and problem, kept
+up to date by the judge; fill it for existing contests with
+`flask standings-rebuild`
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'add_contest_standings'
+down_revision = 'add_toolchain_profiles'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('contest_standings',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('contest_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('problem_id', sa.Integer(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('rejected_before_ac', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('accepted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('accepted_time', sa.Float(), nullable=True),
+        sa.Column('best_time', sa.Float(), nullable=True),
+        sa.Column('penalty', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['contest_id'], ['contests.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['problem_id'], ['problems.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'problem_id', name='uq_contest_standings_user_problem')
+    )
+    op.create_index('ix_contest_standings_contest_user', 'contest_standings', ['contest_id', 'user_id'])
+
+def downgrade():
+    op.drop_index('ix_contest_standings_contest_user', table_name='contest_standings')
+    op.drop_table('contest_standings')
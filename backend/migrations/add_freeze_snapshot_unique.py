@@ -0,0 +1,25 @@
+"""
+Migration script to keep one freeze snapshot per contest in the database
+Drops all but the latest freeze snapshot of each contest and adds a partial
+unique index on standings_snapshots.contest_id for kind = 'freeze'
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'add_freeze_snapshot_unique'
+down_revision = 'add_standings_snapshots'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute(
+        "DELETE FROM standings_snapshots WHERE kind = 'freeze' AND id NOT IN "
+        "(SELECT MAX(id) FROM standings_snapshots WHERE kind = 'freeze' GROUP BY contest_id)"
+    )
+    op.create_index('uq_standings_snapshots_freeze', 'standings_snapshots', ['contest_id'], unique=True,
+                    postgresql_where=sa.text("kind = 'freeze'"), sqlite_where=sa.text("kind = 'freeze'"))
+
+def downgrade():
+    op.drop_index('uq_standings_snapshots_freeze', table_name='standings_snapshots')
@@ -0,0 +1,31 @@
+"""
+Migration script to register distributed judge nodes
+Adds the judge_nodes table holding each worker pool's heartbeat
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'add_judge_nodes'
+down_revision = 'add_verdict_reuse'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('judge_nodes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=128), nullable=False),
+        sa.Column('hostname', sa.String(length=255), nullable=True),
+        sa.Column('concurrency', sa.Integer(), nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_heartbeat', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('stopped_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    op.create_index('ix_judge_nodes_last_heartbeat', 'judge_nodes', ['last_heartbeat'])
+
+def downgrade():
+    op.drop_index('ix_judge_nodes_last_heartbeat', table_name='judge_nodes')
+    op.drop_table('judge_nodes')
@@ -0,0 +1,29 @@
+"""
+Migration script to add judge queue lease columns to submissions
+Pending submissions are claimed by judge workers through these columns
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'add_judge_queue'
+down_revision = 'add_cascade_deletes'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('submissions', sa.Column('claimed_by', sa.String(length=128), nullable=True))
+    op.add_column('submissions', sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('submissions', sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('submissions', sa.Column('judge_attempts', sa.Integer(), nullable=False, server_default='0'))
+    op.create_index('ix_submissions_claimed_by', 'submissions', ['claimed_by'])
+    op.create_index('ix_submission_queue', 'submissions', ['status', 'lease_expires_at'])
+
+def downgrade():
+    op.drop_index('ix_submission_queue', table_name='submissions')
+    op.drop_index('ix_submissions_claimed_by', table_name='submissions')
+    op.drop_column('submissions', 'judge_attempts')
+    op.drop_column('submissions', 'lease_expires_at')
+    op.drop_column('submissions', 'claimed_at')
+    op.drop_column('submissions', 'claimed_by')
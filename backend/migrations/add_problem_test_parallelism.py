@@ -0,0 +1,18 @@
+"""
+Migration script to add a per-problem cap on parallel test runs
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'add_problem_test_parallelism'
+down_revision = 'add_judge_queue'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('problems', sa.Column('max_parallel_tests', sa.Integer(), nullable=True))
+
+def downgrade():
+    op.drop_column('problems', 'max_parallel_tests')
@@ -0,0 +1,20 @@
+"""
+Migration script to add a version counter to problems
+Judge workers cache each problem's limits and tests keyed by this counter;
+admin edits bump it
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'add_problem_version'
+down_revision = 'add_testdata_store'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('problems', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+def downgrade():
+    op.drop_column('problems', 'version')
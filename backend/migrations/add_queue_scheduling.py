@@ -0,0 +1,23 @@
+"""
+Migration script to record judge queue scheduling latency
+Adds when each submission was queued and how long it waited for a worker
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'add_queue_scheduling'
+down_revision = 'add_rejudge_jobs'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('submissions', sa.Column('queued_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('submissions', sa.Column('queue_wait', sa.Float(), nullable=True))
+    # Submissions still waiting count as queued at submit time
+    op.execute("UPDATE submissions SET queued_at = timestamp WHERE status = 'Pending'")
+
+def downgrade():
+    op.drop_column('submissions', 'queue_wait')
+    op.drop_column('submissions', 'queued_at')
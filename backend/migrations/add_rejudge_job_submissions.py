@@ -0,0 +1,30 @@
+"""
+Migration script to record the submissions of each rejudge job in the database
+Adds the rejudge_job_submissions table; existing jobs get the submissions
+that still point at them through submissions.rejudge_job_id
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'add_rejudge_job_submissions'
+down_revision = 'add_freeze_snapshot_unique'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('rejudge_job_submissions',
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.Column('submission_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['job_id'], ['rejudge_jobs.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['submission_id'], ['submissions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('job_id', 'submission_id')
+    )
+    op.execute(
+        "INSERT INTO rejudge_job_submissions (job_id, submission_id) "
+        "SELECT rejudge_job_id, id FROM submissions WHERE rejudge_job_id IS NOT NULL"
+    )
+
+def downgrade():
+    op.drop_table('rejudge_job_submissions')
@@ -0,0 +1,45 @@
+"""
+Migration script to add bulk rejudge jobs
+Adds the rejudge_jobs table plus the queue priority and rejudge job of each
+submission; the queue index now covers priority
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'add_rejudge_jobs'
+down_revision = 'add_problem_version'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('rejudge_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('problem_id', sa.Integer(), nullable=True),
+        sa.Column('contest_id', sa.Integer(), nullable=True),
+        sa.Column('statuses', sa.String(length=512), nullable=True),
+        sa.Column('created_by_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('total', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['problem_id'], ['problems.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['contest_id'], ['contests.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['created_by_id'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.add_column('submissions', sa.Column('priority', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('submissions', sa.Column('rejudge_job_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('submissions_rejudge_job_id_fkey', 'submissions', 'rejudge_jobs',
+                          ['rejudge_job_id'], ['id'], ondelete='SET NULL')
+    op.create_index('ix_submissions_rejudge_job_id', 'submissions', ['rejudge_job_id'])
+    op.drop_index('ix_submission_queue', table_name='submissions')
+    op.create_index('ix_submission_queue', 'submissions', ['status', 'priority', 'lease_expires_at'])
+
+def downgrade():
+    op.drop_index('ix_submission_queue', table_name='submissions')
+    op.create_index('ix_submission_queue', 'submissions', ['status', 'lease_expires_at'])
+    op.drop_index('ix_submissions_rejudge_job_id', table_name='submissions')
+    op.drop_constraint('submissions_rejudge_job_id_fkey', 'submissions', type_='foreignkey')
+    op.drop_column('submissions', 'rejudge_job_id')
+    op.drop_column('submissions', 'priority')
+    op.drop_table('rejudge_jobs')
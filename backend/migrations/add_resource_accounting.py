@@ -0,0 +1,38 @@
+"""
+Migration script to add CPU time / memory accounting
+Adds the per-problem memory limit, peak memory per submission and a table of
+per-test results
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'add_resource_accounting'
+down_revision = 'add_problem_test_parallelism'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('problems', sa.Column('memory_limit', sa.Integer(), nullable=True))
+    op.add_column('submissions', sa.Column('memory_used', sa.Integer(), nullable=True))
+    op.create_table('submission_test_results',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('submission_id', sa.Integer(), nullable=False),
+        sa.Column('test_case_id', sa.Integer(), nullable=True),
+        sa.Column('test_index', sa.Integer(), nullable=False),
+        sa.Column('verdict', sa.String(length=50), nullable=False),
+        sa.Column('execution_time', sa.Float(), nullable=True),
+        sa.Column('wall_time', sa.Float(), nullable=True),
+        sa.Column('memory_kb', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['submission_id'], ['submissions.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['test_case_id'], ['test_cases.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_submission_test_results_submission_id', 'submission_test_results', ['submission_id'])
+
+def downgrade():
+    op.drop_index('ix_submission_test_results_submission_id', table_name='submission_test_results')
+    op.drop_table('submission_test_results')
+    op.drop_column('submissions', 'memory_used')
+    op.drop_column('problems', 'memory_limit')
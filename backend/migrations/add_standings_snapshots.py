@@ -0,0 +1,41 @@
+"""
+Migration script to freeze and snapshot contest standings in the database
+Adds contests.freeze_time and contests.unfreeze_time, and the
+standings_snapshots table holding a contest's ranked standings as of one
+moment
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'add_standings_snapshots'
+down_revision = 'add_contest_scores'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('contests', sa.Column('freeze_time', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('contests', sa.Column('unfreeze_time', sa.DateTime(timezone=True), nullable=True))
+    op.create_table('standings_snapshots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('contest_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=16), nullable=False),
+        sa.Column('label', sa.String(length=128), nullable=True),
+        sa.Column('as_of', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('taken_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_by_id', sa.Integer(), nullable=True),
+        sa.Column('participants', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('pending', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(['contest_id'], ['contests.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['created_by_id'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_standings_snapshots_contest_kind', 'standings_snapshots', ['contest_id', 'kind', 'as_of'])
+
+def downgrade():
+    op.drop_index('ix_standings_snapshots_contest_kind', table_name='standings_snapshots')
+    op.drop_table('standings_snapshots')
+    op.drop_column('contests', 'unfreeze_time')
+    op.drop_column('contests', 'freeze_time')
@@ -0,0 +1,19 @@
+"""
+Migration script to version contest standings
+Adds contests.standings_version, which keys the leaderboard cache
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'add_standings_version'
+down_revision = 'add_contest_standings'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('contests', sa.Column('standings_version', sa.Integer(), nullable=False, server_default='0'))
+
+def downgrade():
+    op.drop_column('contests', 'standings_version')
@@ -0,0 +1,64 @@
+"""
+Migration script to move test case data into the content-addressed store
+Writes every test's input and expected output to TESTDATA_DIR, keeps only
+their sha256 hashes and sizes in test_cases and drops the Text columns
+"""
+
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'add_testdata_store'
+down_revision = 'add_resource_accounting'
+branch_labels = None
+depends_on = None
+
+def _store():
+    from app.testdata import BlobStore
+    from config import Config
+    return BlobStore(os.environ.get('TESTDATA_DIR') or Config.TESTDATA_DIR)
+
+def upgrade():
+    op.add_column('test_cases', sa.Column('input_hash', sa.String(length=64), nullable=True))
+    op.add_column('test_cases', sa.Column('input_size', sa.BigInteger(), nullable=True))
+    op.add_column('test_cases', sa.Column('output_hash', sa.String(length=64), nullable=True))
+    op.add_column('test_cases', sa.Column('output_size', sa.BigInteger(), nullable=True))
+
+    store = _store()
+    conn = op.get_bind()
+    ids = [row.id for row in conn.execute(sa.text("SELECT id FROM test_cases"))]
+    # One row at a time so large tests are never all in memory together
+    for test_id in ids:
+        row = conn.execute(sa.text("SELECT expected_input, expected_output FROM test_cases WHERE id = :id"),
+                           {'id': test_id}).one()
+        input_hash, input_size = store.put(row.expected_input or '')
+        output_hash, output_size = store.put(row.expected_output or '')
+        conn.execute(sa.text(
+            "UPDATE test_cases SET input_hash = :ih, input_size = :isz, output_hash = :oh, output_size = :osz "
+            "WHERE id = :id"
+        ), {'ih': input_hash, 'isz': input_size, 'oh': output_hash, 'osz': output_size, 'id': test_id})
+
+    for column in ('input_hash', 'input_size', 'output_hash', 'output_size'):
+        op.alter_column('test_cases', column, nullable=False)
+    op.drop_column('test_cases', 'expected_input')
+    op.drop_column('test_cases', 'expected_output')
+
+def downgrade():
+    op.add_column('test_cases', sa.Column('expected_input', sa.Text(), nullable=True))
+    op.add_column('test_cases', sa.Column('expected_output', sa.Text(), nullable=True))
+
+    store = _store()
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, input_hash, output_hash FROM test_cases")).all()
+    for row in rows:
+        conn.execute(sa.text("UPDATE test_cases SET expected_input = :i, expected_output = :o WHERE id = :id"),
+                     {'i': store.read_text(row.input_hash), 'o': store.read_text(row.output_hash), 'id': row.id})
+
+    op.alter_column('test_cases', 'expected_input', nullable=False)
+    op.alter_column('test_cases', 'expected_output', nullable=False)
+    op.drop_column('test_cases', 'output_size')
+    op.drop_column('test_cases', 'output_hash')
+    op.drop_column('test_cases', 'input_size')
+    op.drop_column('test_cases', 'input_hash')
@@ -0,0 +1,19 @@
+"""
+Migration script to select a toolchain profile per contest
+Adds contests.toolchain_profile (NULL: the judge's default profile)
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'add_toolchain_profiles'
+down_revision = 'add_judge_nodes'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('contests', sa.Column('toolchain_profile', sa.String(length=32), nullable=True))
+
+def downgrade():
+    op.drop_column('contests', 'toolchain_profile')
@@ -0,0 +1,48 @@
+"""
+Migration script to reuse verdicts of identical resubmissions
+Adds the normalized code hash, the problem version a verdict was judged
+against and the submission it was copied from, plus a per-problem switch
+"""
+
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'add_verdict_reuse'
+down_revision = 'add_queue_scheduling'
+branch_labels = None
+depends_on = None
+
+def _code_hash(code):
+    # Same normalization as judge.verdict_reuse.code_hash
+    normalized = (code or '').replace('\r\n', '\n').replace('\r', '\n').rstrip()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+def upgrade():
+    op.add_column('problems', sa.Column('reuse_verdicts', sa.Boolean(), nullable=False, server_default=sa.true()))
+    op.add_column('submissions', sa.Column('code_hash', sa.String(length=64), nullable=True))
+    op.add_column('submissions', sa.Column('test_version', sa.Integer(), nullable=True))
+    op.add_column('submissions', sa.Column('reused_from_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('fk_submissions_reused_from', 'submissions', 'submissions',
+                          ['reused_from_id'], ['id'], ondelete='SET NULL')
+    op.create_index('ix_submission_verdict_reuse', 'submissions',
+                    ['problem_id', 'language', 'code_hash', 'test_version'])
+
+    # Hash existing code so new submissions can match it. test_version stays
+    # NULL: which version old verdicts were judged against is unknown.
+    conn = op.get_bind()
+    ids = [row.id for row in conn.execute(sa.text("SELECT id FROM submissions"))]
+    for submission_id in ids:
+        code = conn.execute(sa.text("SELECT code FROM submissions WHERE id = :id"), {'id': submission_id}).scalar()
+        conn.execute(sa.text("UPDATE submissions SET code_hash = :h WHERE id = :id"),
+                     {'h': _code_hash(code), 'id': submission_id})
+
+def downgrade():
+    op.drop_index('ix_submission_verdict_reuse', table_name='submissions')
+    op.drop_constraint('fk_submissions_reused_from', 'submissions', type_='foreignkey')
+    op.drop_column('submissions', 'reused_from_id')
+    op.drop_column('submissions', 'test_version')
+    op.drop_column('submissions', 'code_hash')
+    op.drop_column('problems', 'reuse_verdicts')